@@ -0,0 +1,140 @@
+import matplotlib
+matplotlib.use('Agg')  # headless: must be selected before pyplot is imported
+
+import argparse
+import io
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from charts import FigurePool
+from main import FOOTPRINT_COLUMN, CoalMineFootprintCalculator, create_database_and_table
+from rollup import TREND_RESOLUTIONS
+
+DEFAULT_OUTPUT_DIR = 'charts'
+DEFAULT_REDUCTION_PERCENTAGE = 10.0
+
+def slugify(name):
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(name)).strip('_').lower()
+
+def build_chart_jobs(calculator, reduction_percentage=DEFAULT_REDUCTION_PERCENTAGE, resolutions=tuple(TREND_RESOLUTIONS)):
+    # One (filename, chart type, args) job per chart; args are plain lists so jobs can be shipped anywhere
+    calculator.ensure_footprint()
+    data = calculator.coal_mine_data
+    remaining = 1 - reduction_percentage / 100
+    footprint_mt = data[FOOTPRINT_COLUMN] / 1e6
+    jobs = []
+
+    jobs.append(('total_footprint.png', 'footprint_bars', (
+        data['Mine Name'].tolist(), footprint_mt.tolist(), 'Carbon Footprint of All Coal Mines'
+    )))
+    for resolution in resolutions:
+        trend_data = calculator.fetch_trend_data(resolution)
+        jobs.append((f'trend_{resolution}.png', 'footprint_trend', (
+            list(trend_data.index), (trend_data.values / 1e6).tolist(),
+            f'Carbon Footprint Trend Over Time ({resolution.capitalize()})'
+        )))
+    jobs.append((f'reduction_all_mines_{slugify(reduction_percentage)}.png', 'reduction_bars', (
+        data['Mine Name'].tolist(), footprint_mt.tolist(), (footprint_mt * remaining).tolist(),
+        f'Carbon Footprint Comparison After {reduction_percentage}% Reduction for All Mines'
+    )))
+    matrix = calculator.comparison_matrix('Carbon Footprint')
+    jobs.append(('comparison_matrix.png', 'comparison_heatmap', (
+        list(matrix.index), matrix.to_numpy().tolist(), 'Carbon Footprint: Row Mine vs Column Mine',
+        'Carbon Footprint (difference)'
+    )))
+
+    for state, state_data in data.groupby('Location', observed=True, sort=True):
+        state_footprint_mt = state_data[FOOTPRINT_COLUMN] / 1e6
+        jobs.append((f'state_{slugify(state)}.png', 'footprint_bars', (
+            state_data['Mine Name'].tolist(), state_footprint_mt.tolist(),
+            f'Carbon Footprint of Mines in {state}', 45, 'right', 'b'
+        )))
+
+        for mine, mine_data in state_data.groupby('Mine Name', observed=True, sort=True):
+            mine_footprint_mt = mine_data[FOOTPRINT_COLUMN] / 1e6
+            names = mine_data['Mine Name'].tolist()
+            jobs.append((f'mine_{slugify(state)}_{slugify(mine)}.png', 'attribute_bars', (
+                names, mine_data['Annual Production'].tolist(), mine_data['Emission Factor'].tolist(),
+                mine_footprint_mt.tolist(), f'Attributes for {mine} in {state}'
+            )))
+            jobs.append((f'reduction_{slugify(state)}_{slugify(mine)}.png', 'reduction_bars', (
+                names, mine_footprint_mt.tolist(), (mine_footprint_mt * remaining).tolist(),
+                f'Carbon Footprint Comparison for {mine} After {reduction_percentage}% Reduction'
+            )))
+    return jobs
+
+# Figure pool of the current process; each worker process gets its own
+_figure_pool = None
+
+def get_figure_pool():
+    global _figure_pool
+    if _figure_pool is None:
+        _figure_pool = FigurePool()
+    return _figure_pool
+
+def render_chart_job(job, output_dir):
+    filename, chart_type, args = job
+    start = time.perf_counter()
+    fig = get_figure_pool().render(chart_type, *args)
+    fig.savefig(os.path.join(output_dir, filename))
+    return filename, time.perf_counter() - start
+
+def render_chart_bytes(chart_type, args, fmt='png'):
+    # Render into memory instead of a file; used by the dashboard's render queue workers
+    fig = get_figure_pool().render(chart_type, *args)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+def close_figure_pool():
+    global _figure_pool
+    if _figure_pool is not None:
+        _figure_pool.close()
+        _figure_pool = None
+
+def render_jobs_parallel(jobs, output_dir, workers):
+    # Each job carries only its own slice of the data, so no worker ever receives the whole DataFrame;
+    # jobs are batched to keep inter-process round trips low
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(partial(render_chart_job, output_dir=output_dir), jobs, chunksize=chunksize)
+
+def render_all_charts(calculator, output_dir=DEFAULT_OUTPUT_DIR, reduction_percentage=DEFAULT_REDUCTION_PERCENTAGE,
+                      workers=1):
+    # Every chart type for every state and mine in one headless run, with timing per chart
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    jobs = build_chart_jobs(calculator, reduction_percentage)
+    if workers > 1:
+        results = render_jobs_parallel(jobs, output_dir, workers)
+    else:
+        results = (render_chart_job(job, output_dir) for job in jobs)
+
+    timings = []
+    try:
+        for filename, seconds in results:
+            timings.append((filename, seconds))
+            print(f"{seconds * 1000:8.1f} ms  {filename}")
+    finally:
+        close_figure_pool()
+    total = time.perf_counter() - start
+    print(f"Rendered {len(timings)} charts to {output_dir} in {total:.2f}s using {workers} worker(s).")
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render every chart headlessly into an output directory")
+    parser.add_argument('--db', default='coal_mines.db', help="SQLite database path")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--reduction', type=float, default=DEFAULT_REDUCTION_PERCENTAGE,
+                        help="Reduction percentage used for the reduction charts")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Rendering processes; 1 renders in this process")
+    args = parser.parse_args()
+
+    create_database_and_table(args.db)
+    calculator = CoalMineFootprintCalculator(sqlite_database_path=args.db, output_dir=args.output_dir, headless=True)
+    calculator.load_data_from_db()
+    render_all_charts(calculator, args.output_dir, args.reduction, args.workers)
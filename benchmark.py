@@ -0,0 +1,807 @@
+import argparse
+import io
+import os
+import resource
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ingest import DEFAULT_INGEST_CHUNK_SIZE, ingest_csv_files
+from main import (
+    CoalMineFootprintCalculator, DEFAULT_CHUNK_SIZE, add_footprint_column,
+    compact_coal_mine_data, memory_per_row
+)
+from scenarios import allocate_reductions, reduction_grid
+from uncertainty import propagate_footprint_uncertainty
+
+# Cumulative import time allowed per entry-point module, and libraries none of them may import eagerly
+IMPORT_BUDGET_MS = 150
+IMPORT_MODULES = ('main', 'four', 'one', 'ingest', 'cli', 't')
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'pyarrow', 'psycopg2')
+# States and mines the synthetic benchmark rows are drawn from
+SYNTHETIC_STATES_MINES = {
+    'Jharkhand': ['Jharia', 'Karanpura', 'Bokaro Colliery'],
+    'Chhattisgarh': ['Gevra', 'Dipka', 'Kusmunda', 'Mand-Raigarh'],
+    'Madhya Pradesh': ['Nigahi', 'Jayant', 'Dudhichua', 'Umaria'],
+    'West Bengal': ['Raniganj Coalfield'],
+    'Maharashtra': ['Ghugus', 'Wani', 'Ballarpur Colliery'],
+    'Odisha': ['Talcher Coalfield', 'Ib Valley Coalfield', 'Jagannath'],
+    'Telangana': ['Kothagudem Coalfield', 'Ramagundam']
+}
+# Row counts used by the footprint benchmark
+FOOTPRINT_SIZES = (10_000, 1_000_000, 10_000_000)
+# Row-wise apply is far too slow at 10M rows, so it is timed on at most this many rows
+APPLY_ROW_LIMIT = 1_000_000
+
+def make_mine_data(rows, seed=0):
+    # Synthetic mine-month records shaped like fetch_coal_mine_data_sqlite output
+    rng = np.random.default_rng(seed)
+    pairs = [(mine, state) for state, mines in SYNTHETIC_STATES_MINES.items() for mine in mines]
+    picks = rng.integers(0, len(pairs), size=rows)
+    dates = pd.date_range('2000-01-01', periods=365 * 24, freq='D').strftime('%Y-%m-%d').to_numpy()
+    return pd.DataFrame({
+        'Mine Name': np.array([mine for mine, _ in pairs], dtype=object)[picks],
+        'Location': np.array([state for _, state in pairs], dtype=object)[picks],
+        'Annual Production': rng.uniform(0.5, 6.0, size=rows),
+        'Emission Factor': rng.uniform(0.8, 0.95, size=rows),
+        'Date': dates[rng.integers(0, len(dates), size=rows)]
+    })
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def benchmark_footprint(sizes=FOOTPRINT_SIZES, apply_limit=APPLY_ROW_LIMIT):
+    calculator = CoalMineFootprintCalculator()
+    print(f"{'rows':>12} {'apply rows/s':>16} {'vectorized rows/s':>20} {'speedup':>10}")
+    for rows in sizes:
+        data = make_mine_data(rows)
+
+        sample = data.head(min(rows, apply_limit))
+        apply_seconds, _ = time_call(
+            sample.apply,
+            lambda row: calculator.calculate_footprint(row['Annual Production'], row['Emission Factor']),
+            axis=1
+        )
+        apply_rate = len(sample) / apply_seconds
+
+        vector_seconds, _ = time_call(add_footprint_column, data)
+        vector_rate = rows / vector_seconds
+
+        note = '' if len(sample) == rows else f" (apply timed on {len(sample):,} rows)"
+        print(f"{rows:>12,} {apply_rate:>16,.0f} {vector_rate:>20,.0f} {vector_rate / apply_rate:>9,.0f}x{note}")
+
+def write_mine_database(db_path, data):
+    # Plain coal_mines table filled with synthetic rows for the loader benchmarks
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE coal_mines (
+            id INTEGER PRIMARY KEY,
+            mine_name TEXT,
+            location TEXT,
+            annual_production REAL,
+            emission_factor REAL,
+            date DATE
+        );
+    """)
+    conn.executemany(
+        "INSERT INTO coal_mines (mine_name, location, annual_production, emission_factor, date) VALUES (?, ?, ?, ?, ?)",
+        data[['Mine Name', 'Location', 'Annual Production', 'Emission Factor', 'Date']].itertuples(index=False, name=None)
+    )
+    conn.commit()
+    conn.close()
+
+def measure_peak_memory(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return time.perf_counter() - start, peak
+
+def benchmark_streaming(rows=2_000_000, chunk_size=DEFAULT_CHUNK_SIZE):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        write_mine_database(db_path, make_mine_data(rows))
+
+        full_seconds, full_peak = measure_peak_memory(
+            lambda: CoalMineFootprintCalculator(db_path).load_data_from_db()
+        )
+        stream_seconds, stream_peak = measure_peak_memory(
+            lambda: CoalMineFootprintCalculator(db_path, chunk_size=chunk_size).load_aggregates_streaming()
+        )
+
+    print(f"{'mode':>24} {'seconds':>10} {'peak MiB':>10}")
+    print(f"{'full load':>24} {full_seconds:>10.2f} {full_peak / 2**20:>10.1f}")
+    print(f"{f'streaming ({chunk_size:,}/chunk)':>24} {stream_seconds:>10.2f} {stream_peak / 2**20:>10.1f}")
+
+def benchmark_compact(rows=1_000_000):
+    data = make_mine_data(rows)
+    compact_seconds, compact = time_call(compact_coal_mine_data, data)
+    before = memory_per_row(data)
+    after = memory_per_row(compact)
+    print(f"{'layout':>10} {'bytes/row':>10} {'total MiB':>10}")
+    print(f"{'default':>10} {before:>10.1f} {before * rows / 2**20:>10.1f}")
+    print(f"{'compact':>10} {after:>10.1f} {after * rows / 2**20:>10.1f}")
+    print(f"Converted {rows:,} rows in {compact_seconds:.2f}s")
+
+    for label, frame in (('default', data), ('compact', compact)):
+        group_seconds, _ = time_call(lambda: frame.groupby('Location', observed=True)['Annual Production'].sum())
+        print(f"{label:>10} per-state groupby: {group_seconds * 1000:.1f} ms")
+
+def benchmark_snapshot(rows=2_000_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        snapshot_dir = os.path.join(tmp_dir, 'snapshots')
+        write_mine_database(db_path, make_mine_data(rows))
+
+        # First load reads SQLite and writes the snapshot, the second one is served from it
+        cold_seconds, _ = time_call(
+            lambda: CoalMineFootprintCalculator(db_path, snapshot_dir=snapshot_dir).load_data_from_db()
+        )
+        warm_seconds, _ = time_call(
+            lambda: CoalMineFootprintCalculator(db_path, snapshot_dir=snapshot_dir).load_data_from_db()
+        )
+
+    print(f"{'start':>26} {'seconds':>10}")
+    print(f"{'SQLite (+ write snapshot)':>26} {cold_seconds:>10.2f}")
+    print(f"{'memory-mapped snapshot':>26} {warm_seconds:>10.2f}")
+
+def benchmark_ingest(rows=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        csv_path = os.path.join(tmp_dir, 'feed.csv')
+        make_mine_data(rows).to_csv(csv_path, index=False)
+        write_mine_database(db_path, make_mine_data(0))
+        ingest_csv_files(db_path, [csv_path])
+
+def benchmark_trend(rows=2_000_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        write_mine_database(db_path, make_mine_data(0))
+        csv_path = os.path.join(tmp_dir, 'feed.csv')
+        make_mine_data(rows).to_csv(csv_path, index=False)
+        ingest_csv_files(db_path, [csv_path])
+
+        calculator = CoalMineFootprintCalculator(db_path)
+        calculator.load_data_from_db()
+        print(f"{'resolution':>10} {'rollup ms':>10} {'regroup ms':>11}")
+        for resolution in ('daily', 'monthly', 'yearly'):
+            calculator.sqlite_database_path = db_path
+            rollup_seconds, _ = time_call(calculator.fetch_trend_data, resolution)
+            # Without a database path the calculator regroups the full in-memory history
+            calculator.sqlite_database_path = None
+            regroup_seconds, _ = time_call(calculator.fetch_trend_data, resolution)
+            print(f"{resolution:>10} {rollup_seconds * 1000:>10.1f} {regroup_seconds * 1000:>11.1f}")
+
+def benchmark_render(worker_counts=(1, 2, 4, 8, 16)):
+    # Imported here so the Agg backend is only forced for this benchmark
+    from batch_render import render_all_charts
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        write_mine_database(db_path, make_mine_data(0))
+        csv_path = os.path.join(tmp_dir, 'feed.csv')
+        make_mine_data(len(SYNTHETIC_STATES_MINES) * 40).to_csv(csv_path, index=False)
+        ingest_csv_files(db_path, [csv_path])
+
+        calculator = CoalMineFootprintCalculator(db_path, headless=True)
+        calculator.load_data_from_db()
+        results = []
+        for workers in worker_counts:
+            seconds, timings = time_call(
+                render_all_charts, calculator, os.path.join(tmp_dir, f'charts_{workers}'), workers=workers
+            )
+            results.append((workers, len(timings), seconds))
+
+    baseline = results[0][2]
+    print(f"{'workers':>8} {'charts':>8} {'seconds':>10} {'speedup':>9}")
+    for workers, charts, seconds in results:
+        print(f"{workers:>8} {charts:>8} {seconds:>10.2f} {baseline / seconds:>8.1f}x")
+
+def benchmark_figures(renders=1_000, checkpoints=5):
+    # Imported here so the Agg backend is only forced for this benchmark
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from charts import FigurePool, plot_footprint_bars
+
+    data = make_mine_data(renders * 4)
+    frames = [data.iloc[i * 4:(i + 1) * 4] for i in range(renders)]
+
+    # Building the chart and encoding the PNG are timed separately: the pool only speeds up the former
+    def render_fresh(frame):
+        return plot_footprint_bars(frame['Mine Name'], frame['Annual Production'], 'Benchmark')
+
+    pool = FigurePool()
+
+    def render_pooled(frame):
+        return pool.render('footprint_bars', frame['Mine Name'], frame['Annual Production'], 'Benchmark')
+
+    # Peak RSS instead of tracemalloc: tracing every allocation would dwarf the rendering cost
+    step = max(1, renders // checkpoints)
+    for label, render, close in (('new figure', render_fresh, plt.close), ('figure pool', render_pooled, None)):
+        build_seconds = save_seconds = 0.0
+        usage = []
+        for i, frame in enumerate(frames, 1):
+            start = time.perf_counter()
+            fig = render(frame)
+            saved = time.perf_counter()
+            fig.savefig(io.BytesIO(), format='png')
+            build_seconds += saved - start
+            save_seconds += time.perf_counter() - saved
+            if close is not None:
+                close(fig)
+            if i % step == 0:
+                usage.append(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        seconds = build_seconds + save_seconds
+        trace = ' '.join(f"{mib:.0f}" for mib in usage)
+        print(f"{label:>12}: {seconds / renders * 1000:6.1f} ms/chart (build {build_seconds / renders * 1000:5.1f}, "
+              f"savefig {save_seconds / renders * 1000:5.1f}), peak RSS MiB every {step} renders: {trace}")
+    pool.close()
+
+def benchmark_scenarios(scenarios=10_000, mines=2_000, rows_per_mine=12, copy_limit=20):
+    # Batch scenario API vs the old per-scenario approach (copy the data, cut production, recompute)
+    rng = np.random.default_rng(1)
+    data = make_mine_data(mines * rows_per_mine)
+    # Each synthetic mine belongs to exactly one state
+    mine_ids = rng.integers(0, mines, size=len(data))
+    states = np.array(list(SYNTHETIC_STATES_MINES), dtype=object)
+    data['Mine Name'] = [f"Mine {i}" for i in mine_ids]
+    data['Location'] = states[mine_ids % len(states)]
+    calculator = CoalMineFootprintCalculator()
+    calculator.coal_mine_data = data
+    summary = calculator.get_mine_summary()
+    reductions = rng.uniform(0, 100, size=(scenarios, len(summary)))
+
+    def copy_per_scenario(scenario_reductions):
+        totals = []
+        for row in scenario_reductions:
+            reduced_data = data.copy()
+            cut = pd.Series(row, index=summary.index)
+            keys = pd.MultiIndex.from_frame(reduced_data[['Location', 'Mine Name']])
+            reduced_data['Annual Production'] *= 1 - cut.reindex(keys).to_numpy() / 100
+            add_footprint_column(reduced_data)
+            totals.append(reduced_data['Carbon Footprint (tCO2e)'].sum())
+        return totals
+
+    copy_seconds, _ = time_call(copy_per_scenario, reductions[:copy_limit])
+    batch_seconds, _ = time_call(calculator.simulate_reduction_scenarios, reductions)
+    grid_seconds, _ = time_call(calculator.simulate_reduction_scenarios, reduction_grid(101))
+    per_copy = copy_seconds / copy_limit
+    print(f"{len(summary)} mines, {len(data)} rows")
+    print(f"copy per scenario: {per_copy * 1000:8.2f} ms/scenario (timed on {copy_limit} scenarios)")
+    print(f"batch matrix     : {batch_seconds / scenarios * 1000:8.4f} ms/scenario "
+          f"({scenarios} scenarios in {batch_seconds:.2f}s, {per_copy * scenarios / batch_seconds:,.0f}x)")
+    print(f"uniform 0-100%   : {grid_seconds * 1000:8.2f} ms for 101 scenarios")
+
+def benchmark_allocation(mine_counts=(1_000, 10_000, 100_000), target_pct=30.0):
+    # Allocation solver latency as the number of mines grows
+    rng = np.random.default_rng(0)
+    print(f"{'mines':>8} {'solve ms':>9} {'mines cut':>10} {'target hit':>11}")
+    for mines in mine_counts:
+        production = rng.uniform(0.5, 60.0, size=mines)
+        emission_factor = rng.uniform(0.8, 0.95, size=mines)
+        cost = rng.uniform(10, 100, size=mines)
+        max_reduction = rng.uniform(5, 60, size=mines)
+        target = (production * emission_factor * 1e6).sum() * target_pct / 100
+
+        seconds, reduction = time_call(allocate_reductions, production, emission_factor, target, max_reduction, cost)
+        achieved = (production * reduction / 100 * emission_factor * 1e6).sum()
+        print(f"{mines:>8} {seconds * 1000:>9.2f} {np.count_nonzero(reduction):>10} {np.isclose(achieved, target)!s:>11}")
+
+def benchmark_montecarlo(samples=100_000, mine_counts=(len(sum(SYNTHETIC_STATES_MINES.values(), [])), 1_000),
+                         worker_counts=(1, 4)):
+    # Monte Carlo runtime and batch memory for the full mine list and a larger synthetic one
+    rng = np.random.default_rng(0)
+    print(f"{'mines':>6} {'workers':>7} {'seconds':>8} {'batch':>7} {'MiB/batch':>9} {'95% interval (Mt CO2e)':>26}")
+    for mines in mine_counts:
+        production = rng.uniform(5.0, 60.0, size=mines)
+        emission_factor = rng.uniform(0.8, 0.95, size=mines)
+        for workers in worker_counts:
+            result = propagate_footprint_uncertainty(production, emission_factor, samples, seed=0, workers=workers)
+            interval = f"[{result['lower'] / 1e6:,.1f}, {result['upper'] / 1e6:,.1f}]"
+            print(f"{mines:>6} {workers:>7} {result['seconds']:>8.2f} {result['batch_size']:>7} "
+                  f"{result['batch_bytes'] / 2 ** 20:>9.1f} {interval:>26}")
+
+def benchmark_cli(queries=300, rows=100_000):
+    # Many CLI queries in one batch process vs the cost of starting a process per query
+    import subprocess
+    import sys
+    from cli import main as cli_main
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        data = make_mine_data(rows)
+        write_mine_database(db_path, data)
+        pairs = data[['Location', 'Mine Name']].drop_duplicates().to_numpy()
+        lines = []
+        for i in range(queries):
+            state, mine = pairs[i % len(pairs)]
+            lines.append(['total', f'state "{state}"', f'mine "{state}" "{mine}"', 'trend --resolution monthly',
+                          f'simulate --reduction {i % 100}'][i % 5])
+        query_path = os.path.join(tmp_dir, 'queries.txt')
+        with open(query_path, 'w') as f:
+            f.write('\n'.join(lines))
+
+        common = ['--db', db_path, '--snapshot-dir', os.path.join(tmp_dir, 'snapshots')]
+        batch_seconds, _ = time_call(cli_main, common + ['batch', query_path], io.StringIO())
+        single_seconds, _ = time_call(subprocess.run, [sys.executable, 'cli.py'] + common + ['total'],
+                                      capture_output=True, check=True)
+        print(f"batch : {queries} queries in {batch_seconds:.2f}s ({queries / batch_seconds:,.0f} queries/sec)")
+        print(f"single: {single_seconds:.2f}s for one query in its own process")
+
+def benchmark_postgres(dsn, rows=500_000, fetch_size=10_000):
+    # Against a scratch database: COPY vs executemany inserts, then full vs server-side streaming reads
+    from postgres_backend import COAL_MINE_SELECT_POSTGRES, PostgresBackend
+    from ingest import normalize_records
+
+    backend = PostgresBackend(dsn, fetch_size=fetch_size)
+    data = make_mine_data(rows)
+    try:
+        with backend.connection() as conn:
+            conn.cursor().execute("DROP TABLE IF EXISTS coal_mines;")
+        backend.create_table()
+
+        copy_seconds, _ = time_call(backend.copy_dataframe, data)
+        insert_rows = min(rows, 50_000)
+
+        def insert_many():
+            with backend.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.executemany(
+                        "INSERT INTO coal_mines (mine_name, location, annual_production, emission_factor, date) "
+                        "VALUES (%s, %s, %s, %s, %s)",
+                        list(normalize_records(data.iloc[:insert_rows]).itertuples(index=False, name=None))
+                    )
+                conn.rollback()
+
+        insert_seconds, _ = time_call(insert_many)
+        print(f"COPY      : {rows / copy_seconds:>12,.0f} rows/sec")
+        print(f"executemany: {insert_rows / insert_seconds:>11,.0f} rows/sec (timed on {insert_rows} rows)")
+
+        def read_full():
+            with backend.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(COAL_MINE_SELECT_POSTGRES)
+                    return pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+
+        def read_streaming():
+            return sum(len(chunk) for chunk in backend.iter_dataframes())
+
+        for label, read in (('client-side read', read_full), ('server-side stream', read_streaming)):
+            seconds, peak = measure_peak_memory(read)
+            print(f"{label:>18}: {seconds:.2f}s, peak {peak / 2 ** 20:.0f} MiB")
+    finally:
+        with backend.connection() as conn:
+            conn.cursor().execute("DROP TABLE IF EXISTS coal_mines;")
+        backend.close()
+
+def make_keyed_mine_data(rows, mines=2_000, seed=0):
+    # Synthetic rows with unique (mine, state, date) keys: mine i reports once per day
+    rng = np.random.default_rng(seed)
+    states = np.array(list(SYNTHETIC_STATES_MINES), dtype=object)
+    mine_ids = np.arange(rows) % mines
+    dates = pd.date_range('2000-01-01', periods=rows // mines + 1, freq='D').strftime('%Y-%m-%d').to_numpy()
+    return pd.DataFrame({
+        'Mine Name': pd.Series(mine_ids).map('Mine {}'.format).to_numpy(dtype=object),
+        'Location': states[mine_ids % len(states)],
+        'Annual Production': rng.uniform(0.5, 6.0, size=rows),
+        'Emission Factor': rng.uniform(0.8, 0.95, size=rows),
+        'Date': dates[np.arange(rows) // mines]
+    })
+
+def benchmark_upsert(rows=1_000_000, existing_fraction=0.5, dsn=None):
+    # Upsert a batch in which existing_fraction of the keys are already stored (with different values);
+    # the table must end with exactly one row per key and, for SQLite, a rollup that still matches it
+    from main import create_database_and_table
+    from ingest import upsert_records
+
+    data = make_keyed_mine_data(rows)
+    existing = data.sample(frac=existing_fraction, random_state=0)
+    data['Annual Production'] *= 1.1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        create_database_and_table(db_path)
+
+        def upsert_frame(frame):
+            # One transaction, in ingest-sized chunks
+            conn = sqlite3.connect(db_path, isolation_level=None)
+            try:
+                conn.execute("BEGIN;")
+                for start in range(0, len(frame), DEFAULT_INGEST_CHUNK_SIZE):
+                    upsert_records(conn, frame.iloc[start:start + DEFAULT_INGEST_CHUNK_SIZE])
+                conn.execute("COMMIT;")
+            finally:
+                conn.close()
+
+        upsert_frame(existing)
+        seconds, _ = time_call(upsert_frame, data)
+        conn = sqlite3.connect(db_path)
+        stored, production = conn.execute(
+            "SELECT COUNT(*), SUM(annual_production) FROM coal_mines WHERE mine_name LIKE 'Mine %';"
+        ).fetchone()
+        rollup_production = conn.execute("SELECT SUM(total_production) FROM coal_mine_daily_rollup;").fetchone()[0]
+        table_production = conn.execute("SELECT SUM(annual_production) FROM coal_mines;").fetchone()[0]
+        conn.close()
+        production_ok = np.isclose(production, data['Annual Production'].sum())
+        print(f"SQLite  : {rows} rows ({len(existing)} existing) in {seconds:.2f}s ({rows / seconds:,.0f} rows/sec); "
+              f"{stored} rows stored, production {'matches' if production_ok else 'DIFFERS'}, "
+              f"rollup {'matches' if np.isclose(rollup_production, table_production) else 'DIFFERS'}")
+
+    if dsn:
+        from postgres_backend import PostgresBackend
+        backend = PostgresBackend(dsn)
+        try:
+            with backend.connection() as conn:
+                conn.cursor().execute("DROP TABLE IF EXISTS coal_mines;")
+            backend.create_table()
+            backend.copy_dataframe(existing)
+            seconds, _ = time_call(backend.copy_dataframe, data)
+            with backend.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT COUNT(*), SUM(annual_production) FROM coal_mines;")
+                    stored, production = cursor.fetchone()
+            production_ok = np.isclose(production, data['Annual Production'].sum())
+            print(f"Postgres: {rows} rows ({len(existing)} existing) in {seconds:.2f}s ({rows / seconds:,.0f} rows/sec); "
+                  f"{stored} rows stored, production {'matches' if production_ok else 'DIFFERS'}")
+        finally:
+            with backend.connection() as conn:
+                conn.cursor().execute("DROP TABLE IF EXISTS coal_mines;")
+            backend.close()
+
+def write_fixture_pdf(path, pages, rows_per_page=25, seed=0):
+    # Stand-in for the MoSPI report: one mine production table per page, rendered with matplotlib
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    rng = np.random.default_rng(seed)
+    states = list(SYNTHETIC_STATES_MINES)
+    with PdfPages(path) as pdf:
+        for page in range(pages):
+            fig, ax = plt.subplots(figsize=(8.27, 11.69))
+            ax.axis('off')
+            ax.set_title(f"Table {page + 1}: Mine-wise production of coal (Thousand Tonnes)")
+            rows = []
+            for row in range(rows_per_page):
+                state = states[(page + row) % len(states)]
+                rows.append([f"Mine {page}-{row}", state, f"{2015 + page % 8}-{16 + page % 8}",
+                             f"{rng.uniform(50, 5_000):,.1f}"])
+            rows.append(['Total', '', '', '-'])
+            table = ax.table(cellText=rows, colLabels=['Name of Mine', 'State', 'Year', 'Production'], loc='upper center')
+            table.scale(1, 1.3)
+            pdf.savefig(fig)
+            plt.close(fig)
+
+def benchmark_pdf(pages=100, workers=4):
+    # Cold extraction of a fixture PDF vs a re-run served from the page cache, and a re-run into the
+    # same database, which must not add rows
+    from mospi_pdf import ingest_pdf
+    from main import create_database_and_table
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, 'energy_statistics.pdf')
+        write_fixture_pdf(pdf_path, pages)
+        runs = (('cold, 1 worker', 'serial.db', 'serial_cache', 1),
+                (f'cold, {workers} workers', 'parallel.db', 'page_cache', workers),
+                ('page cache', 'cached.db', 'page_cache', workers),
+                ('same database', 'cached.db', 'page_cache', workers))
+        for label, db_name, cache_name, run_workers in runs:
+            db_path = os.path.join(tmp_dir, db_name)
+            create_database_and_table(db_path)
+            seconds, stats = time_call(ingest_pdf, pdf_path, db_path, os.path.join(tmp_dir, cache_name), run_workers)
+            conn = sqlite3.connect(db_path)
+            total = conn.execute("SELECT COUNT(*) FROM coal_mines;").fetchone()[0]
+            conn.close()
+            print(f"{label:>15}: {seconds:.2f}s, {stats['rows']} rows inserted, {total} rows in coal_mines")
+
+def start_directory_server(pages, page_bytes=50_000, latency=0.05):
+    # Local stand-in for a paginated directory: ?page=0..pages-1 with ETags and a fixed latency per
+    # request, 404 beyond the last page. Returns the server and its per-status request counts.
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    bodies = [(f"<p>page {page}</p>" + 'x' * page_bytes).encode() for page in range(pages)]
+    counts = {200: 0, 304: 0, 404: 0}
+    lock = threading.Lock()
+
+    class DirectoryHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so the session's pooled connections are reused
+
+        def do_GET(self):
+            time.sleep(latency)
+            page = int(parse_qs(urlparse(self.path).query).get('page', ['0'])[0])
+            if page >= pages:
+                status, body = 404, b''
+            else:
+                etag = f'"page-{page}"'
+                status, body = (304, b'') if self.headers.get('If-None-Match') == etag else (200, bodies[page])
+            with lock:
+                counts[status] += 1
+            self.send_response(status)
+            if status != 404:
+                self.send_header('ETag', f'"page-{page}"')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DirectoryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counts
+
+def benchmark_fetch(pages=40, workers=8, latency=0.05):
+    # Paginated fetch from the local stand-in: sequential vs concurrent cold fetches, then a warm run within
+    # the TTL (no requests) and one after it (conditional requests answered with 304)
+    from fetcher import CachedFetcher
+
+    server, counts = start_directory_server(pages, latency=latency)
+    url = f"http://127.0.0.1:{server.server_address[1]}/coal-directory"
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            runs = (('cold, sequential', 'sequential', 1, 3600),
+                    (f'cold, {workers} workers', 'concurrent', workers, 3600),
+                    ('within TTL', 'concurrent', workers, 3600),
+                    ('TTL expired', 'concurrent', workers, 0))
+            for label, cache_name, run_workers, ttl in runs:
+                before = dict(counts)
+                fetcher = CachedFetcher(os.path.join(tmp_dir, cache_name), ttl, max_workers=run_workers)
+                seconds, results = time_call(fetcher.fetch_paginated, url)
+                fetcher.close()
+                requested = {status: counts[status] - before[status] for status in counts}
+                print(f"{label:>18}: {len(results)} pages in {seconds:.2f}s "
+                      f"({requested[200]} x 200, {requested[304]} x 304, {requested[404]} x 404)")
+    finally:
+        server.shutdown()
+
+def write_fixture_html(path, target_bytes=20 * 2 ** 20, rows_per_table=500, seed=0):
+    # Stand-in for a saved Coal Directory page: navigation and prose around large mine-wise production
+    # tables, with the unit in the heading of each table
+    rng = np.random.default_rng(seed)
+    states = list(SYNTHETIC_STATES_MINES)
+    filler = '<div class="nav"><ul>' + ''.join(f'<li><a href="/page/{i}">Link {i}</a></li>' for i in range(50)) + '</ul></div>'
+    written = 0
+    table_number = 0
+    with open(path, 'w') as f:
+        f.write('<!DOCTYPE html><html><head><title>Coal Directory of India</title></head><body>')
+        while written < target_bytes:
+            production = rng.uniform(5, 50_000, rows_per_table)
+            rows = ''.join(
+                f'<tr><td>{row + 1}</td><td><span class="mine">Mine {table_number}-{row}</span></td>'
+                f'<td>{states[(table_number + row) % len(states)]}</td><td>{2015 + table_number % 9}-{16 + table_number % 9}</td>'
+                f'<td class="num">{value:,.2f}</td></tr>'
+                for row, value in enumerate(production)
+            )
+            block = (f'{filler}<h3>Table {table_number + 1}: Mine-wise coal production (Thousand Tonnes)</h3>'
+                     f'<p>{"Production figures are provisional. " * 20}</p>'
+                     '<table class="data"><thead><tr><th>S.No.</th><th>Name of Mine</th><th>State</th><th>Year</th>'
+                     f'<th>Production</th></tr></thead><tbody>{rows}<tr><td></td><td>Total</td><td></td><td></td>'
+                     f'<td>{production.sum():,.2f}</td></tr></tbody></table>')
+            f.write(block)
+            written += len(block)
+            table_number += 1
+        f.write('</body></html>')
+
+def benchmark_html(html_path=None, target_mb=20):
+    # Table extraction from a ~20 MB page: BeautifulSoup on the full tree (html.parser) vs a SoupStrainer
+    # restricted parse vs incremental lxml parsing, then the bulk upsert into a fresh and an already
+    # loaded database
+    from coal_directory import HEADING_TAGS, iter_tables_lxml, iter_tables_soup, scrape_to_db
+    from main import create_database_and_table
+    from source_tables import table_records
+
+    def extract(iter_tables, *args):
+        return sum(len(table_records(rows, context)) for rows, context in iter_tables(*args))
+
+    def extract_full_soup(path):
+        import bs4
+        with open(path, 'rb') as f:
+            soup = bs4.BeautifulSoup(f, 'html.parser')
+        records = 0
+        for table in soup.find_all('table'):
+            heading = table.find_previous(HEADING_TAGS)
+            rows = [[cell.get_text(' ') for cell in row.find_all(['td', 'th'])] for row in table.find_all('tr')]
+            records += len(table_records(rows, heading.get_text(' ') if heading else ''))
+        return records
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if html_path is None:
+            html_path = os.path.join(tmp_dir, 'coal_directory.html')
+            write_fixture_html(html_path, target_mb * 2 ** 20)
+        print(f"fixture: {os.path.getsize(html_path) / 2 ** 20:.1f} MiB")
+        parsers = (('html.parser, full tree', extract_full_soup, (html_path,)),
+                   ('html.parser + SoupStrainer', extract, (iter_tables_soup, html_path, 'html.parser')),
+                   ('lxml + SoupStrainer', extract, (iter_tables_soup, html_path, 'lxml')),
+                   ('lxml iterparse', extract, (iter_tables_lxml, html_path)))
+        for label, func, args in parsers:
+            seconds, records = time_call(func, *args)
+            print(f"{label:>26}: {seconds:.2f}s, {records} records")
+
+        db_path = os.path.join(tmp_dir, 'scraped.db')
+        create_database_and_table(db_path)
+        for label in ('upsert, new rows', 'upsert, same rows'):
+            seconds, (rows, _) = time_call(scrape_to_db, [html_path], db_path)
+            conn = sqlite3.connect(db_path)
+            total = conn.execute("SELECT COUNT(*) FROM coal_mines;").fetchone()[0]
+            conn.close()
+            print(f"{label:>26}: {seconds:.2f}s for {rows} rows, {total} rows in coal_mines")
+
+def benchmark_registry(rows=1_000_000, mines=5_000, lookups=1_000):
+    # Selecting one mine's / one state's rows through the mine registry vs boolean masks over all rows
+    data = make_keyed_mine_data(rows, mines).sample(frac=1.0, random_state=0).reset_index(drop=True)
+    calculator = CoalMineFootprintCalculator()
+    calculator.append_data(data)
+    build_seconds, registry = time_call(calculator.get_mine_registry)
+    keys = [(state, mine) for state in registry.states() for mine in registry.mines(state)]
+    picks = [keys[i] for i in np.random.default_rng(0).integers(0, len(keys), lookups)]
+
+    def select_masked():
+        frame = calculator.coal_mine_data
+        for state, mine in picks:
+            frame[(frame['Location'] == state) & (frame['Mine Name'] == mine)]
+
+    def select_registry():
+        for state, mine in picks:
+            calculator.select_mine_rows(state, mine)
+
+    masked_seconds, _ = time_call(select_masked)
+    registry_seconds, _ = time_call(select_registry)
+    print(f"registry build: {build_seconds:.2f}s for {len(registry)} mines in {len(registry.states())} states, {rows} rows")
+    print(f"boolean mask  : {masked_seconds / lookups * 1e3:.3f} ms per mine lookup")
+    print(f"registry      : {registry_seconds / lookups * 1e3:.3f} ms per mine lookup")
+
+def measure_import(module):
+    # Cumulative import time in ms from `python -X importtime`, plus any heavy libraries the import pulled in
+    import subprocess
+    import sys
+    probe = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    # Run from the repository root, where the modules live, whatever the caller's working directory
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    cumulative_us = next(int(line.split('|')[1]) for line in reversed(result.stderr.splitlines())
+                         if line.split('|')[-1].strip() == module)
+    return cumulative_us / 1000, [name for name in result.stdout.strip().split(',') if name]
+
+def benchmark_imports(modules=IMPORT_MODULES, budget_ms=IMPORT_BUDGET_MS, repeats=5):
+    # Best of several runs, since the first run also compiles bytecode; returns False if any module
+    # exceeds the budget or imports a heavy library at startup
+    within_budget = True
+    print(f"{'module':>8} {'import ms':>10} {'budget ms':>10}  eager heavy imports")
+    for module in modules:
+        runs = [measure_import(module) for _ in range(repeats)]
+        milliseconds = min(ms for ms, _ in runs)
+        eager = sorted(set(name for _, loaded in runs for name in loaded))
+        ok = milliseconds <= budget_ms and not eager
+        within_budget &= ok
+        print(f"{module:>8} {milliseconds:>10.1f} {budget_ms:>10} {', '.join(eager) or '-':>20}  {'ok' if ok else 'FAIL'}")
+    return within_budget
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the coal mine footprint calculator")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    footprint_parser = subparsers.add_parser('footprint', help="Row-wise apply vs vectorized footprint engine")
+    footprint_parser.add_argument('--sizes', type=int, nargs='+', default=list(FOOTPRINT_SIZES))
+    footprint_parser.add_argument('--apply-limit', type=int, default=APPLY_ROW_LIMIT)
+
+    streaming_parser = subparsers.add_parser('streaming', help="Peak memory of full load vs chunked streaming load")
+    streaming_parser.add_argument('--rows', type=int, default=2_000_000)
+    streaming_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    compact_parser = subparsers.add_parser('compact', help="Memory per row of default vs compact dtypes")
+    compact_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="Cold SQLite load vs columnar snapshot load")
+    snapshot_parser.add_argument('--rows', type=int, default=2_000_000)
+
+    ingest_parser = subparsers.add_parser('ingest', help="Bulk CSV ingest throughput")
+    ingest_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    trend_parser = subparsers.add_parser('trend', help="Trend from the rollup table vs regrouping all rows")
+    trend_parser.add_argument('--rows', type=int, default=2_000_000)
+
+    render_parser = subparsers.add_parser('render', help="Batch chart rendering speedup across worker counts")
+    render_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+
+    figures_parser = subparsers.add_parser('figures', help="Memory and latency of new figures vs the figure pool")
+    figures_parser.add_argument('--renders', type=int, default=1_000)
+
+    scenarios_parser = subparsers.add_parser('scenarios', help="Batch reduction scenarios vs copying the data per scenario")
+    scenarios_parser.add_argument('--scenarios', type=int, default=10_000)
+    scenarios_parser.add_argument('--mines', type=int, default=2_000)
+
+    allocation_parser = subparsers.add_parser('allocation', help="Reduction allocation solver across mine counts")
+    allocation_parser.add_argument('--mines', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    allocation_parser.add_argument('--target', type=float, default=30.0, help="National reduction target in percent")
+
+    montecarlo_parser = subparsers.add_parser('montecarlo', help="Monte Carlo footprint uncertainty runtime and memory")
+    montecarlo_parser.add_argument('--samples', type=int, default=100_000)
+    montecarlo_parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+
+    cli_parser = subparsers.add_parser('cli', help="Batch CLI queries per process")
+    cli_parser.add_argument('--queries', type=int, default=300)
+    cli_parser.add_argument('--rows', type=int, default=100_000)
+
+    postgres_parser = subparsers.add_parser('postgres', help="COPY and server-side cursors against a scratch PostgreSQL")
+    postgres_parser.add_argument('--dsn', required=True, help="DSN of a scratch database; coal_mines is dropped")
+    postgres_parser.add_argument('--rows', type=int, default=500_000)
+
+    pdf_parser = subparsers.add_parser('pdf', help="Cold vs cached extraction of a generated fixture PDF")
+    pdf_parser.add_argument('--pages', type=int, default=100)
+    pdf_parser.add_argument('--workers', type=int, default=4)
+
+    fetch_parser = subparsers.add_parser('fetch', help="Cached, concurrent paginated fetch from a local stand-in server")
+    fetch_parser.add_argument('--pages', type=int, default=40)
+    fetch_parser.add_argument('--workers', type=int, default=8)
+    fetch_parser.add_argument('--latency', type=float, default=0.05, help="Simulated seconds per request")
+
+    html_parser = subparsers.add_parser('html', help="HTML table extraction parsers and bulk upsert on a ~20 MB page")
+    html_parser.add_argument('--html', help="Saved HTML page to use instead of the generated fixture")
+    html_parser.add_argument('--size-mb', type=int, default=20, help="Size of the generated fixture")
+
+    upsert_parser = subparsers.add_parser('upsert', help="Natural-key upsert of a batch half of which already exists")
+    upsert_parser.add_argument('--rows', type=int, default=1_000_000)
+    upsert_parser.add_argument('--existing', type=float, default=0.5, help="Fraction of keys already stored")
+    upsert_parser.add_argument('--dsn', help="Also run against this scratch PostgreSQL database; coal_mines is dropped")
+
+    registry_parser = subparsers.add_parser('registry', help="Mine selection through the registry vs boolean masks")
+    registry_parser.add_argument('--rows', type=int, default=1_000_000)
+    registry_parser.add_argument('--mines', type=int, default=5_000)
+
+    imports_parser = subparsers.add_parser('imports', help="Startup import time against a budget; exits 1 if over")
+    imports_parser.add_argument('--modules', nargs='+', default=list(IMPORT_MODULES))
+    imports_parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+
+    args = parser.parse_args()
+    if args.benchmark == 'footprint':
+        benchmark_footprint(args.sizes, args.apply_limit)
+    elif args.benchmark == 'streaming':
+        benchmark_streaming(args.rows, args.chunk_size)
+    elif args.benchmark == 'compact':
+        benchmark_compact(args.rows)
+    elif args.benchmark == 'snapshot':
+        benchmark_snapshot(args.rows)
+    elif args.benchmark == 'ingest':
+        benchmark_ingest(args.rows)
+    elif args.benchmark == 'trend':
+        benchmark_trend(args.rows)
+    elif args.benchmark == 'render':
+        benchmark_render(args.workers)
+    elif args.benchmark == 'figures':
+        benchmark_figures(args.renders)
+    elif args.benchmark == 'scenarios':
+        benchmark_scenarios(args.scenarios, args.mines)
+    elif args.benchmark == 'allocation':
+        benchmark_allocation(args.mines, args.target)
+    elif args.benchmark == 'montecarlo':
+        benchmark_montecarlo(args.samples, worker_counts=args.workers)
+    elif args.benchmark == 'cli':
+        benchmark_cli(args.queries, args.rows)
+    elif args.benchmark == 'postgres':
+        benchmark_postgres(args.dsn, args.rows)
+    elif args.benchmark == 'pdf':
+        benchmark_pdf(args.pages, args.workers)
+    elif args.benchmark == 'fetch':
+        benchmark_fetch(args.pages, args.workers, args.latency)
+    elif args.benchmark == 'html':
+        benchmark_html(args.html, args.size_mb)
+    elif args.benchmark == 'upsert':
+        benchmark_upsert(args.rows, args.existing, args.dsn)
+    elif args.benchmark == 'registry':
+        benchmark_registry(args.rows, args.mines)
+    elif args.benchmark == 'imports':
+        if not benchmark_imports(args.modules, args.budget_ms):
+            raise SystemExit(1)
@@ -0,0 +1,285 @@
+from lazy_imports import LazyModule
+
+plt = LazyModule('matplotlib.pyplot')
+mpl_figure = LazyModule('matplotlib.figure')
+
+DEFAULT_FIGURE_SIZE = (12, 6)
+
+# Chart builders shared by the interactive menu and the batch renderer. Every chart type has a
+# template (axes labels, grid) that is drawn once, and an update function that fills in the data.
+# The plot_* functions draw a fresh pyplot figure; FigurePool keeps one template figure per chart
+# type and only updates bar heights, lines and tick labels in place on each render.
+
+def _set_bars(ax, bars, positions, heights, width, **style):
+    # Reuse the existing rectangles when the bar count is unchanged, otherwise redraw this series only
+    heights = list(heights)
+    positions = list(positions)
+    if bars is not None and len(bars) == len(heights):
+        for rect, x, height in zip(bars.patches, positions, heights):
+            rect.set_x(x - width / 2)
+            rect.set_width(width)
+            rect.set_height(height)
+            if 'color' in style:
+                rect.set_facecolor(style['color'])
+        if 'label' in style:
+            bars.set_label(style['label'])
+        return bars
+    if bars is not None:
+        bars.remove()
+    return ax.bar(positions, heights, width, **style)
+
+def _set_xticks(state, positions, labels, rotation=0, ha='center'):
+    # Tick labels are only replaced when they change, which also keeps the cached layout valid
+    ticks = (list(positions), list(labels), rotation, ha)
+    if state.get('xticks') != ticks:
+        state['ax'].set_xticks(ticks[0])
+        state['ax'].set_xticklabels(ticks[1], rotation=rotation, ha=ha)
+        state['xticks'] = ticks
+
+def _padded(low, high, margin=0.05):
+    # Data limits with matplotlib's default 5% margin
+    pad = (high - low) * margin if high > low else 0.5
+    return low - pad, high + pad
+
+def _set_bar_limits(state, *series):
+    # Axis limits straight from the bar geometry instead of relim/autoscale over every artist; bars grow from
+    # zero, so zero stays on the edge of the y-axis as with autoscaling
+    rects = [rect for bars in series for rect in bars.patches]
+    if not rects:
+        return
+    ax = state['ax']
+    ax.set_xlim(*_padded(min(rect.get_x() for rect in rects),
+                         max(rect.get_x() + rect.get_width() for rect in rects)))
+    heights = [rect.get_height() for rect in rects if rect.get_height() == rect.get_height()] + [0.0]
+    bottom, top = min(heights), max(heights)
+    if top == bottom:
+        top = 1.0
+    pad = (top - bottom) * 0.05
+    ax.set_ylim(bottom - pad if bottom < 0 else 0, top + pad if top > 0 else 0)
+
+def _label_extent(state):
+    # What tight_layout's margins depend on: tick rotation and axis labels, and the longest tick label of every
+    # axis
+    fixed = [state.get('xticks', (None,) * 4)[2:]]
+    lengths = []
+    for ax in state['fig'].axes:
+        for axis in (ax.xaxis, ax.yaxis):
+            texts = axis.get_major_formatter().format_ticks(axis.get_majorticklocs())
+            fixed.append(axis.get_label_text())
+            lengths.append(max((len(text) for text in texts), default=0))
+    return fixed, lengths
+
+def _update_layout(state):
+    # tight_layout measures every text artist and dominated the cost of a pooled render, so it only runs when a
+    # tick label outgrows the margins of the current layout; shorter labels keep the layout as it is
+    fixed, lengths = _label_extent(state)
+    layout = state.get('layout')
+    if layout is None or layout[0] != fixed or any(length > fitted for length, fitted in zip(lengths, layout[1])):
+        state['fig'].tight_layout()
+        state['layout'] = fixed, lengths
+
+def _set_legend(state, labels=None):
+    # The legend is created on first render; later renders only swap its texts when labels change
+    if state.get('legend') is None:
+        state['legend'] = state['ax'].legend()
+    elif labels is not None:
+        for text, label in zip(state['legend'].get_texts(), labels):
+            text.set_text(label)
+
+def _footprint_bars_template(state):
+    state['ax'].set_xlabel('Mine Name')
+    state['ax'].set_ylabel('Carbon Footprint (Million Tonnes CO2e)')
+
+def _update_footprint_bars(state, labels, footprints_mt, title, rotation=90, ha='center', color=None):
+    ax = state['ax']
+    labels = list(labels)
+    positions = range(len(labels))
+    state['bars'] = _set_bars(ax, state.get('bars'), positions, footprints_mt, 0.8, color=color or 'C0')
+    ax.set_title(title)
+    _set_xticks(state, positions, labels, rotation, ha)
+    _set_bar_limits(state, state['bars'])
+    _update_layout(state)
+
+def _attribute_bars_template(state):
+    state['ax'].set_xlabel('Mine Name')
+    state['ax'].set_ylabel('Values')
+
+def _update_attribute_bars(state, labels, production, emission_factor, footprints_mt, title):
+    ax = state['ax']
+    labels = list(labels)
+
+    # Bar width and positions
+    bar_width = 0.25
+    index = range(len(labels))
+
+    state['production'] = _set_bars(ax, state.get('production'), [i - bar_width for i in index], production,
+                                    bar_width, label='Annual Production', color='b')
+    state['emission_factor'] = _set_bars(ax, state.get('emission_factor'), index, emission_factor,
+                                         bar_width, label='Emission Factor', color='r')
+    state['footprint'] = _set_bars(ax, state.get('footprint'), [i + bar_width for i in index], footprints_mt,
+                                   bar_width, label='Carbon Footprint', color='g')
+
+    ax.set_title(title)
+    _set_xticks(state, index, labels, 45, 'right')
+    _set_legend(state)
+    _set_bar_limits(state, state['production'], state['emission_factor'], state['footprint'])
+    _update_layout(state)
+
+def _footprint_trend_template(state):
+    state['ax'].set_xlabel('Date')
+    state['ax'].set_ylabel('Carbon Footprint (Million Tonnes CO2e)')
+    state['ax'].grid(True)
+
+def _update_footprint_trend(state, dates, footprints_mt, title='Carbon Footprint Trend Over Time'):
+    ax = state['ax']
+    if state.get('line') is None:
+        state['line'], = ax.plot(dates, footprints_mt, marker='o')
+    else:
+        state['line'].set_data(dates, footprints_mt)
+    ax.set_title(title)
+    # Limits from the line's (date-converted) data, the only artist on these axes
+    xy = state['line'].get_xydata()
+    xy = xy[(xy == xy).all(axis=1)]
+    if len(xy):
+        ax.set_xlim(*_padded(xy[:, 0].min(), xy[:, 0].max()))
+        ax.set_ylim(*_padded(xy[:, 1].min(), xy[:, 1].max()))
+    _update_layout(state)
+
+def _pair_comparison_template(state):
+    state['ax'].set_xlabel('Attributes')
+    state['ax'].set_ylabel('Values')
+
+def _update_pair_comparison(state, attributes, values1, values2, label1, label2, title='Comparison of Mine Attributes'):
+    ax = state['ax']
+    x = range(len(attributes))
+    bar_width = 0.35
+    opacity = 0.8
+
+    state['first'] = _set_bars(ax, state.get('first'), [p - bar_width / 2 for p in x], values1, bar_width,
+                               alpha=opacity, color='b', label=label1)
+    state['second'] = _set_bars(ax, state.get('second'), [p + bar_width / 2 for p in x], values2, bar_width,
+                                alpha=opacity, color='r', label=label2)
+
+    ax.set_title(title)
+    _set_xticks(state, x, attributes)
+    _set_legend(state, [label1, label2])
+    _set_bar_limits(state, state['first'], state['second'])
+    _update_layout(state)
+
+def _reduction_bars_template(state):
+    state['ax'].set_xlabel('Mine Name')
+    state['ax'].set_ylabel('Carbon Footprint (Million Tonnes CO2e)')
+
+def _update_reduction_bars(state, labels, original_mt, reduced_mt, title):
+    ax = state['ax']
+    labels = list(labels)
+    index = range(len(labels))
+    bar_width = 0.35
+
+    state['original'] = _set_bars(ax, state.get('original'), index, original_mt, bar_width,
+                                  color='red', label='Previous Carbon Footprint')
+    state['reduced'] = _set_bars(ax, state.get('reduced'), [i + bar_width for i in index], reduced_mt, bar_width,
+                                 color='blue', label='Reduced Carbon Footprint')
+
+    ax.set_title(title)
+    _set_xticks(state, [i + bar_width / 2 for i in index], labels, 90)
+    _set_legend(state)
+    _set_bar_limits(state, state['original'], state['reduced'])
+    _update_layout(state)
+
+def _comparison_heatmap_template(state):
+    state['ax'].set_xlabel('Mine')
+    state['ax'].set_ylabel('Mine')
+
+def _update_comparison_heatmap(state, labels, matrix, title, value_label='Difference'):
+    # matrix[i][j] compares row mine i against column mine j; a diverging colormap centred on zero
+    ax = state['ax']
+    labels = list(labels)
+    matrix = [list(row) for row in matrix]
+    limit = max((abs(value) for row in matrix for value in row if value == value), default=1.0) or 1.0
+    image = state.get('image')
+    if image is not None and image.get_array().shape == (len(matrix), len(labels)):
+        image.set_data(matrix)
+    else:
+        if image is not None:
+            image.remove()
+        image = ax.imshow(matrix, cmap='coolwarm', aspect='auto')
+        state['image'] = image
+    image.set_clim(-limit, limit)
+    if state.get('colorbar') is None:
+        state['colorbar'] = state['fig'].colorbar(image, ax=ax)
+    else:
+        state['colorbar'].update_normal(image)
+    state['colorbar'].set_label(value_label)
+    ax.set_title(title)
+    if state.get('xticks', (None, None))[1] != labels:
+        ax.set_yticks(list(range(len(labels))))
+        ax.set_yticklabels(labels)
+    _set_xticks(state, range(len(labels)), labels, 90)
+    _update_layout(state)
+
+# chart type -> (template, update)
+CHART_TYPES = {
+    'footprint_bars': (_footprint_bars_template, _update_footprint_bars),
+    'attribute_bars': (_attribute_bars_template, _update_attribute_bars),
+    'footprint_trend': (_footprint_trend_template, _update_footprint_trend),
+    'pair_comparison': (_pair_comparison_template, _update_pair_comparison),
+    'reduction_bars': (_reduction_bars_template, _update_reduction_bars),
+    'comparison_heatmap': (_comparison_heatmap_template, _update_comparison_heatmap)
+}
+
+def _plot(chart_type, *args, **kwargs):
+    template, update = CHART_TYPES[chart_type]
+    fig, ax = plt.subplots(figsize=DEFAULT_FIGURE_SIZE)
+    state = {'fig': fig, 'ax': ax}
+    template(state)
+    update(state, *args, **kwargs)
+    return fig
+
+def plot_footprint_bars(labels, footprints_mt, title, rotation=90, ha='center', color=None):
+    return _plot('footprint_bars', labels, footprints_mt, title, rotation, ha, color)
+
+def plot_attribute_bars(labels, production, emission_factor, footprints_mt, title):
+    return _plot('attribute_bars', labels, production, emission_factor, footprints_mt, title)
+
+def plot_footprint_trend(dates, footprints_mt, title='Carbon Footprint Trend Over Time'):
+    return _plot('footprint_trend', dates, footprints_mt, title)
+
+def plot_pair_comparison(attributes, values1, values2, label1, label2, title='Comparison of Mine Attributes'):
+    return _plot('pair_comparison', attributes, values1, values2, label1, label2, title)
+
+def plot_reduction_bars(labels, original_mt, reduced_mt, title):
+    return _plot('reduction_bars', labels, original_mt, reduced_mt, title)
+
+def plot_comparison_heatmap(labels, matrix, title, value_label='Difference'):
+    return _plot('comparison_heatmap', labels, matrix, title, value_label)
+
+class FigurePool:
+    # One reusable figure per chart type. The figures are plain Figure objects that pyplot does not
+    # track, so repeated renders keep memory constant. A returned figure is only valid until the next
+    # render of the same chart type, so save it before rendering again.
+    def __init__(self, figsize=DEFAULT_FIGURE_SIZE):
+        self.figsize = figsize
+        self.states = {}
+
+    def render(self, chart_type, *args, **kwargs):
+        template, update = CHART_TYPES[chart_type]
+        state = self.states.get(chart_type)
+        if state is None:
+            fig = mpl_figure.Figure(figsize=self.figsize)
+            state = {'fig': fig, 'ax': fig.add_subplot()}
+            template(state)
+            self.states[chart_type] = state
+        update(state, *args, **kwargs)
+        return state['fig']
+
+    def close(self):
+        for state in self.states.values():
+            state['fig'].clear()
+        self.states.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,273 @@
+import os
+os.environ['MPLBACKEND'] = 'Agg'  # headless; read when pyplot is first imported
+
+import argparse
+import contextlib
+import shlex
+import sys
+
+from charts import (
+    plot_attribute_bars, plot_comparison_heatmap, plot_footprint_bars, plot_footprint_trend, plot_pair_comparison
+)
+from ingest import DEFAULT_INGEST_CHUNK_SIZE, ingest_csv_files
+from main import (
+    COMPARISON_ATTRIBUTES, FOOTPRINT_COLUMN, CoalMineFootprintCalculator, create_database_and_table
+)
+from postgres_backend import PostgresBackend
+from lazy_imports import LazyModule
+from rollup import TREND_RESOLUTIONS
+from scenarios import reduction_grid
+
+pd = LazyModule('pandas')
+
+# Non-interactive entry point: every menu action as a subcommand that prints JSON or CSV.
+# `batch` runs many subcommands against one loaded dataset, e.g. from a cron job:
+#   python cli.py --db coal_mines.db batch queries.txt
+
+def emit(frame, fmt, out):
+    frame = frame.reset_index() if not isinstance(frame.index, pd.RangeIndex) else frame
+    if fmt == 'csv':
+        frame.to_csv(out, index=False)
+    else:
+        out.write(frame.to_json(orient='records', date_format='iso'))
+        out.write('\n')
+
+def save_chart(calculator, fig, filename):
+    if filename:
+        calculator.finish_figure(fig, filename)
+
+def row_records(data):
+    columns = ['Mine Name', 'Location', 'Annual Production', 'Emission Factor', 'Date', FOOTPRINT_COLUMN]
+    return data[[column for column in columns if column in data.columns]].reset_index(drop=True)
+
+def command_total(calculator, args):
+    summary = calculator.get_mine_summary()
+    if args.chart:
+        save_chart(calculator, plot_footprint_bars(
+            summary.index.get_level_values('Mine Name'), summary[FOOTPRINT_COLUMN] / 1e6,
+            'Carbon Footprint of All Coal Mines'
+        ), args.chart)
+    return summary
+
+def command_state(calculator, args):
+    data = row_records(calculator.fetch_filtered_data(state=args.state, start_date=args.start, end_date=args.end))
+    if args.chart and not data.empty:
+        save_chart(calculator, plot_footprint_bars(
+            data['Mine Name'], data[FOOTPRINT_COLUMN] / 1e6, f'Carbon Footprint of Mines in {args.state}',
+            rotation=45, ha='right', color='b'
+        ), args.chart)
+    return data
+
+def command_mine(calculator, args):
+    data = row_records(calculator.fetch_filtered_data(
+        state=args.state, mine=args.mine, start_date=args.start, end_date=args.end
+    ))
+    if args.chart and not data.empty:
+        save_chart(calculator, plot_attribute_bars(
+            data['Mine Name'], data['Annual Production'], data['Emission Factor'], data[FOOTPRINT_COLUMN] / 1e6,
+            f'Attributes for {args.mine} in {args.state}'
+        ), args.chart)
+    return data
+
+def command_trend(calculator, args):
+    trend = calculator.fetch_trend_data(args.resolution)
+    if args.chart:
+        save_chart(calculator, plot_footprint_trend(
+            trend.index, trend.values / 1e6,
+            f'Carbon Footprint Trend Over Time ({args.resolution.capitalize()})'
+        ), args.chart)
+    return pd.DataFrame({'Date': trend.index, FOOTPRINT_COLUMN: trend.values})
+
+def command_compare(calculator, args):
+    if args.matrix or not args.mine:
+        matrix = calculator.comparison_matrix(args.attribute, args.kind)
+        if args.chart:
+            unit = '%' if args.kind == 'relative' else 'difference'
+            save_chart(calculator, plot_comparison_heatmap(
+                matrix.index, matrix.to_numpy(), f'{args.attribute}: Row Mine vs Column Mine',
+                f'{args.attribute} ({unit})'
+            ), args.chart)
+        matrix.index.name = 'Mine'
+        return matrix
+
+    if len(args.mine) != 2:
+        raise ValueError("Pass --mine STATE MINE exactly twice, or --matrix.")
+    mine1, mine2 = (tuple(key) for key in args.mine)
+    known = calculator.get_mine_summary().index
+    for state, mine in (mine1, mine2):
+        if (state, mine) not in known:
+            raise ValueError(f"No data for mine '{mine}' in '{state}'.")
+    values1, values2 = calculator.compare_mine_pair(mine1, mine2)
+    if args.chart:
+        save_chart(calculator, plot_pair_comparison(COMPARISON_ATTRIBUTES, values1, values2, mine1[1], mine2[1]),
+                   args.chart)
+    return pd.DataFrame([values1, values2], columns=COMPARISON_ATTRIBUTES,
+                        index=pd.MultiIndex.from_tuples([mine1, mine2], names=['Location', 'Mine Name']))
+
+def command_simulate(calculator, args):
+    if args.target is not None:
+        return calculator.optimize_reduction_allocation(args.target, args.max_reduction)
+    if args.grid is not None:
+        return calculator.simulate_reduction_scenarios(reduction_grid(args.grid))
+    if args.reduction is None:
+        raise ValueError("Pass --reduction, --grid or --target.")
+
+    if args.state is None:
+        scenarios = calculator.simulate_reduction_scenarios([args.reduction])
+    else:
+        # One scenario that cuts only the selected state, or one mine within it
+        summary = calculator.get_mine_summary()
+        selected = summary.index.get_level_values('Location') == args.state
+        if args.mine is not None:
+            selected &= summary.index.get_level_values('Mine Name') == args.mine
+        if not selected.any():
+            raise ValueError("No data available for the selected state/mine.")
+        scenarios = calculator.simulate_reduction_scenarios((selected * args.reduction)[None, :].astype(float))
+    scenarios.insert(0, 'Reduction Applied (%)', args.reduction)
+    return scenarios
+
+def command_ingest(calculator, args):
+    if calculator.postgres_backend is not None:
+        rows, seconds = calculator.postgres_backend.copy_csv_files(args.csv_paths, args.chunk_size)
+    else:
+        rows, seconds = ingest_csv_files(calculator.sqlite_database_path, args.csv_paths, args.chunk_size)
+    if calculator.coal_mine_data is not None:
+        calculator.reload_data_from_db()
+    return pd.DataFrame({'rows': [rows], 'seconds': [seconds]})
+
+def add_output_arguments(parser, chart=True):
+    parser.add_argument('--format', choices=('json', 'csv'), default=argparse.SUPPRESS,
+                        help="Output format (default: json)")
+    if chart:
+        parser.add_argument('--chart', metavar='FILE', help="Also save the chart as FILE in --output-dir")
+
+def add_date_arguments(parser):
+    parser.add_argument('--start', help="First date (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Last date (YYYY-MM-DD)")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Coal mine carbon footprint queries without the interactive menu")
+    parser.add_argument('--db', default='coal_mines.db', help="SQLite database path")
+    parser.add_argument('--postgres-dsn', help="Use this PostgreSQL database instead of --db")
+    parser.add_argument('--snapshot-dir', default='.snapshot_cache', help="Columnar snapshot cache directory")
+    parser.add_argument('--output-dir', default='.', help="Directory for --chart files")
+    parser.add_argument('--format', choices=('json', 'csv'), default='json', help="Output format")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    total_parser = subparsers.add_parser('total', help="Production and footprint per mine")
+    add_output_arguments(total_parser)
+    total_parser.set_defaults(handler=command_total)
+
+    state_parser = subparsers.add_parser('state', help="Rows of every mine in a state")
+    state_parser.add_argument('state')
+    add_date_arguments(state_parser)
+    add_output_arguments(state_parser)
+    state_parser.set_defaults(handler=command_state)
+
+    mine_parser = subparsers.add_parser('mine', help="Rows of one mine")
+    mine_parser.add_argument('state')
+    mine_parser.add_argument('mine')
+    add_date_arguments(mine_parser)
+    add_output_arguments(mine_parser)
+    mine_parser.set_defaults(handler=command_mine)
+
+    trend_parser = subparsers.add_parser('trend', help="Footprint over time")
+    trend_parser.add_argument('--resolution', choices=tuple(TREND_RESOLUTIONS), default='daily')
+    add_output_arguments(trend_parser)
+    trend_parser.set_defaults(handler=command_trend)
+
+    compare_parser = subparsers.add_parser('compare', help="Compare two mines, or all mines as a matrix")
+    compare_parser.add_argument('--mine', nargs=2, action='append', metavar=('STATE', 'MINE'),
+                                help="Mine to compare; pass twice")
+    compare_parser.add_argument('--matrix', action='store_true', help="N x N matrix of all mines")
+    compare_parser.add_argument('--attribute', choices=COMPARISON_ATTRIBUTES, default='Carbon Footprint')
+    compare_parser.add_argument('--kind', choices=('difference', 'relative'), default='difference')
+    add_output_arguments(compare_parser)
+    compare_parser.set_defaults(handler=command_compare)
+
+    simulate_parser = subparsers.add_parser('simulate', help="Reduction scenarios and target allocation")
+    simulate_parser.add_argument('--reduction', type=float, help="Production cut in percent")
+    simulate_parser.add_argument('--state', help="Limit --reduction to one state")
+    simulate_parser.add_argument('--mine', help="Limit --reduction to one mine of --state")
+    simulate_parser.add_argument('--grid', type=int, metavar='STEPS', help="Uniform 0-100%% grid with STEPS scenarios")
+    simulate_parser.add_argument('--target', type=float, help="Cheapest per-mine cuts reaching this national cut in percent")
+    simulate_parser.add_argument('--max-reduction', type=float, default=100.0, help="Per-mine cap for --target")
+    add_output_arguments(simulate_parser, chart=False)
+    simulate_parser.set_defaults(handler=command_simulate)
+
+    ingest_parser = subparsers.add_parser('ingest', help="Bulk load CSV files into the database")
+    ingest_parser.add_argument('csv_paths', nargs='+')
+    ingest_parser.add_argument('--chunk-size', type=int, default=DEFAULT_INGEST_CHUNK_SIZE)
+    add_output_arguments(ingest_parser, chart=False)
+    ingest_parser.set_defaults(handler=command_ingest, needs_data=False)
+
+    batch_parser = subparsers.add_parser('batch', help="Run one subcommand per line of FILE ('-' for stdin)")
+    batch_parser.add_argument('file')
+    batch_parser.set_defaults(handler=None)
+    return parser
+
+def run_command(calculator, args, out):
+    # Status messages of the loaders and ingesters go to stderr; only the result is written to out
+    with contextlib.redirect_stdout(sys.stderr):
+        if getattr(args, 'needs_data', True):
+            calculator.load_data_from_db()
+        result = args.handler(calculator, args)
+    emit(result, args.format, out)
+
+def run_batch(parser, calculator, path, out):
+    # The dataset is loaded once and shared by every query; a failing query is reported and skipped
+    lines = sys.stdin if path == '-' else open(path)
+    failures = 0
+    try:
+        for line in lines:
+            argv = shlex.split(line, comments=True)
+            if not argv:
+                continue
+            try:
+                args = parser.parse_args(argv)
+                if args.handler is None:
+                    raise ValueError("Nested batch commands are not supported.")
+                run_command(calculator, args, out)
+            except SystemExit:
+                # argparse has already printed the usage error
+                failures += 1
+                print(f"Query failed: {line.strip()}: invalid arguments", file=sys.stderr)
+            except Exception as e:
+                failures += 1
+                print(f"Query failed: {line.strip()}: {e}", file=sys.stderr)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    return failures
+
+def main(argv=None, out=None):
+    out = out or sys.stdout
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # stdout carries only the JSON/CSV results, so it can be piped into another program
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.postgres_dsn:
+            backend = PostgresBackend(args.postgres_dsn)
+            backend.create_table()
+            calculator = CoalMineFootprintCalculator(postgres_backend=backend, output_dir=args.output_dir,
+                                                     headless=True)
+        else:
+            create_database_and_table(args.db)
+            calculator = CoalMineFootprintCalculator(
+                sqlite_database_path=args.db, snapshot_dir=args.snapshot_dir, output_dir=args.output_dir,
+                headless=True
+            )
+    if args.handler is None:
+        # --format given before `batch` becomes the default of every query in the file
+        parser.set_defaults(format=args.format)
+        return 1 if run_batch(parser, calculator, args.file, out) else 0
+    try:
+        run_command(calculator, args, out)
+    except (ValueError, KeyError) as e:
+        # Bad input is reported like a failed batch query rather than as a traceback
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import argparse
+import io
+import sqlite3
+import time
+
+from data_sources import COAL_DIRECTORY_URL
+from ingest import configure_bulk_pragmas, ensure_natural_key, upsert_records
+from lazy_imports import LazyModule, module_available
+from rollup import ensure_rollup
+from source_tables import clean_cell, records_frame, table_records
+
+bs4 = LazyModule('bs4')
+lxml_etree = LazyModule('lxml.etree')
+
+# Rows buffered before they are upserted
+DEFAULT_BATCH_ROWS = 20_000
+# Headings give the unit ("... in Million Tonnes") for the tables that follow them
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+CELL_TAGS = ('td', 'th')
+
+def as_stream(source):
+    # HTML as bytes or a path -> binary file object
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return open(source, 'rb')
+
+def element_text(element):
+    return clean_cell(''.join(element.itertext()))
+
+def iter_tables_lxml(source):
+    # Incremental lxml parse: yields (rows, context) per table as soon as its closing tag is read, then frees
+    # the table and everything before it, so memory stays flat however large the page is
+    context = ''
+    with as_stream(source) as stream:
+        for _, element in lxml_etree.iterparse(stream, events=('end',), tag=HEADING_TAGS + ('table',), html=True,
+                                               recover=True, huge_tree=True):
+            if element.tag in HEADING_TAGS:
+                context = element_text(element)
+                continue
+            if element.xpath('ancestor::table'):
+                continue  # nested layout tables are read as part of their outer table
+            caption = element.find('caption')
+            rows = [[element_text(cell) for cell in row if cell.tag in CELL_TAGS] for row in element.iter('tr')]
+            yield rows, ' '.join(text for text in (element_text(caption) if caption is not None else '', context)
+                                 if text)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+def iter_tables_soup(source, parser=None):
+    # BeautifulSoup fallback restricted by a SoupStrainer to headings and tables; uses lxml when installed
+    parser = parser or ('lxml' if module_available('lxml') else 'html.parser')
+    with as_stream(source) as stream:
+        soup = bs4.BeautifulSoup(stream, parser, parse_only=bs4.SoupStrainer(HEADING_TAGS + ('table',)))
+    context = ''
+    for element in soup.find_all(HEADING_TAGS + ('table',)):
+        if element.name in HEADING_TAGS:
+            context = clean_cell(element.get_text(' '))
+            continue
+        if element.find_parent('table') is not None:
+            continue
+        caption = element.find('caption')
+        rows = [[clean_cell(cell.get_text(' ')) for cell in row.find_all(CELL_TAGS)] for row in element.find_all('tr')]
+        yield rows, ' '.join(text for text in (clean_cell(caption.get_text(' ')) if caption else '', context) if text)
+
+def iter_tables(source):
+    return iter_tables_lxml(source) if module_available('lxml') else iter_tables_soup(source)
+
+def scrape_records(source, default_unit_scale=1.0):
+    # Every mine table on the page as coal_mines records, production in million tonnes
+    for rows, context in iter_tables(source):
+        yield from table_records(rows, context, default_unit_scale)
+
+def scrape_to_db(sources, db_path, emission_factor=None, batch_rows=DEFAULT_BATCH_ROWS, default_unit_scale=1.0):
+    # Upsert the records of every page in one transaction, batch_rows at a time
+    start = time.perf_counter()
+    rows = 0
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        configure_bulk_pragmas(conn)
+        conn.execute("BEGIN;")
+        try:
+            ensure_natural_key(conn.cursor())
+            ensure_rollup(conn.cursor())
+            pending_records = []
+            for source in sources:
+                for record in scrape_records(source, default_unit_scale):
+                    pending_records.append(record)
+                    if len(pending_records) >= batch_rows:
+                        rows += upsert_records(conn, records_frame(pending_records, emission_factor))
+                        pending_records.clear()
+            if pending_records:
+                rows += upsert_records(conn, records_frame(pending_records, emission_factor))
+            conn.execute("COMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            raise
+    finally:
+        conn.close()
+
+    seconds = time.perf_counter() - start
+    print(f"Upserted {rows} rows from {len(sources)} page(s) in {seconds:.2f}s.")
+    return rows, seconds
+
+if __name__ == "__main__":
+    from fetcher import CachedFetcher
+    from main import create_database_and_table
+
+    parser = argparse.ArgumentParser(description="Load mine production tables from Coal Directory HTML pages")
+    parser.add_argument('sources', nargs='*', default=[COAL_DIRECTORY_URL], help="URLs or saved HTML files")
+    parser.add_argument('--pages', type=int, help="Follow ?page=0..N-1 of each URL, stopping at a missing page")
+    parser.add_argument('--db', default='coal_mines.db', help="SQLite database path")
+    parser.add_argument('--emission-factor', type=float,
+                        help="Emission factor (tCO2e/tonne) for rows whose table does not give one")
+    parser.add_argument('--unit-scale', type=float, default=1.0,
+                        help="Factor to million tonnes for tables that state no unit")
+    args = parser.parse_args()
+
+    pages = []
+    fetcher = CachedFetcher()
+    try:
+        for source in args.sources:
+            if source.startswith(('http://', 'https://')):
+                results = fetcher.fetch_paginated(source, max_pages=args.pages) if args.pages else [fetcher.fetch(source)]
+                pages.extend(result['content'] for result in results)
+            else:
+                pages.append(source)
+    finally:
+        fetcher.close()
+
+    create_database_and_table(args.db)
+    scrape_to_db(pages, args.db, args.emission_factor, default_unit_scale=args.unit_scale)
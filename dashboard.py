@@ -0,0 +1,378 @@
+import matplotlib
+matplotlib.use('Agg')  # charts are rendered in request handlers, never shown
+
+import hashlib
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from flask import Flask, Response, abort, jsonify, render_template, request, url_for
+
+from batch_render import render_chart_bytes
+from main import FOOTPRINT_COLUMN, CoalMineFootprintCalculator, create_database_and_table
+from rollup import TREND_RESOLUTIONS
+
+DEFAULT_DB_PATH = 'coal_mines.db'
+DEFAULT_SNAPSHOT_DIR = '.snapshot_cache'
+CHART_CACHE_SIZE = 512
+DEFAULT_RENDER_WORKERS = 4
+# Seconds a chart request long-polls for its render before getting a job handle instead
+DEFAULT_RENDER_WAIT = 5.0
+MAX_RENDER_WAIT = 30.0
+JOB_HISTORY_SIZE = 4096
+# Renders queued or running at once; further chart requests get 503 until some finish
+MAX_PENDING_RENDERS = 64
+# Seconds a client is asked to wait before retrying a chart the render queue had no room for
+RENDER_BUSY_RETRY_AFTER = 5
+CHART_MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+def job_id_for(key):
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+
+class RenderQueueFull(Exception):
+    pass
+
+class RenderQueue:
+    # Bounded pool of render processes, so matplotlib never runs in (or blocks) a web worker thread.
+    # Requests for a chart that is already being rendered join the in-flight job instead of
+    # starting another one.
+    def __init__(self, workers=DEFAULT_RENDER_WORKERS, on_done=None, max_pending=MAX_PENDING_RENDERS):
+        # spawn rather than fork: the web server is multithreaded by the time the first job starts
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.on_done = on_done
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.jobs = OrderedDict()  # job id -> (key, future), kept for polling after completion
+
+    def submit(self, key, build):
+        # Returns (job id, future); build() prepares (chart type, args, format) and only runs for new jobs.
+        # Raises RenderQueueFull when max_pending renders are already queued or running.
+        with self.lock:
+            if key in self.in_flight:
+                return self.in_flight[key]
+        # Built outside the lock so a slow build never holds up other requests; if another request
+        # started the same job meanwhile, that job is joined and this build is dropped
+        chart_type, args, fmt = build()
+        with self.lock:
+            if key in self.in_flight:
+                return self.in_flight[key]
+            if len(self.in_flight) >= self.max_pending:
+                raise RenderQueueFull(f"{len(self.in_flight)} renders already pending.")
+            job_id = job_id_for(key)
+            future = self.executor.submit(render_chart_bytes, chart_type, args, fmt)
+            self.in_flight[key] = (job_id, future)
+            self.jobs[job_id] = (key, future)
+            self.jobs.move_to_end(job_id)
+            while len(self.jobs) > JOB_HISTORY_SIZE:
+                self.jobs.popitem(last=False)
+        future.add_done_callback(lambda done: self.finish(key, done))
+        return job_id, future
+
+    def finish(self, key, future):
+        if self.on_done is not None and not future.cancelled() and future.exception() is None:
+            self.on_done(key, future.result())
+        with self.lock:
+            self.in_flight.pop(key, None)
+
+    def lookup(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class DashboardCache:
+    # Warm in-process cache for the dashboard: aggregates and rendered charts are keyed on the
+    # calculator's data version, so they are rebuilt only after the underlying data changes
+    def __init__(self, calculator, chart_cache_size=CHART_CACHE_SIZE, render_workers=DEFAULT_RENDER_WORKERS):
+        self.calculator = calculator
+        self.chart_cache_size = chart_cache_size
+        self.lock = threading.Lock()
+        # Serializes reloads; a reload that starts after a request was made also answers it
+        self.reload_lock = threading.Lock()
+        self.reloads_started = 0
+        self.render_queue = RenderQueue(render_workers, on_done=self.store_chart)
+        self.summary_version = None
+        self.summary = None
+        self.charts = OrderedDict()
+
+    def data_version(self):
+        return self.calculator.data_version
+
+    def reload(self):
+        # Load the database into a fresh calculator while requests keep reading the current one, then swap it in.
+        # Reloads run one at a time; a reload that started after this call did, and so has finished by the time
+        # the lock is free, already read every row this call would, and is not repeated.
+        requested = self.reloads_started
+        with self.reload_lock:
+            if self.reloads_started > requested:
+                return self.data_version()
+            self.reloads_started += 1
+            current = self.calculator
+            fresh = CoalMineFootprintCalculator(
+                sqlite_database_path=current.sqlite_database_path, snapshot_dir=current.snapshot_dir,
+                compact=current.compact, headless=True
+            )
+            # Versions keep increasing across calculators, so caches keyed on the old data never match again
+            fresh.data_version = current.data_version
+            fresh.load_data_from_db()
+            with self.lock:
+                self.calculator = fresh
+            return fresh.data_version
+
+    def get_summary(self):
+        with self.lock:
+            if self.summary_version != self.data_version():
+                self.summary = self.build_summary()
+                self.summary_version = self.data_version()
+            return self.summary
+
+    def build_summary(self):
+        self.calculator.ensure_footprint()
+        data = self.calculator.coal_mine_data
+        by_mine = data.groupby(['Location', 'Mine Name'], observed=True, sort=True).agg(
+            annual_production=('Annual Production', 'sum'),
+            emission_factor=('Emission Factor', 'mean'),
+            footprint=(FOOTPRINT_COLUMN, 'sum'),
+            rows=(FOOTPRINT_COLUMN, 'size')
+        )
+        by_state = by_mine.groupby(level='Location', observed=True).agg(
+            annual_production=('annual_production', 'sum'),
+            footprint=('footprint', 'sum'),
+            mines=('footprint', 'size'),
+            rows=('rows', 'sum')
+        )
+        totals = {
+            'rows': int(len(data)),
+            'mines': int(len(by_mine)),
+            'states': int(len(by_state)),
+            'total_production': float(data['Annual Production'].sum()),
+            'total_footprint': float(data[FOOTPRINT_COLUMN].sum())
+        }
+        return {'totals': totals, 'by_state': by_state, 'by_mine': by_mine, 'trend': {}, 'json': {}}
+
+    def get_trend(self, resolution):
+        summary = self.get_summary()
+        with self.lock:
+            if resolution not in summary['trend']:
+                summary['trend'][resolution] = self.calculator.fetch_trend_data(resolution)
+            return summary['trend'][resolution]
+
+    def get_json(self, key, build):
+        # Serialized JSON bodies live alongside the summary, so they expire with the same data version
+        summary = self.get_summary()
+        with self.lock:
+            body = summary['json'].get(key)
+        if body is None:
+            body = json.dumps(build()).encode()
+            with self.lock:
+                summary['json'][key] = body
+        return body
+
+    def chart_key(self, key):
+        # Charts are keyed on the data version so stale renders are never served
+        return (self.data_version(),) + key
+
+    def cached_chart(self, versioned_key):
+        with self.lock:
+            content = self.charts.get(versioned_key)
+            if content is not None:
+                self.charts.move_to_end(versioned_key)
+            return content
+
+    def store_chart(self, versioned_key, content):
+        with self.lock:
+            self.charts[versioned_key] = content
+            while len(self.charts) > self.chart_cache_size:
+                self.charts.popitem(last=False)
+
+    def get_chart(self, key, build, timeout=DEFAULT_RENDER_WAIT):
+        # Returns (job id, bytes or None): the cached chart, or the chart rendered within timeout,
+        # otherwise None and the job id to poll
+        versioned_key = self.chart_key(key)
+        content = self.cached_chart(versioned_key)
+        if content is not None:
+            return job_id_for(versioned_key), content
+        job_id, future = self.render_queue.submit(versioned_key, build)
+        return job_id, self.wait_for_job(future, timeout)
+
+    def wait_for_job(self, future, timeout):
+        done, _ = wait([future], timeout=timeout)
+        if not done:
+            return None
+        return future.result()
+
+def records(frame):
+    return json.loads(frame.reset_index().to_json(orient='records'))
+
+def mine_record(state, mine, summary):
+    return {
+        'state': state,
+        'mine': mine,
+        'annual_production': float(summary['annual_production']),
+        'emission_factor': float(summary['emission_factor']),
+        'footprint': float(summary['footprint']),
+        'rows': int(summary['rows'])
+    }
+
+def create_app(db_path=DEFAULT_DB_PATH, snapshot_dir=DEFAULT_SNAPSHOT_DIR, render_workers=DEFAULT_RENDER_WORKERS):
+    app = Flask(__name__)
+
+    # Data is loaded once at startup; everything else is served from the warm cache
+    calculator = CoalMineFootprintCalculator(sqlite_database_path=db_path, snapshot_dir=snapshot_dir, headless=True)
+    calculator.load_data_from_db()
+    cache = DashboardCache(calculator, render_workers=render_workers)
+    app.config['DASHBOARD_CACHE'] = cache
+
+    def mine_summary(state, mine):
+        by_mine = cache.get_summary()['by_mine']
+        if (state, mine) not in by_mine.index:
+            abort(404, description=f"No data for mine '{mine}' in '{state}'.")
+        return by_mine.loc[(state, mine)]
+
+    def state_summary(state):
+        by_mine = cache.get_summary()['by_mine']
+        if state not in by_mine.index.get_level_values('Location'):
+            abort(404, description=f"No data for state '{state}'.")
+        return by_mine.xs(state, level='Location')
+
+    def trend_resolution():
+        resolution = request.args.get('resolution', 'daily')
+        if resolution not in TREND_RESOLUTIONS:
+            abort(400, description=f"resolution must be one of: {', '.join(TREND_RESOLUTIONS)}.")
+        return resolution
+
+    def json_response(key, build):
+        return Response(cache.get_json(key, build), mimetype='application/json')
+
+    def render_wait():
+        try:
+            return min(max(float(request.args.get('wait', DEFAULT_RENDER_WAIT)), 0.0), MAX_RENDER_WAIT)
+        except ValueError:
+            abort(400, description="wait must be a number of seconds.")
+
+    def pending_response(job_id):
+        response = jsonify(job=job_id, status='pending', poll=url_for('chart_job', job_id=job_id))
+        response.status_code = 202
+        response.headers['Retry-After'] = '1'
+        return response
+
+    def busy_response(error):
+        response = jsonify(status='busy', error=str(error))
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RENDER_BUSY_RETRY_AFTER)
+        return response
+
+    def chart_response(key, fmt, build):
+        if fmt not in CHART_MIMETYPES:
+            abort(404)
+        try:
+            job_id, content = cache.get_chart(key + (fmt,), lambda: build() + (fmt,), render_wait())
+        except RenderQueueFull as e:
+            return busy_response(e)
+        if content is None:
+            return pending_response(job_id)
+        return Response(content, mimetype=CHART_MIMETYPES[fmt])
+
+    @app.route('/')
+    def index():
+        summary = cache.get_summary()
+        return render_template('dashboard.html', totals=summary['totals'],
+                               states=list(summary['by_state'].index), resolutions=list(TREND_RESOLUTIONS))
+
+    @app.route('/api/totals')
+    def totals():
+        return json_response(('totals',), lambda: dict(cache.get_summary()['totals'], data_version=cache.data_version()))
+
+    @app.route('/api/states')
+    def states():
+        return json_response(('states',), lambda: records(cache.get_summary()['by_state']))
+
+    @app.route('/api/states/<state>/mines')
+    def state_mines(state):
+        return json_response(('state', state), lambda: records(state_summary(state)))
+
+    @app.route('/api/mines/<state>/<mine>')
+    def mine(state, mine):
+        return json_response(('mine', state, mine), lambda: mine_record(state, mine, mine_summary(state, mine)))
+
+    @app.route('/api/trend')
+    def trend():
+        resolution = trend_resolution()
+        return json_response(('trend', resolution), lambda: [
+            {'date': date.strftime('%Y-%m-%d'), 'footprint': float(value)}
+            for date, value in cache.get_trend(resolution).items()
+        ])
+
+    @app.route('/api/reload', methods=['POST'])
+    def reload():
+        # Pick up rows ingested by other processes; bumps the data version and so invalidates the caches
+        return jsonify(data_version=cache.reload())
+
+    @app.route('/charts/total.<fmt>')
+    def total_chart(fmt):
+        def build():
+            by_mine = cache.get_summary()['by_mine']
+            return 'footprint_bars', (
+                by_mine.index.get_level_values('Mine Name').tolist(), (by_mine['footprint'] / 1e6).tolist(),
+                'Carbon Footprint of All Coal Mines'
+            )
+        return chart_response(('total',), fmt, build)
+
+    @app.route('/charts/states/<state>.<fmt>')
+    def state_chart(state, fmt):
+        def build():
+            mines = state_summary(state)
+            return 'footprint_bars', (
+                mines.index.tolist(), (mines['footprint'] / 1e6).tolist(),
+                f'Carbon Footprint of Mines in {state}', 45, 'right', 'b'
+            )
+        return chart_response(('state', state), fmt, build)
+
+    @app.route('/charts/mines/<state>/<mine>.<fmt>')
+    def mine_chart(state, mine, fmt):
+        def build():
+            summary = mine_summary(state, mine)
+            return 'attribute_bars', (
+                [mine], [summary['annual_production']], [summary['emission_factor']], [summary['footprint'] / 1e6],
+                f'Attributes for {mine} in {state}'
+            )
+        return chart_response(('mine', state, mine), fmt, build)
+
+    @app.route('/charts/trend.<fmt>')
+    def trend_chart(fmt):
+        resolution = trend_resolution()
+        def build():
+            trend_data = cache.get_trend(resolution)
+            return 'footprint_trend', (
+                list(trend_data.index), (trend_data.values / 1e6).tolist(),
+                f'Carbon Footprint Trend Over Time ({resolution.capitalize()})'
+            )
+        return chart_response(('trend', resolution), fmt, build)
+
+    @app.route('/charts/jobs/<job_id>')
+    def chart_job(job_id):
+        # Poll (wait=0) or long-poll (wait=N seconds) a chart render handed out with a 202 response
+        job = cache.render_queue.lookup(job_id)
+        if job is None:
+            abort(404, description=f"Unknown render job '{job_id}'.")
+        versioned_key, future = job
+        fmt = versioned_key[-1]
+        content = cache.cached_chart(versioned_key)
+        if content is None:
+            try:
+                content = cache.wait_for_job(future, render_wait())
+            except Exception as e:
+                abort(500, description=f"Rendering failed: {e}")
+        if content is None:
+            return pending_response(job_id)
+        return Response(content, mimetype=CHART_MIMETYPES[fmt])
+
+    return app
+
+if __name__ == "__main__":
+    create_database_and_table(DEFAULT_DB_PATH)
+    create_app().run(threaded=True)
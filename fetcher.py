@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from data_sources import COAL_DIRECTORY_URL, NITI_AAYOG_URL
+from lazy_imports import LazyModule
+
+requests = LazyModule('requests')
+requests_adapters = LazyModule('requests.adapters')
+
+DEFAULT_HTTP_CACHE_DIR = '.http_cache'
+# A cached response younger than this is served without contacting the server
+DEFAULT_TTL_SECONDS = 6 * 3600
+# Entries not downloaded or revalidated for this long are evicted; until then an expired entry is
+# still revalidated with a conditional request instead of being downloaded again
+DEFAULT_MAX_CACHE_AGE_SECONDS = 7 * 24 * 3600
+# Storing a new entry evicts expired ones, scanning the cache directory at most this often
+DEFAULT_EVICTION_INTERVAL_SECONDS = 3600
+# Concurrent requests, which is also the size of the session's connection pool
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_RETRIES = 3
+# Safety limit for paginated directories that never return an empty page
+DEFAULT_MAX_PAGES = 200
+USER_AGENT = 'coal-mine-footprint-calculator'
+
+def cache_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+def write_atomic(path, data):
+    # Unique temporary file, so concurrent fetches of the same URL never interleave their writes
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def page_url(url, page_param, page):
+    return requests.Request('GET', url, params={page_param: page}).prepare().url
+
+class CachedFetcher:
+    # GETs through one pooled requests.Session with an on-disk response cache. Every fetch returns a dict
+    # with the url, the content (bytes) and how it was obtained:
+    #   'cached'      - younger than ttl, no request made
+    #   'revalidated' - the server answered 304 to If-None-Match / If-Modified-Since
+    #   'downloaded'  - full 200 response, now cached with its ETag / Last-Modified
+    def __init__(self, cache_dir=DEFAULT_HTTP_CACHE_DIR, ttl=DEFAULT_TTL_SECONDS,
+                 max_cache_age=DEFAULT_MAX_CACHE_AGE_SECONDS, max_workers=DEFAULT_MAX_WORKERS,
+                 timeout=DEFAULT_TIMEOUT_SECONDS, retries=DEFAULT_RETRIES,
+                 eviction_interval=DEFAULT_EVICTION_INTERVAL_SECONDS):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_cache_age = max_cache_age
+        self.eviction_interval = eviction_interval
+        self.last_eviction = None
+        self.eviction_lock = threading.Lock()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.session = None
+
+    def get_session(self):
+        if self.session is None:
+            session = requests.Session()
+            # Keep-alive connections for up to max_workers concurrent requests per host
+            adapter = requests_adapters.HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers,
+                                                    max_retries=self.retries)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            self.session = session
+        return self.session
+
+    def cache_paths(self, url):
+        key = cache_key(url)
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def read_cache(self, url):
+        meta_path, body_path = self.cache_paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def write_cache(self, url, meta, content=None):
+        # The body is written before its metadata, so a readable entry always has a complete body
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self.cache_paths(url)
+        new_entry = not os.path.exists(meta_path)
+        if content is not None:
+            write_atomic(body_path, content)
+        write_atomic(meta_path, json.dumps(meta).encode())
+        if new_entry:
+            # The cache only grows here, so this is where it is trimmed
+            self.evict_if_due()
+
+    def evict_if_due(self):
+        with self.eviction_lock:
+            now = time.time()
+            if self.last_eviction is not None and now - self.last_eviction < self.eviction_interval:
+                return 0
+            self.last_eviction = now
+        return self.evict_expired()
+
+    def fetch(self, url, params=None):
+        if params:
+            url = requests.Request('GET', url, params=params).prepare().url
+        meta, content = self.read_cache(url)
+        now = time.time()
+        if meta is not None and now - meta['fetched_at'] < self.ttl:
+            return {'url': url, 'content': content, 'source': 'cached'}
+
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        response = self.get_session().get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and meta is not None:
+            meta['fetched_at'] = now
+            self.write_cache(url, meta)
+            return {'url': url, 'content': content, 'source': 'revalidated'}
+
+        response.raise_for_status()
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': now
+        }
+        self.write_cache(url, meta, response.content)
+        return {'url': url, 'content': response.content, 'source': 'downloaded'}
+
+    def fetch_page(self, url):
+        # As fetch, but None for a missing (404) page
+        try:
+            return self.fetch(url)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def fetch_many(self, urls, missing_ok=False):
+        # At most max_workers requests in flight; results are returned in the order of urls
+        fetch = self.fetch_page if missing_ok else self.fetch
+        urls = list(urls)
+        if self.max_workers <= 1 or len(urls) <= 1:
+            return [fetch(url) for url in urls]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            return list(executor.map(fetch, urls))
+
+    def fetch_paginated(self, url, page_param='page', first_page=0, max_pages=DEFAULT_MAX_PAGES, is_last_page=None):
+        # Fetch ?page=first_page, first_page+1, ... in windows of max_workers pages until a page is missing
+        # (404) or is_last_page(content) is true; returns the results up to and including that page
+        results = []
+        last = first_page + max_pages
+        for start in range(first_page, last, self.max_workers):
+            window = range(start, min(start + self.max_workers, last))
+            for result in self.fetch_many([page_url(url, page_param, page) for page in window], missing_ok=True):
+                if result is None:
+                    return results
+                results.append(result)
+                if is_last_page is not None and is_last_page(result['content']):
+                    return results
+        return results
+
+    def evict_expired(self):
+        # Remove entries that have not been downloaded or revalidated within max_cache_age
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        cutoff = time.time() - self.max_cache_age
+        evicted = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            try:
+                with open(meta_path) as f:
+                    expired = json.load(f)['fetched_at'] < cutoff
+            except (OSError, ValueError, KeyError):
+                expired = True  # unreadable entries are dropped as well
+            if expired:
+                for path in (meta_path, meta_path[:-len('.json')] + '.body'):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass  # already evicted by a concurrent fetch
+                evicted += 1
+        return evicted
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch source pages into the local HTTP cache")
+    parser.add_argument('urls', nargs='*', default=[COAL_DIRECTORY_URL, NITI_AAYOG_URL],
+                        help="Pages to fetch (default: the Coal Directory and the NITI Aayog dashboard)")
+    parser.add_argument('--pages', type=int, help="Follow ?page=0..N-1 of each URL, stopping at a missing page")
+    parser.add_argument('--cache-dir', default=DEFAULT_HTTP_CACHE_DIR)
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL_SECONDS, help="Seconds a response is served from cache")
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent requests")
+    args = parser.parse_args()
+
+    fetcher = CachedFetcher(args.cache_dir, args.ttl, max_workers=args.workers)
+    try:
+        evicted = fetcher.evict_expired()
+        if evicted:
+            print(f"Evicted {evicted} expired cache entries.")
+        if args.pages:
+            results = [result for url in args.urls for result in fetcher.fetch_paginated(url, max_pages=args.pages)]
+        else:
+            results = fetcher.fetch_many(args.urls)
+        for result in results:
+            print(f"{result['source']:>11} {len(result['content']):>10} bytes  {result['url']}")
+    finally:
+        fetcher.close()
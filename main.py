@@ -1,22 +1,37 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
 import sqlite3
 import datetime
 
+from lazy_imports import LazyModule
+
+# Heavy libraries load on first use, so e.g. ingest or leaving the menu never pays for them
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+plt = LazyModule('matplotlib.pyplot')
+
+from charts import (
+    DEFAULT_FIGURE_SIZE, plot_attribute_bars, plot_comparison_heatmap, plot_footprint_bars, plot_footprint_trend,
+    plot_pair_comparison, plot_reduction_bars
+)
+
+from ingest import ensure_natural_key, ingest_dataframe
+from mine_registry import MineRegistry, order_by_mine
+from postgres_backend import COAL_MINE_SELECT_POSTGRES, PostgresBackend
+from rollup import TREND_RESOLUTIONS, ensure_rollup, fetch_trend, rollup_table_exists
+from scenarios import allocate_reductions, evaluate_reduction_scenarios, group_footprints, summarize_scenarios
+from snapshot_cache import read_snapshot, write_snapshot
+from uncertainty import (
+    DEFAULT_EMISSION_FACTOR_RSD, DEFAULT_PRODUCTION_RSD, DEFAULT_SAMPLES, propagate_footprint_uncertainty
+)
+
 # Constants
 TONNES_PER_MILLION_TONNES = 1e6
-DEFAULT_FIGURE_SIZE = (12, 6)
-
-# Dictionary mapping states to their coal mines
-INDIAN_STATES_MINES = {
-    'Jharkhand': ['Jharia', 'Karanpura', 'Bokaro Colliery'],
-    'Chhattisgarh': ['Gevra', 'Dipka', 'Kusmunda', 'Mand-Raigarh'],
-    'Madhya Pradesh': ['Nigahi', 'Jayant', 'Dudhichua', 'Umaria'],
-    'West Bengal': ['Raniganj Coalfield'],
-    'Maharashtra': ['Ghugus', 'Wani', 'Ballarpur Colliery'],
-    'Odisha': ['Talcher Coalfield', 'Ib Valley Coalfield', 'Jagannath'],
-    'Telangana': ['Kothagudem Coalfield', 'Ramagundam']
-}
+FOOTPRINT_COLUMN = 'Carbon Footprint (tCO2e)'
+DEFAULT_CHUNK_SIZE = 100_000
+# Per-mine attributes shown when comparing mines; the footprint is in million tonnes CO2e
+COMPARISON_ATTRIBUTES = ['Annual Production', 'Emission Factor', 'Carbon Footprint']
+# Largest relative error accepted when narrowing float64 columns to float32
+FLOAT32_RELATIVE_TOLERANCE = 1e-6
 
 def create_database_and_table(db_path):
     conn = sqlite3.connect(db_path)
@@ -30,6 +45,7 @@ def create_database_and_table(db_path):
         print("Creating coal_mines table...")
         cursor.execute("""
             CREATE TABLE coal_mines (
+                id INTEGER PRIMARY KEY,
                 mine_name TEXT,
                 location TEXT,
                 annual_production REAL,
@@ -68,22 +84,164 @@ def create_database_and_table(db_path):
         print("Table created and sample data inserted.")
     else:
         print("coal_mines table already exists.")
-    
+
+    # Indexes are created for existing databases too, so per-state / per-mine queries avoid full scans
+    create_indexes(cursor)
+
+    # Materialized per-date rollup for trend charts; built once here, then kept current by ingest
+    ensure_rollup(cursor)
+    conn.commit()
     conn.close()
 
-def fetch_coal_mine_data_sqlite(conn):
-    query = """
+def create_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_coal_mines_location_mine ON coal_mines (location, mine_name);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_coal_mines_date ON coal_mines (date);")
+    # Unique (mine_name, location, date), so re-ingesting the same data updates rows instead of adding them
+    ensure_natural_key(cursor)
+
+COAL_MINE_SELECT = """
     SELECT mine_name AS "Mine Name", location AS "Location",
            annual_production AS "Annual Production", emission_factor AS "Emission Factor", date AS "Date"
     FROM coal_mines
     """
-    df = pd.read_sql_query(query, conn)
+
+def fetch_coal_mine_data_sqlite(conn, compact=False):
+    df = pd.read_sql_query(COAL_MINE_SELECT, conn)
+    if compact:
+        df = compact_coal_mine_data(df)
     return df
 
+def downcast_float_column(series, rtol=FLOAT32_RELATIVE_TOLERANCE):
+    # Narrow to float32 only if every value survives the round trip within rtol
+    values = series.to_numpy(dtype=np.float64)
+    narrowed = values.astype(np.float32)
+    if np.allclose(narrowed.astype(np.float64), values, rtol=rtol, atol=0, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+def compact_coal_mine_data(df):
+    # Categoricals for repeated names/locations, datetime64 dates and float32 numerics
+    df = df.copy()
+    for column in ('Mine Name', 'Location'):
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    for column in ('Annual Production', 'Emission Factor'):
+        if column in df.columns:
+            df[column] = downcast_float_column(pd.to_numeric(df[column], errors='coerce'))
+    return df
+
+def memory_per_row(df):
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(deep=True).sum() / len(df)
+
+def build_coal_mine_filter(state=None, mine=None, start_date=None, end_date=None, placeholder='?'):
+    # Parameterized WHERE clause; the column order matches idx_coal_mines_location_mine.
+    # placeholder is '?' for sqlite3 and '%s' for psycopg2
+    clauses = []
+    params = []
+    if state is not None:
+        clauses.append(f"location = {placeholder}")
+        params.append(state)
+    if mine is not None:
+        clauses.append(f"mine_name = {placeholder}")
+        params.append(mine)
+    if start_date is not None:
+        clauses.append(f"date >= {placeholder}")
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append(f"date <= {placeholder}")
+        params.append(str(end_date))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+def fetch_coal_mine_data_filtered(conn, state=None, mine=None, start_date=None, end_date=None):
+    where, params = build_coal_mine_filter(state, mine, start_date, end_date)
+    df = pd.read_sql_query(COAL_MINE_SELECT + where, conn, params=params)
+    return df
+
+def compute_footprint(production, emission_factor):
+    # Vectorized footprint over whole columns: production (million tonnes) x emission factor x tonnes
+    production = np.asarray(production, dtype=np.float64)
+    emission_factor = np.asarray(emission_factor, dtype=np.float64)
+    return production * emission_factor * TONNES_PER_MILLION_TONNES
+
+def add_footprint_column(df, column=FOOTPRINT_COLUMN):
+    # Single footprint engine used by every view instead of a row-wise DataFrame.apply
+    df[column] = compute_footprint(df['Annual Production'].to_numpy(), df['Emission Factor'].to_numpy())
+    return df
+
+def fetch_coal_mine_data_postgres(backend, state=None, mine=None, start_date=None, end_date=None):
+    # Streams through a server-side cursor on a pooled connection; see postgres_backend
+    where, params = build_coal_mine_filter(state, mine, start_date, end_date, placeholder='%s')
+    return backend.fetch_dataframe(COAL_MINE_SELECT_POSTGRES + where, params)
+
+def iter_coal_mine_data_sqlite(conn, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Stream the table in bounded chunks instead of materializing every row at once
+    return pd.read_sql_query(COAL_MINE_SELECT, conn, chunksize=chunk_size)
+
+def aggregate_coal_mine_chunks(chunks):
+    # Incremental aggregations over a stream of chunks; only the running totals are kept in memory
+    total_production = 0.0
+    total_footprint = 0.0
+    row_count = 0
+    by_state = pd.Series(dtype=np.float64)
+    by_date = pd.DataFrame(columns=['production', 'emission_factor_sum', 'rows'], dtype=np.float64)
+
+    for chunk in chunks:
+        footprint = compute_footprint(chunk['Annual Production'].to_numpy(), chunk['Emission Factor'].to_numpy())
+        chunk = chunk.assign(**{FOOTPRINT_COLUMN: footprint})
+        total_production += float(np.nansum(chunk['Annual Production'].to_numpy()))
+        total_footprint += float(np.nansum(footprint))
+        row_count += len(chunk)
+
+        by_state = by_state.add(chunk.groupby('Location')[FOOTPRINT_COLUMN].sum(), fill_value=0)
+        chunk_by_date = chunk.groupby('Date').agg(
+            production=('Annual Production', 'sum'),
+            emission_factor_sum=('Emission Factor', 'sum'),
+            rows=('Emission Factor', 'count')
+        )
+        by_date = chunk_by_date if by_date.empty else by_date.add(chunk_by_date, fill_value=0)
+
+    # Same definition as visualize_trend_analysis: total production x mean emission factor per date
+    by_date = by_date.sort_index()
+    mean_emission_factor = by_date['emission_factor_sum'] / by_date['rows']
+    trend = pd.Series(
+        compute_footprint(by_date['production'].to_numpy(), mean_emission_factor.to_numpy()),
+        index=pd.to_datetime(by_date.index)
+    )
+    return {
+        'rows': row_count,
+        'total_production': total_production,
+        'total_footprint': total_footprint,
+        'footprint_by_state': by_state.sort_index(),
+        'footprint_trend': trend
+    }
+
 class CoalMineFootprintCalculator:
-    def __init__(self, sqlite_database_path=None):
+    def __init__(self, sqlite_database_path=None, chunk_size=DEFAULT_CHUNK_SIZE, compact=False, snapshot_dir=None,
+                 output_dir='.', headless=False, postgres_backend=None):
         self.coal_mine_data = None
         self.sqlite_database_path = sqlite_database_path
+        # postgres_backend.PostgresBackend; when set it replaces SQLite for loading, filtering and saving
+        self.postgres_backend = postgres_backend
+        self.chunk_size = chunk_size
+        self.compact = compact
+        # Directory for the columnar snapshot of coal_mines; None disables the snapshot cache
+        self.snapshot_dir = snapshot_dir
+        # Where charts are saved; headless runs never call plt.show() and close each figure after saving
+        self.output_dir = output_dir
+        self.headless = headless
+        self.streaming_aggregates = None
+        self.user_data = None
+        # Bumped whenever coal_mine_data changes; derived columns are recomputed only when it moves
+        self.data_version = 0
+        self.derived_column_versions = {}
+        # Per-mine summary tables, rebuilt like derived columns when the data version moves
+        self.summary_tables = {}
+        self.summary_table_versions = {}
 
     def connect_to_db(self):
         try:
@@ -97,15 +255,290 @@ class CoalMineFootprintCalculator:
 
     def load_data_from_db(self):
         if self.coal_mine_data is None:
+            if self.load_data_from_snapshot():
+                return
+            conn = None
             try:
-                conn = self.connect_to_db()
-                self.coal_mine_data = fetch_coal_mine_data_sqlite(conn)
+                if self.postgres_backend is not None:
+                    self.coal_mine_data = fetch_coal_mine_data_postgres(self.postgres_backend)
+                else:
+                    conn = self.connect_to_db()
+                    self.coal_mine_data = fetch_coal_mine_data_sqlite(conn)
+                # Rows of each mine kept contiguous for the mine registry's row ranges
+                self.coal_mine_data = order_by_mine(self.coal_mine_data)
+                if self.compact:
+                    self.compact_data()
+                self.save_snapshot()
+                self.invalidate_derived_columns()
+                self.ensure_footprint()
                 print("Data loaded from database successfully.")
             except Exception as e:
                 print(f"An error occurred while loading data: {e}")
                 raise
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def snapshot_layout(self):
+        return 'compact' if self.compact else 'default'
+
+    def load_data_from_snapshot(self):
+        # Reuse the memory-mapped columnar snapshot when the database is unchanged since it was written
+        if not (self.snapshot_dir and self.sqlite_database_path) or self.postgres_backend is not None:
+            return False
+        try:
+            snapshot = read_snapshot(self.sqlite_database_path, self.snapshot_dir, self.snapshot_layout())
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot cache: {e}")
+            return False
+        if snapshot is None:
+            return False
+        self.coal_mine_data = snapshot
+        self.invalidate_derived_columns()
+        self.ensure_footprint()
+        print("Data loaded from snapshot cache successfully.")
+        return True
+
+    def save_snapshot(self):
+        if not (self.snapshot_dir and self.sqlite_database_path) or self.postgres_backend is not None:
+            return
+        try:
+            write_snapshot(self.coal_mine_data, self.sqlite_database_path, self.snapshot_dir, self.snapshot_layout())
+        except Exception as e:
+            print(f"Could not write snapshot cache: {e}")
+
+    def compact_data(self):
+        # Compact load mode: report memory per row before and after converting dtypes
+        before = memory_per_row(self.coal_mine_data)
+        self.coal_mine_data = compact_coal_mine_data(self.coal_mine_data)
+        after = memory_per_row(self.coal_mine_data)
+        print(f"Compacted mine data: {before:.1f} -> {after:.1f} bytes per row.")
+
+    def load_aggregates_streaming(self, chunk_size=None):
+        # Streaming load mode for tables too large to hold in memory: only aggregates are kept
+        if self.postgres_backend is not None:
+            chunks = self.postgres_backend.iter_dataframes(chunk_size=chunk_size or self.chunk_size)
+            self.streaming_aggregates = aggregate_coal_mine_chunks(chunks)
+            print(f"Aggregated {self.streaming_aggregates['rows']} rows from database in streaming mode.")
+            return self.streaming_aggregates
+        conn = self.connect_to_db()
+        try:
+            chunks = iter_coal_mine_data_sqlite(conn, chunk_size or self.chunk_size)
+            self.streaming_aggregates = aggregate_coal_mine_chunks(chunks)
+            print(f"Aggregated {self.streaming_aggregates['rows']} rows from database in streaming mode.")
+        finally:
+            conn.close()
+        return self.streaming_aggregates
+
+    def reload_data_from_db(self):
+        self.coal_mine_data = None
+        self.load_data_from_db()
+
+    def append_data(self, new_data):
+        # Add rows to the in-memory dataset (e.g. from get_user_data) and drop stale derived columns
+        new_data = new_data.drop(columns=list(self.derived_column_versions), errors='ignore')
+        if self.coal_mine_data is None:
+            self.coal_mine_data = new_data.reset_index(drop=True)
+        else:
+            self.coal_mine_data = order_by_mine(pd.concat([self.coal_mine_data, new_data], ignore_index=True))
+        if self.compact:
+            # Concatenating new labels turns categoricals back into objects
+            self.coal_mine_data = compact_coal_mine_data(self.coal_mine_data)
+        self.invalidate_derived_columns()
+
+    def fetch_filtered_data(self, state=None, mine=None, start_date=None, end_date=None):
+        # Push the state/mine/date filter into SQL so only the matching rows are read
+        if self.postgres_backend is not None:
+            filtered_data = fetch_coal_mine_data_postgres(self.postgres_backend, state, mine, start_date, end_date)
+            return add_footprint_column(filtered_data)
+        if self.sqlite_database_path:
+            conn = self.connect_to_db()
+            try:
+                filtered_data = fetch_coal_mine_data_filtered(conn, state, mine, start_date, end_date)
             finally:
                 conn.close()
+            return add_footprint_column(filtered_data)
+
+        if state is not None and start_date is None and end_date is None:
+            return self.select_mine_rows(state, mine).copy()
+        self.ensure_footprint()
+        mask = pd.Series(True, index=self.coal_mine_data.index)
+        if state is not None:
+            mask &= self.coal_mine_data['Location'] == state
+        if mine is not None:
+            mask &= self.coal_mine_data['Mine Name'] == mine
+        if start_date is not None:
+            mask &= pd.to_datetime(self.coal_mine_data['Date']) >= pd.to_datetime(start_date)
+        if end_date is not None:
+            mask &= pd.to_datetime(self.coal_mine_data['Date']) <= pd.to_datetime(end_date)
+        return self.coal_mine_data[mask].copy()
+
+    def save_user_data(self, user_data):
+        # Persist user-entered rows to the database and add them to the loaded data
+        if self.postgres_backend is not None:
+            self.postgres_backend.copy_dataframe(user_data)
+            print("User data saved to database.")
+        elif self.sqlite_database_path:
+            ingest_dataframe(self.sqlite_database_path, user_data)
+            print("User data saved to database.")
+        self.append_data(user_data)
+
+    def invalidate_derived_columns(self):
+        self.data_version += 1
+
+    def get_derived_column(self, column, compute):
+        # Memoized derived column: recomputed only if the data version changed since it was last built
+        if self.derived_column_versions.get(column) != self.data_version or column not in self.coal_mine_data.columns:
+            self.coal_mine_data[column] = compute(self.coal_mine_data)
+            self.derived_column_versions[column] = self.data_version
+        return self.coal_mine_data[column]
+
+    def ensure_footprint(self):
+        return self.get_derived_column(
+            FOOTPRINT_COLUMN,
+            lambda df: compute_footprint(df['Annual Production'].to_numpy(), df['Emission Factor'].to_numpy())
+        )
+
+    def get_summary_table(self, name, build):
+        if self.summary_table_versions.get(name) != self.data_version or name not in self.summary_tables:
+            self.summary_tables[name] = build()
+            self.summary_table_versions[name] = self.data_version
+        return self.summary_tables[name]
+
+    def get_mine_registry(self):
+        # state -> mine -> row range of the loaded data; rebuilt, like the summary tables, whenever the data
+        # version moves (reload after an ingest, new user rows)
+        def build():
+            # A snapshot written before rows were kept in mine order is reordered once here
+            self.coal_mine_data = order_by_mine(self.coal_mine_data)
+            return MineRegistry.from_frame(self.coal_mine_data)
+        return self.get_summary_table('mine_registry', build)
+
+    def select_mine_rows(self, state, mine=None):
+        # Loaded rows of one mine, or of a whole state, as a slice located through the registry
+        rows = self.get_mine_registry().rows(state, mine)
+        self.ensure_footprint()
+        return self.coal_mine_data.iloc[rows.start:rows.stop]
+
+    def get_mine_summary(self):
+        # One row per (state, mine) from a single groupby pass over the data
+        def build():
+            self.ensure_footprint()
+            return self.coal_mine_data.groupby(['Location', 'Mine Name'], observed=True, sort=True).agg(
+                **{
+                    'Annual Production': ('Annual Production', 'sum'),
+                    'Mean Emission Factor': ('Emission Factor', 'mean'),
+                    FOOTPRINT_COLUMN: (FOOTPRINT_COLUMN, 'sum'),
+                    'Rows': (FOOTPRINT_COLUMN, 'size')
+                }
+            )
+        return self.get_summary_table('mine_summary', build)
+
+    def get_comparison_table(self):
+        # COMPARISON_ATTRIBUTES per mine, indexed by (state, mine); comparing two mines is a lookup into it
+        def build():
+            summary = self.get_mine_summary()
+            return pd.DataFrame({
+                'Annual Production': summary['Annual Production'],
+                'Emission Factor': summary['Mean Emission Factor'],
+                'Carbon Footprint': self.calculate_footprint(
+                    summary['Annual Production'], summary['Mean Emission Factor']
+                ) / 1e6  # Convert to Million Tonnes
+            }, index=summary.index)[COMPARISON_ATTRIBUTES]
+        return self.get_summary_table('comparison', build)
+
+    def compare_mine_pair(self, mine1, mine2):
+        # mine1 / mine2 are (state, mine) keys of get_comparison_table()
+        table = self.get_comparison_table()
+        return table.loc[mine1].tolist(), table.loc[mine2].tolist()
+
+    def comparison_matrix(self, attribute='Carbon Footprint', kind='difference'):
+        # N x N matrix of row mine minus column mine for one attribute; kind='relative' gives the difference
+        # as a percentage of the column mine
+        if attribute not in COMPARISON_ATTRIBUTES:
+            raise ValueError(f"Unknown attribute '{attribute}'. Expected one of {COMPARISON_ATTRIBUTES}.")
+        table = self.get_comparison_table()
+        values = table[attribute].to_numpy(dtype=np.float64)
+        matrix = values[:, np.newaxis] - values[np.newaxis, :]
+        if kind == 'relative':
+            matrix = np.divide(matrix * 100, values[np.newaxis, :], out=np.full_like(matrix, np.nan),
+                               where=values[np.newaxis, :] != 0)
+        elif kind != 'difference':
+            raise ValueError(f"Unknown comparison kind '{kind}'. Expected 'difference' or 'relative'.")
+        labels = [f"{mine} ({state})" for state, mine in table.index]
+        return pd.DataFrame(matrix, index=labels, columns=labels)
+
+    def simulate_reduction_scenarios(self, reductions_pct, by='mine'):
+        # Evaluate many reduction scenarios at once and return the total footprint per scenario.
+        # by='mine': one column per mine in get_mine_summary() order (or a DataFrame with (state, mine) columns);
+        # by='state': one column per state in sorted order (or a DataFrame with state columns);
+        # an array with a single column, or a 1-D array, applies the same cut to every mine (see scenarios.reduction_grid).
+        summary = self.get_mine_summary()
+        base = summary[FOOTPRINT_COLUMN].to_numpy(dtype=np.float64)
+        if by == 'state':
+            states = summary.index.get_level_values('Location')
+            codes, labels = pd.factorize(states, sort=True)
+            base = group_footprints(base, codes, len(labels))
+        elif by == 'mine':
+            labels = summary.index
+        else:
+            raise ValueError(f"Unknown scenario level '{by}'. Expected 'mine' or 'state'.")
+
+        index = None
+        if isinstance(reductions_pct, pd.DataFrame):
+            # Columns not mentioned in a scenario keep their full production
+            index = reductions_pct.index
+            reductions_pct = reductions_pct.reindex(columns=labels, fill_value=0.0).to_numpy(dtype=np.float64)
+
+        reduced = evaluate_reduction_scenarios(base, reductions_pct)
+        return summarize_scenarios(base.sum(), reduced, index=index)
+
+    def optimize_reduction_allocation(self, target_pct, max_reduction_pct=100.0, cost_per_tonne=None):
+        # Cheapest per-mine reductions that cut the national footprint by target_pct percent.
+        # max_reduction_pct and cost_per_tonne are scalars or per-mine arrays in get_mine_summary() order.
+        if not 0 <= target_pct <= 100:
+            raise ValueError("Target percentage must be between 0 and 100.")
+        summary = self.get_mine_summary()
+        production = summary['Annual Production'].to_numpy(dtype=np.float64)
+        footprint = summary[FOOTPRINT_COLUMN].to_numpy(dtype=np.float64)
+
+        target_reduction = footprint.sum() * target_pct / 100
+        reduction_pct = allocate_reductions(production, self.mine_emission_factors(), target_reduction,
+                                            max_reduction_pct, cost_per_tonne)
+        allocation = pd.DataFrame({
+            'Reduction (%)': reduction_pct,
+            'Production Cut': production * reduction_pct / 100,
+            'Footprint Reduction (tCO2e)': footprint * reduction_pct / 100
+        }, index=summary.index)
+        return allocation[allocation['Reduction (%)'] > 0]
+
+    def mine_emission_factors(self):
+        # Production-weighted emission factor per mine, aligned with get_mine_summary()
+        summary = self.get_mine_summary()
+        production = summary['Annual Production'].to_numpy(dtype=np.float64)
+        footprint = summary[FOOTPRINT_COLUMN].to_numpy(dtype=np.float64)
+        return np.divide(footprint, production * TONNES_PER_MILLION_TONNES,
+                         out=np.zeros_like(footprint), where=production != 0)
+
+    def estimate_footprint_uncertainty(self, samples=DEFAULT_SAMPLES, production_rsd=DEFAULT_PRODUCTION_RSD,
+                                       emission_factor_rsd=DEFAULT_EMISSION_FACTOR_RSD, seed=0, workers=1,
+                                       confidence=0.95, batch_size=None):
+        # Monte Carlo confidence interval of the total footprint, plus mean and spread per mine
+        summary = self.get_mine_summary()
+        result = propagate_footprint_uncertainty(
+            summary['Annual Production'].to_numpy(dtype=np.float64), self.mine_emission_factors(),
+            samples, production_rsd, emission_factor_rsd, seed, batch_size, workers, confidence
+        )
+        result['mines'] = pd.DataFrame({
+            FOOTPRINT_COLUMN: summary[FOOTPRINT_COLUMN],
+            'Mean (tCO2e)': result['mine_mean'],
+            'Std (tCO2e)': result['mine_std']
+        }, index=summary.index)
+        print(f"Total footprint {result['mean'] / 1e6:,.2f} Mt CO2e, {confidence:.0%} interval "
+              f"[{result['lower'] / 1e6:,.2f}, {result['upper'] / 1e6:,.2f}] from {samples} samples in "
+              f"{result['seconds']:.2f}s ({result['batch_size']} samples/batch, "
+              f"{result['batch_bytes'] / 2 ** 20:.1f} MiB/batch).")
+        return result
 
     def get_user_data(self):
         try:
@@ -132,68 +565,42 @@ class CoalMineFootprintCalculator:
             print("Invalid input. Please enter numeric values for production and emission factor.")
             return pd.DataFrame()
 
+    def finish_figure(self, fig, filename=None):
+        # Figures are always closed afterwards so long sessions do not accumulate them
+        try:
+            if filename:
+                os.makedirs(self.output_dir, exist_ok=True)
+                fig.savefig(os.path.join(self.output_dir, filename))
+            if not self.headless:
+                plt.show()
+        finally:
+            plt.close(fig)
+
     def calculate_footprint(self, production, emission_factor):
         return production * emission_factor * TONNES_PER_MILLION_TONNES
     def visualize_data(self):
      if self.user_data is not None and not self.user_data.empty:
-        plt.figure(figsize=DEFAULT_FIGURE_SIZE)
-        
         # Visualizing Annual Production, Emission Factor, and Carbon Footprint
-        bar_width = 0.25
-        index = range(len(self.user_data['Mine Name']))
-        
-        # Plot Annual Production
-        plt.bar(
-            [i - bar_width for i in index],
+        fig = plot_attribute_bars(
+            self.user_data['Mine Name'],
             self.user_data['Annual Production'],
-            bar_width,
-            label='Annual Production',
-            color='b'
-        )
-
-        # Plot Emission Factor
-        plt.bar(
-            index,
             self.user_data['Emission Factor'],
-            bar_width,
-            label='Emission Factor',
-            color='r'
-        )
-
-        # Plot Carbon Footprint
-        plt.bar(
-            [i + bar_width for i in index],
             self.user_data['Carbon Footprint (tCO2e)'] / 1e6,  # Convert to Million Tonnes
-            bar_width,
-            label='Carbon Footprint',
-            color='g'
+            'Carbon Footprint of Selected Coal Mines'
         )
-
-        plt.title('Carbon Footprint of Selected Coal Mines')
-        plt.xlabel('Mine Name')
-        plt.ylabel('Values')
-        plt.xticks(index, self.user_data['Mine Name'], rotation=45, ha='right')
-        plt.legend()
-        plt.tight_layout()
-        plt.savefig('coal_mines_carbon_footprint.png')
-        plt.show()
+        self.finish_figure(fig, 'coal_mines_carbon_footprint.png')
      else:
         print("Unable to visualize data due to missing information.")
 
     def visualize_total_data(self):
         if self.coal_mine_data is not None and not self.coal_mine_data.empty:
-            self.coal_mine_data['Carbon Footprint (tCO2e)'] = self.coal_mine_data.apply(
-                lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                axis=1
+            self.ensure_footprint()
+            fig = plot_footprint_bars(
+                self.coal_mine_data['Mine Name'],
+                self.coal_mine_data['Carbon Footprint (tCO2e)'] / 1e6,
+                'Carbon Footprint of All Coal Mines'
             )
-            plt.figure(figsize=DEFAULT_FIGURE_SIZE)
-            plt.bar(self.coal_mine_data['Mine Name'], self.coal_mine_data['Carbon Footprint (tCO2e)'] / 1e6)
-            plt.title('Carbon Footprint of All Coal Mines')
-            plt.xlabel('Mine Name')
-            plt.ylabel('Carbon Footprint (Million Tonnes CO2e)')
-            plt.xticks(rotation=90)
-            plt.tight_layout()
-            plt.show()
+            self.finish_figure(fig)
         else:
             print("No data available for visualization.")
 
@@ -201,8 +608,9 @@ class CoalMineFootprintCalculator:
     
       if self.coal_mine_data is not None and not self.coal_mine_data.empty:
         try:
-            # Display the list of states
-            states = list(INDIAN_STATES_MINES.keys())
+            # Display the list of states found in the data
+            registry = self.get_mine_registry()
+            states = registry.states()
             print("Available States:")
             for i, state in enumerate(states, 1):
                 print(f"{i}. {state}")
@@ -212,7 +620,7 @@ class CoalMineFootprintCalculator:
 
             if 0 <= state_choice < len(states):
                 selected_state = states[state_choice]
-                mines = INDIAN_STATES_MINES[selected_state]
+                mines = registry.mines(selected_state)
 
                 # Display the list of mines in the selected state
                 print(f"\nAvailable Mines in {selected_state}:")
@@ -225,64 +633,19 @@ class CoalMineFootprintCalculator:
                 if 0 <= mine_choice < len(mines):
                     selected_mine = mines[mine_choice]
                     
-                    # Filter data for the selected mine
-                    filtered_data = self.coal_mine_data[
-                        (self.coal_mine_data['Location'] == selected_state) &
-                        (self.coal_mine_data['Mine Name'] == selected_mine)
-                    ].copy()
+                    # Rows of the selected mine, located through the registry
+                    filtered_data = self.select_mine_rows(selected_state, selected_mine)
 
                     if not filtered_data.empty:
-                        # Calculate the carbon footprint
-                        filtered_data['Carbon Footprint (tCO2e)'] = filtered_data.apply(
-                            lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                            axis=1
-                        )
-
                         # Visualization
-                        fig, ax = plt.subplots(figsize=DEFAULT_FIGURE_SIZE)
-
-                        # Bar width and positions
-                        bar_width = 0.25
-                        index = range(len(filtered_data['Mine Name']))
-
-                        # Plot Annual Production
-                        bars1 = ax.bar(
-                            [i - bar_width for i in index],
+                        fig = plot_attribute_bars(
+                            filtered_data['Mine Name'],
                             filtered_data['Annual Production'],
-                            bar_width,
-                            label='Annual Production',
-                            color='b'
-                        )
-
-                        # Plot Emission Factor
-                        bars2 = ax.bar(
-                            index,
                             filtered_data['Emission Factor'],
-                            bar_width,
-                            label='Emission Factor',
-                            color='r'
-                        )
-
-                        # Plot Carbon Footprint
-                        bars3 = ax.bar(
-                            [i + bar_width for i in index],
                             filtered_data['Carbon Footprint (tCO2e)'] / 1e6,  # Convert to Million Tonnes
-                            bar_width,
-                            label='Carbon Footprint',
-                            color='g'
+                            f'Attributes for {selected_mine} in {selected_state}'
                         )
-
-                        # Labels and legend
-                        ax.set_xlabel('Mine Name')
-                        ax.set_ylabel('Values')
-                        ax.set_title(f'Attributes for {selected_mine} in {selected_state}')
-                        ax.set_xticks(index)
-                        ax.set_xticklabels(filtered_data['Mine Name'], rotation=45, ha='right')
-                        ax.legend()
-
-                        plt.tight_layout()
-                        plt.savefig('visualization.png')  # Save the figure as a PNG file
-                        plt.show()
+                        self.finish_figure(fig, 'visualization.png')
                     else:
                         print("No data available for the selected mine.")
                 else:
@@ -295,21 +658,43 @@ class CoalMineFootprintCalculator:
         print("No data available for visualization.")
 
 
-    def visualize_trend_analysis(self):
+    def fetch_trend_data(self, resolution='daily'):
+        # Footprint per day/month/year, read from the rollup table when the database has one
+        if resolution not in TREND_RESOLUTIONS:
+            raise ValueError(f"Unknown trend resolution '{resolution}'. Choose from: {', '.join(TREND_RESOLUTIONS)}.")
+        if self.sqlite_database_path and self.postgres_backend is None:
+            conn = self.connect_to_db()
+            try:
+                if rollup_table_exists(conn.cursor()):
+                    grouped = fetch_trend(conn, resolution).set_index('Date')
+                    return pd.Series(
+                        compute_footprint(grouped['Total Production'].to_numpy(), grouped['Mean Emission Factor'].to_numpy()),
+                        index=grouped.index
+                    )
+            finally:
+                conn.close()
+
+        dates = pd.to_datetime(self.coal_mine_data['Date'])
+        periods = dates.dt.to_period({'daily': 'D', 'monthly': 'M', 'yearly': 'Y'}[resolution])
+        grouped = self.coal_mine_data.groupby(periods).agg(
+            production=('Annual Production', 'sum'),
+            emission_factor=('Emission Factor', 'mean')
+        )
+        return pd.Series(
+            compute_footprint(grouped['production'].to_numpy(), grouped['emission_factor'].to_numpy()),
+            index=grouped.index.to_timestamp()
+        )
+
+    def visualize_trend_analysis(self, resolution='daily'):
         if self.coal_mine_data is not None and not self.coal_mine_data.empty:
             try:
-                self.coal_mine_data['Date'] = pd.to_datetime(self.coal_mine_data['Date'])
-                trend_data = self.coal_mine_data.groupby('Date').apply(
-                    lambda x: self.calculate_footprint(x['Annual Production'].sum(), x['Emission Factor'].mean())
+                trend_data = self.fetch_trend_data(resolution)
+                fig = plot_footprint_trend(
+                    trend_data.index,
+                    trend_data.values / 1e6,
+                    f'Carbon Footprint Trend Over Time ({resolution.capitalize()})'
                 )
-                plt.figure(figsize=DEFAULT_FIGURE_SIZE)
-                plt.plot(trend_data.index, trend_data.values / 1e6, marker='o')
-                plt.title('Carbon Footprint Trend Over Time')
-                plt.xlabel('Date')
-                plt.ylabel('Carbon Footprint (Million Tonnes CO2e)')
-                plt.grid(True)
-                plt.tight_layout()
-                plt.show()
+                self.finish_figure(fig)
             except Exception as e:
                 print(f"An error occurred while analyzing trends: {e}")
         else:
@@ -319,84 +704,46 @@ class CoalMineFootprintCalculator:
 
      if self.coal_mine_data is not None and not self.coal_mine_data.empty:
         try:
-            mine_names = self.coal_mine_data['Mine Name'].unique()
+            # Per-mine attributes are precomputed once; each comparison is a lookup into this table
+            comparison_table = self.get_comparison_table()
+            mine_keys = list(comparison_table.index)
             print("Available mines for comparison:")
-            for i, mine in enumerate(mine_names, 1):
-                print(f"{i}. {mine}")
+            for i, (state, mine) in enumerate(mine_keys, 1):
+                print(f"{i}. {mine} ({state})")
             
             # Get user input for mine selection
             choice1 = int(input("Select first mine by number: ")) - 1
             choice2 = int(input("Select second mine by number: ")) - 1
 
-            if 0 <= choice1 < len(mine_names) and 0 <= choice2 < len(mine_names):
-                mine1 = mine_names[choice1]
-                mine2 = mine_names[choice2]
-
-                # Filter data for selected mines
-                data1 = self.coal_mine_data[self.coal_mine_data['Mine Name'] == mine1]
-                data2 = self.coal_mine_data[self.coal_mine_data['Mine Name'] == mine2]
-
-                if not data1.empty and not data2.empty:
-                    # Calculate carbon footprints
-                    footprint1 = self.calculate_footprint(data1['Annual Production'].sum(), data1['Emission Factor'].mean())
-                    footprint2 = self.calculate_footprint(data2['Annual Production'].sum(), data2['Emission Factor'].mean())
-
-                    # Prepare data for visualization
-                    attributes = ['Annual Production', 'Emission Factor', 'Carbon Footprint']
-                    mine1_values = [
-                        data1['Annual Production'].sum(),
-                        data1['Emission Factor'].mean(),
-                        footprint1 / 1e6  # Convert to Million Tonnes
-                    ]
-                    mine2_values = [
-                        data2['Annual Production'].sum(),
-                        data2['Emission Factor'].mean(),
-                        footprint2 / 1e6  # Convert to Million Tonnes
-                    ]
-
-                    x = range(len(attributes))
-
-                    # Plot comparison
-                    fig, ax = plt.subplots(figsize=DEFAULT_FIGURE_SIZE)
-                    
-                    bar_width = 0.35
-                    opacity = 0.8
-
-                    bars1 = ax.bar(
-                        [p - bar_width/2 for p in x],
-                        mine1_values,
-                        bar_width,
-                        alpha=opacity,
-                        color='b',
-                        label=mine1
-                    )
+            if 0 <= choice1 < len(mine_keys) and 0 <= choice2 < len(mine_keys):
+                mine1 = mine_keys[choice1]
+                mine2 = mine_keys[choice2]
+                mine1_values, mine2_values = self.compare_mine_pair(mine1, mine2)
 
-                    bars2 = ax.bar(
-                        [p + bar_width/2 for p in x],
-                        mine2_values,
-                        bar_width,
-                        alpha=opacity,
-                        color='r',
-                        label=mine2
-                    )
-                    ax.set_xlabel('Attributes')
-                    ax.set_ylabel('Values')
-                    ax.set_title('Comparison of Mine Attributes')
-                    ax.set_xticks(x)
-                    ax.set_xticklabels(attributes)
-                    ax.legend()
-
-                    plt.tight_layout()
-                    plt.savefig('comparison_mines.png')  # Save the figure as a PNG file
-                    plt.show()
-                else:
-                    print("Data not available for selected mines.")
+                # Plot comparison
+                fig = plot_pair_comparison(COMPARISON_ATTRIBUTES, mine1_values, mine2_values, mine1[1], mine2[1])
+                self.finish_figure(fig, 'comparison_mines.png')
             else:
                 print("Invalid selection. Please choose valid numbers.")
         except Exception as e:
             print(f"An error occurred while comparing mines: {e}")
      else:
         print("No data available for comparison.")
+
+    def visualize_comparison_matrix(self, attribute='Carbon Footprint', kind='difference'):
+     if self.coal_mine_data is not None and not self.coal_mine_data.empty:
+        try:
+            matrix = self.comparison_matrix(attribute, kind)
+            unit = '%' if kind == 'relative' else 'difference'
+            fig = plot_comparison_heatmap(
+                matrix.index, matrix.to_numpy(), f'{attribute}: Row Mine vs Column Mine',
+                f'{attribute} ({unit})'
+            )
+            self.finish_figure(fig, 'comparison_matrix.png')
+        except Exception as e:
+            print(f"An error occurred while comparing mines: {e}")
+     else:
+        print("No data available for comparison.")
     def simulate_reduction_strategy(self):
      if self.coal_mine_data is not None and not self.coal_mine_data.empty:
         try:
@@ -405,7 +752,8 @@ class CoalMineFootprintCalculator:
 
             if reduction_choice == '1':
                 # Reduction for a specific mine
-                states = list(INDIAN_STATES_MINES.keys())
+                registry = self.get_mine_registry()
+                states = registry.states()
                 print("Available States:")
                 for i, state in enumerate(states, 1):
                     print(f"{i}. {state}")
@@ -413,7 +761,7 @@ class CoalMineFootprintCalculator:
                 state_choice = int(input("Select a state by number: ")) - 1
                 if 0 <= state_choice < len(states):
                     selected_state = states[state_choice]
-                    mines = INDIAN_STATES_MINES[selected_state]
+                    mines = registry.mines(selected_state)
                     print(f"\nAvailable Mines in {selected_state}:")
                     for i, mine in enumerate(mines, 1):
                         print(f"{i}. {mine}")
@@ -424,56 +772,19 @@ class CoalMineFootprintCalculator:
 
                         reduction_percentage = float(input("Enter the reduction percentage (0-100): "))
                         if 0 <= reduction_percentage <= 100:
-                            # Create a copy to avoid modifying the original DataFrame
-                            reduced_data = self.coal_mine_data.copy()
-
-                            # Recalculate the original carbon footprint
-                            self.coal_mine_data['Carbon Footprint (tCO2e)'] = self.coal_mine_data.apply(
-                                lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                                axis=1
-                            )
-
-                            # Apply reduction percentage to 'Annual Production' for the selected mine and recalculate the carbon footprint
-                            reduced_data.loc[
-                                (reduced_data['Location'] == selected_state) & 
-                                (reduced_data['Mine Name'] == selected_mine),
-                                'Annual Production'
-                            ] *= (1 - reduction_percentage / 100)
-                            reduced_data['Reduced Carbon Footprint (tCO2e)'] = reduced_data.apply(
-                                lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                                axis=1
-                            )
-
-                            # Plot visualization for the specific mine
-                            filtered_data = reduced_data[
-                                (reduced_data['Location'] == selected_state) & 
-                                (reduced_data['Mine Name'] == selected_mine)
-                            ]
+                            # Footprint is linear in production, so the reduced footprint of the selected
+                            # mine is its cached footprint scaled down; the DataFrame is not copied
+                            filtered_data = self.select_mine_rows(selected_state, selected_mine)
                             
                             if not filtered_data.empty:
-                                fig, ax = plt.subplots(figsize=DEFAULT_FIGURE_SIZE)
-                                index = range(len(filtered_data['Mine Name']))
-                                bar_width = 0.35
-
-                                # Plot Original Carbon Footprint
-                                ax.bar(index, self.coal_mine_data[
-                                    (self.coal_mine_data['Location'] == selected_state) & 
-                                    (self.coal_mine_data['Mine Name'] == selected_mine)
-                                ]['Carbon Footprint (tCO2e)'] / 1e6, bar_width, color='red', label='Previous Carbon Footprint')
-
-                                # Plot Reduced Carbon Footprint
-                                ax.bar([i + bar_width for i in index], filtered_data['Reduced Carbon Footprint (tCO2e)'] / 1e6, bar_width, color='blue', label='Reduced Carbon Footprint')
-
-                                ax.set_xlabel('Mine Name')
-                                ax.set_ylabel('Carbon Footprint (Million Tonnes CO2e)')
-                                ax.set_title(f'Carbon Footprint Comparison for {selected_mine} After {reduction_percentage}% Reduction')
-                                ax.set_xticks([i + bar_width / 2 for i in index])
-                                ax.set_xticklabels(filtered_data['Mine Name'], rotation=90)
-                                ax.legend()
-
-                                plt.tight_layout()
-                                plt.savefig('reduction_strategy_specific_mine.png')  # Save the figure as a PNG file
-                                plt.show()
+                                original_mt = filtered_data['Carbon Footprint (tCO2e)'] / 1e6
+                                fig = plot_reduction_bars(
+                                    filtered_data['Mine Name'],
+                                    original_mt,
+                                    original_mt * (1 - reduction_percentage / 100),
+                                    f'Carbon Footprint Comparison for {selected_mine} After {reduction_percentage}% Reduction'
+                                )
+                                self.finish_figure(fig, 'reduction_strategy_specific_mine.png')
                             else:
                                 print("No data available for the selected mine.")
                         else:
@@ -487,42 +798,17 @@ class CoalMineFootprintCalculator:
                 # Reduction for all mines
                 reduction_percentage = float(input("Enter the reduction percentage (0-100): "))
                 if 0 <= reduction_percentage <= 100:
-                    reduced_data = self.coal_mine_data.copy()
-
-                    # Recalculate the original carbon footprint
-                    self.coal_mine_data['Carbon Footprint (tCO2e)'] = self.coal_mine_data.apply(
-                        lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                        axis=1
-                    )
-
-                    # Apply reduction percentage to 'Annual Production' for all mines and recalculate the carbon footprint
-                    reduced_data['Annual Production'] *= (1 - reduction_percentage / 100)
-                    reduced_data['Reduced Carbon Footprint (tCO2e)'] = reduced_data.apply(
-                        lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                        axis=1
+                    # Original carbon footprint comes from the cached column
+                    original_mt = self.ensure_footprint() / 1e6
+
+                    # Plot visualization for all mines; the reduced footprint is the cached one scaled down
+                    fig = plot_reduction_bars(
+                        self.coal_mine_data['Mine Name'],
+                        original_mt,
+                        original_mt * (1 - reduction_percentage / 100),
+                        f'Carbon Footprint Comparison After {reduction_percentage}% Reduction for All Mines'
                     )
-
-                    # Plot visualization for all mines
-                    fig, ax = plt.subplots(figsize=DEFAULT_FIGURE_SIZE)
-                    index = range(len(reduced_data['Mine Name']))
-                    bar_width = 0.35
-
-                    # Plot Original Carbon Footprint
-                    ax.bar(index, self.coal_mine_data['Carbon Footprint (tCO2e)'] / 1e6, bar_width, color='red', label='Previous Carbon Footprint')
-
-                    # Plot Reduced Carbon Footprint
-                    ax.bar([i + bar_width for i in index], reduced_data['Reduced Carbon Footprint (tCO2e)'] / 1e6, bar_width, color='blue', label='Reduced Carbon Footprint')
-
-                    ax.set_xlabel('Mine Name')
-                    ax.set_ylabel('Carbon Footprint (Million Tonnes CO2e)')
-                    ax.set_title(f'Carbon Footprint Comparison After {reduction_percentage}% Reduction for All Mines')
-                    ax.set_xticks([i + bar_width / 2 for i in index])
-                    ax.set_xticklabels(reduced_data['Mine Name'], rotation=90)
-                    ax.legend()
-
-                    plt.tight_layout()
-                    plt.savefig('reduction_strategy_all_mines.png')  # Save the figure as a PNG file
-                    plt.show()
+                    self.finish_figure(fig, 'reduction_strategy_all_mines.png')
                 else:
                     print("Invalid reduction percentage. Please enter a value between 0 and 100.")
             else:
@@ -536,8 +822,9 @@ class CoalMineFootprintCalculator:
     def process_all_mines_by_state(self):
      if self.coal_mine_data is not None and not self.coal_mine_data.empty:
         try:
-            # Display the list of states
-            states = list(INDIAN_STATES_MINES.keys())
+            # Display the list of states found in the data
+            registry = self.get_mine_registry()
+            states = registry.states()
             print("Available States:")
             for i, state in enumerate(states, 1):
                 print(f"{i}. {state}")
@@ -554,36 +841,25 @@ class CoalMineFootprintCalculator:
                 except ValueError:
                     print("Invalid input. Please enter a number.")
 
-            mines = INDIAN_STATES_MINES[selected_state]
+            mines = registry.mines(selected_state)
 
-            # Filter data for the selected state
-            filtered_data = self.coal_mine_data[self.coal_mine_data['Location'] == selected_state].copy()
+            # Rows of every mine in the selected state, located through the registry
+            filtered_data = self.select_mine_rows(selected_state)
 
             if not filtered_data.empty:
-                # Ensure necessary columns are numeric
-                filtered_data['Annual Production'] = pd.to_numeric(filtered_data['Annual Production'], errors='coerce').fillna(0)
-                filtered_data['Emission Factor'] = pd.to_numeric(filtered_data['Emission Factor'], errors='coerce').fillna(0)
-
-                # Calculate the carbon footprint for each mine
-                filtered_data['Carbon Footprint (tCO2e)'] = filtered_data.apply(
-                    lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                    axis=1
-                )
 
                 # Print column names and first few rows for debugging
                 print("Columns in filtered data:", filtered_data.columns)
                 print("First few rows of filtered data:\n", filtered_data.head())
 
                 # Visualization
-                plt.figure(figsize=DEFAULT_FIGURE_SIZE)
-                plt.bar(filtered_data['Mine Name'], filtered_data['Carbon Footprint (tCO2e)'] / 1e6, color='b')
-                plt.title(f'Carbon Footprint of Mines in {selected_state}')
-                plt.xlabel('Mine Name')
-                plt.ylabel('Carbon Footprint (Million Tonnes CO2e)')
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-                plt.savefig('mines_by_state_visualization.png')  # Save the figure as a PNG file
-                plt.show()
+                fig = plot_footprint_bars(
+                    filtered_data['Mine Name'],
+                    filtered_data['Carbon Footprint (tCO2e)'] / 1e6,
+                    f'Carbon Footprint of Mines in {selected_state}',
+                    rotation=45, ha='right', color='b'
+                )
+                self.finish_figure(fig, 'mines_by_state_visualization.png')
             else:
                 print("No data available for the selected state.")
         except Exception as e:
@@ -597,7 +873,7 @@ class CoalMineFootprintCalculator:
         print("2. Visualize Total Data")
         print("3. Visualize Specific Mines")
         print("4. Trend Analysis")
-        print("5. Compare Two Mines")
+        print("5. Compare Mines")
         print("6. Simulate Reduction Strategy")
         print("7. Process Mines by State")
         print("8. Exit")
@@ -606,10 +882,9 @@ class CoalMineFootprintCalculator:
 
         if choice == '1':
             user_data = self.get_user_data()
-            user_data['Carbon Footprint (tCO2e)'] = user_data.apply(
-                lambda row: self.calculate_footprint(row['Annual Production'], row['Emission Factor']),
-                axis=1
-            )
+            if not user_data.empty:
+                add_footprint_column(user_data)
+                self.save_user_data(user_data)
             self.user_data = user_data  # Store the user_data in an instance variable
             self.visualize_data()  # Call visualize_data without arguments
         elif choice == '2':
@@ -617,9 +892,15 @@ class CoalMineFootprintCalculator:
         elif choice == '3':
             self.visualize_specific_mines()
         elif choice == '4':
-            self.visualize_trend_analysis()
+            resolution = input("Enter resolution (daily/monthly/yearly) [daily]: ").strip().lower() or 'daily'
+            self.visualize_trend_analysis(resolution)
         elif choice == '5':
-            self.compare_mines()
+            comparison = input("Compare:\n1. Two Mines\n2. All Mines (matrix)\nEnter your choice (1/2): ")
+            if comparison == '2':
+                attribute = input(f"Attribute ({'/'.join(COMPARISON_ATTRIBUTES)}) [Carbon Footprint]: ").strip()
+                self.visualize_comparison_matrix(attribute or 'Carbon Footprint')
+            else:
+                self.compare_mines()
         elif choice == '6':
             self.simulate_reduction_strategy()
         elif choice == '7':
@@ -705,12 +986,18 @@ class CoalMineFootprintCalculator:
 
       plt.tight_layout()
       plt.savefig(filename)  # Save the figure as a PNG file
-    plt.show()
     
 # Main execution
 if __name__ == "__main__":
-    db_path = "coal_mines.db"
-    create_database_and_table(db_path)
-    calculator = CoalMineFootprintCalculator(sqlite_database_path=db_path)
+    postgres_dsn = os.environ.get('COAL_MINES_POSTGRES_DSN')
+    if postgres_dsn:
+        # PostgreSQL deployment: pooled connections instead of the local SQLite file
+        backend = PostgresBackend(postgres_dsn)
+        backend.create_table()
+        calculator = CoalMineFootprintCalculator(postgres_backend=backend)
+    else:
+        db_path = "coal_mines.db"
+        create_database_and_table(db_path)
+        calculator = CoalMineFootprintCalculator(sqlite_database_path=db_path, snapshot_dir=".snapshot_cache")
     calculator.load_data_from_db()
     calculator.run()
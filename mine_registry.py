@@ -0,0 +1,67 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+# Columns that identify a mine in the loaded coal_mines DataFrame
+MINE_KEY_COLUMNS = ['Location', 'Mine Name']
+
+def is_mine_ordered(df):
+    # True if the rows of every (state, mine) are contiguous and in key order
+    return pd.MultiIndex.from_frame(df[MINE_KEY_COLUMNS].astype(object)).is_monotonic_increasing
+
+def order_by_mine(df):
+    # Stable sort by state and mine, so rows of one mine keep their original (date) order
+    if is_mine_ordered(df):
+        return df
+    return df.sort_values(MINE_KEY_COLUMNS, kind='stable', na_position='last').reset_index(drop=True)
+
+class MineRegistry:
+    # Index of the mines present in the loaded data: state -> mine -> range of row positions. Built from a
+    # DataFrame ordered by order_by_mine, so the rows of a mine, and of a state, are one contiguous slice
+    # and every lookup is a dict access instead of a scan over all rows.
+    def __init__(self, ranges):
+        self.ranges = ranges
+
+    @classmethod
+    def from_frame(cls, df):
+        ranges = {}
+        if df.empty:
+            return cls(ranges)
+        locations = df['Location'].to_numpy(dtype=object)
+        mines = df['Mine Name'].to_numpy(dtype=object)
+        # Row positions where the (state, mine) key changes start a new mine
+        starts = np.flatnonzero(np.r_[True, (locations[1:] != locations[:-1]) | (mines[1:] != mines[:-1])])
+        stops = np.r_[starts[1:], len(df)]
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            state, mine = locations[start], mines[start]
+            if pd.isna(state) or pd.isna(mine):
+                continue  # rows without a state or mine name cannot be selected from the menus
+            ranges.setdefault(state, {})[mine] = range(start, stop)
+        return cls(ranges)
+
+    def states(self):
+        return list(self.ranges)
+
+    def mines(self, state):
+        return list(self.ranges.get(state, ()))
+
+    def rows(self, state, mine=None):
+        # Row positions of one mine, or of every mine in a state; an empty range if unknown
+        state_mines = self.ranges.get(state)
+        if not state_mines:
+            return range(0)
+        if mine is not None:
+            return state_mines.get(mine, range(0))
+        mine_ranges = list(state_mines.values())
+        return range(mine_ranges[0].start, mine_ranges[-1].stop)
+
+    def __contains__(self, key):
+        # 'State' or ('State', 'Mine')
+        if isinstance(key, tuple):
+            state, mine = key
+            return mine in self.ranges.get(state, ())
+        return key in self.ranges
+
+    def __len__(self):
+        return sum(len(state_mines) for state_mines in self.ranges.values())
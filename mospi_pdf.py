@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from data_sources import MOSPI_URL
+from ingest import configure_bulk_pragmas, ensure_natural_key, upsert_records
+from lazy_imports import LazyModule
+from rollup import ensure_rollup
+from source_tables import records_frame, table_records
+
+pdfplumber = LazyModule('pdfplumber')
+pdftypes = LazyModule('pdfminer.pdftypes')
+
+DEFAULT_PAGE_CACHE_DIR = '.pdf_page_cache'
+# Rows buffered before they are written to the database
+DEFAULT_BATCH_ROWS = 5_000
+# Part of every page hash, so changing the extraction logic invalidates the page cache
+EXTRACTOR_VERSION = 1
+# Pages of each PDF already written to this database; a re-run skips them instead of inserting duplicates
+INGESTED_PAGES_TABLE = 'pdf_ingested_pages'
+
+def page_hash(page):
+    # Hash of the page's content streams: identical pages hit the cache even if the rest of the PDF changed
+    digest = hashlib.sha256(f"extractor-{EXTRACTOR_VERSION}".encode())
+    # /Contents is one stream or an array of them, either of which may be an indirect reference
+    contents = pdftypes.resolve1(page.page_obj.attrs.get('Contents'))
+    for stream in contents if isinstance(contents, list) else [contents]:
+        if stream is not None:
+            digest.update(pdftypes.stream_value(stream).get_data())
+    return digest.hexdigest()
+
+def page_fingerprints(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return [page_hash(page) for page in pdf.pages]
+
+def extract_page_records(page):
+    # Every mine table on the page; the page text supplies the unit when the header does not
+    text = page.extract_text() or ''
+    records = []
+    for table in page.extract_tables():
+        records.extend(table_records(table, context=text))
+    return records
+
+# PDF opened once per worker process
+_worker_pdf = None
+
+def open_worker_pdf(pdf_path):
+    global _worker_pdf
+    _worker_pdf = pdfplumber.open(pdf_path)
+
+def extract_worker_page(page_number):
+    page = _worker_pdf.pages[page_number]
+    try:
+        return page_number, extract_page_records(page)
+    finally:
+        # Drop the parsed layout objects so long documents do not accumulate them
+        if hasattr(page, 'close'):
+            page.close()
+
+def read_cached_page(cache_dir, digest):
+    path = os.path.join(cache_dir, f"{digest}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return [tuple(record) for record in json.load(f)['records']]
+
+def write_cached_page(cache_dir, digest, records):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{digest}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'records': records}, f)
+    os.replace(path + '.tmp', path)
+
+def extract_pages(pdf_path, page_numbers, workers):
+    # Yields (page number, records) as pages finish; workers > 1 spreads pages over processes
+    if not page_numbers:
+        return
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(page_numbers) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=open_worker_pdf, initargs=(pdf_path,)) as executor:
+            yield from executor.map(extract_worker_page, page_numbers, chunksize=chunksize)
+    else:
+        open_worker_pdf(pdf_path)
+        try:
+            for page_number in page_numbers:
+                yield extract_worker_page(page_number)
+        finally:
+            _worker_pdf.close()
+
+def ensure_ingested_pages_table(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {INGESTED_PAGES_TABLE} (
+            page_hash TEXT PRIMARY KEY,
+            rows INTEGER
+        );
+    """)
+
+def ingest_pdf(pdf_path, db_path, cache_dir=DEFAULT_PAGE_CACHE_DIR, workers=1, batch_rows=DEFAULT_BATCH_ROWS,
+               emission_factor=None):
+    # Extract every mine table of the PDF into coal_mines in one transaction. Cached pages are read from
+    # cache_dir, the rest are extracted (in parallel when workers > 1) and rows are written in batches.
+    start = time.perf_counter()
+    fingerprints = page_fingerprints(pdf_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    stats = {'pages': len(fingerprints), 'cached': 0, 'extracted': 0, 'skipped': 0, 'rows': 0}
+    try:
+        configure_bulk_pragmas(conn)
+        conn.execute("BEGIN;")
+        try:
+            cursor = conn.cursor()
+            ensure_natural_key(cursor)
+            ensure_rollup(cursor)
+            ensure_ingested_pages_table(cursor)
+            ingested = {row[0] for row in cursor.execute(f"SELECT page_hash FROM {INGESTED_PAGES_TABLE};")}
+
+            pending_records = []
+
+            def flush():
+                if pending_records:
+                    stats['rows'] += upsert_records(conn, records_frame(pending_records, emission_factor))
+                    pending_records.clear()
+
+            def add_page(digest, records):
+                pending_records.extend(records)
+                ingested.add(digest)
+                cursor.execute(f"INSERT INTO {INGESTED_PAGES_TABLE} (page_hash, rows) VALUES (?, ?);",
+                               (digest, len(records)))
+                if len(pending_records) >= batch_rows:
+                    flush()
+
+            to_extract = []
+            for page_number, digest in enumerate(fingerprints):
+                if digest in ingested:
+                    stats['skipped'] += 1
+                    continue
+                records = read_cached_page(cache_dir, digest)
+                if records is None:
+                    to_extract.append(page_number)
+                else:
+                    stats['cached'] += 1
+                    add_page(digest, records)
+
+            for page_number, records in extract_pages(pdf_path, to_extract, workers):
+                digest = fingerprints[page_number]
+                write_cached_page(cache_dir, digest, records)
+                stats['extracted'] += 1
+                if digest not in ingested:  # repeated identical pages are written once
+                    add_page(digest, records)
+            flush()
+            conn.execute("COMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            raise
+    finally:
+        conn.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    print(f"{pdf_path}: {stats['pages']} pages ({stats['extracted']} extracted, {stats['cached']} from cache, "
+          f"{stats['skipped']} already ingested), {stats['rows']} rows in {stats['seconds']:.2f}s.")
+    return stats
+
+if __name__ == "__main__":
+    from main import create_database_and_table
+
+    parser = argparse.ArgumentParser(description="Load mine production tables from a MoSPI Energy Statistics PDF")
+    parser.add_argument('pdf_path', help=f"Local copy of the report, e.g. downloaded from {MOSPI_URL}")
+    parser.add_argument('--db', default='coal_mines.db', help="SQLite database path")
+    parser.add_argument('--cache-dir', default=DEFAULT_PAGE_CACHE_DIR, help="Per-page extraction cache")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Extraction processes; 1 extracts in this process")
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument('--emission-factor', type=float,
+                        help="Emission factor (tCO2e/tonne) for rows whose table does not give one")
+    args = parser.parse_args()
+
+    create_database_and_table(args.db)
+    ingest_pdf(args.pdf_path, args.db, args.cache_dir, args.workers, args.batch_rows, args.emission_factor)
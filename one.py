@@ -1,7 +1,12 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sqlite3
-import psycopg2
+
+from lazy_imports import LazyModule
+from postgres_backend import PostgresBackend, read_sql_dataframe
+
+# Heavy libraries load on first use; psycopg2 is only needed for the PostgreSQL path
+pd = LazyModule('pandas')
+plt = LazyModule('matplotlib.pyplot')
+psycopg2 = LazyModule('psycopg2')
 
 # Constants
 TONNES_PER_MILLION_TONNES = 1e6
@@ -73,7 +78,8 @@ def fetch_coal_mine_data_postgres(conn):
            annual_production AS "Annual Production", emission_factor AS "Emission Factor"
     FROM coal_mines
     """
-    df = pd.read_sql_query(query, conn)
+    # Server-side cursor: rows arrive in batches instead of one client-side result set
+    df = read_sql_dataframe(conn, query)
     return df
 
 class CoalMineFootprintCalculator:
@@ -81,32 +87,50 @@ class CoalMineFootprintCalculator:
         self.coal_mine_data = None
         self.sqlite_database_path = sqlite_database_path
         self.postgresql_connection_parameters = postgresql_connection_parameters
+        # Connections to PostgreSQL come from a pool instead of a fresh psycopg2.connect per load
+        self.postgres_backend = (
+            PostgresBackend(postgresql_connection_parameters) if postgresql_connection_parameters else None
+        )
 
     def connect_to_db(self):
         try:
             if self.sqlite_database_path:
                 return sqlite3.connect(self.sqlite_database_path)
             elif self.postgresql_connection_parameters:
-                return psycopg2.connect(**self.postgresql_connection_parameters)
+                # Pooled connection; hand it back with release_connection()
+                return self.postgres_backend.get_pool().getconn()
             else:
                 raise ValueError("Database connection details not provided.")
-        except (psycopg2.Error, sqlite3.Error) as e:
+        except sqlite3.Error as e:
             print(f"Error connecting to the database: {e}")
             raise
         except Exception as e:
+            # Checked here rather than in the clause above so SQLite-only runs never import psycopg2
+            if (self.postgresql_connection_parameters and not isinstance(e, ImportError)
+                    and isinstance(e, psycopg2.Error)):
+                print(f"Error connecting to the database: {e}")
+                raise
             print(f"An unexpected error occurred: {e}")
             raise
 
+    def release_connection(self, conn):
+        if self.sqlite_database_path:
+            conn.close()
+        else:
+            # Named cursors run inside a transaction; end it before the connection goes back to the pool
+            conn.rollback()
+            self.postgres_backend.get_pool().putconn(conn)
+
     def load_data_from_db(self):
         if self.coal_mine_data is None:
+            conn = self.connect_to_db()
             try:
-                conn = self.connect_to_db()
                 if self.sqlite_database_path:
                     self.coal_mine_data = fetch_coal_mine_data_sqlite(conn)
                 elif self.postgresql_connection_parameters:
                     self.coal_mine_data = fetch_coal_mine_data_postgres(conn)
             finally:
-                conn.close()
+                self.release_connection(conn)
 
     def calculate_carbon_footprint(self):
         if self.coal_mine_data is None:
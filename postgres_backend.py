@@ -0,0 +1,214 @@
+import io
+import itertools
+import time
+from contextlib import contextmanager
+
+from ingest import INGEST_COLUMNS, NATURAL_KEY_INDEX, select_ingest_columns
+from lazy_imports import LazyModule, module_available
+
+pa = LazyModule('pyarrow')
+pa_csv = LazyModule('pyarrow.csv')
+pd = LazyModule('pandas')
+psycopg2_pool = LazyModule('psycopg2.pool')
+
+DEFAULT_POOL_MIN_CONNECTIONS = 1
+DEFAULT_POOL_MAX_CONNECTIONS = 8
+# Rows per round trip of a server-side cursor
+DEFAULT_FETCH_SIZE = 10_000
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS coal_mines (
+        id BIGSERIAL PRIMARY KEY,
+        mine_name TEXT,
+        location TEXT,
+        annual_production DOUBLE PRECISION,
+        emission_factor DOUBLE PRECISION,
+        date DATE
+    );
+"""
+
+CREATE_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_coal_mines_location_mine ON coal_mines (location, mine_name);",
+    "CREATE INDEX IF NOT EXISTS idx_coal_mines_date ON coal_mines (date);"
+)
+
+# Natural key as in ingest.NATURAL_KEY; a missing date is keyed as -infinity since date is a DATE column here
+NATURAL_KEY_POSTGRES = "mine_name, COALESCE(location, ''), COALESCE(date, '-infinity'::date)"
+
+# Tables created before the natural key existed are deduplicated (keeping the latest row) before it is added
+DEDUPLICATE_SQL = """
+    DELETE FROM coal_mines older USING coal_mines newer
+    WHERE older.id < newer.id AND older.mine_name = newer.mine_name
+      AND older.location IS NOT DISTINCT FROM newer.location AND older.date IS NOT DISTINCT FROM newer.date;
+"""
+
+CREATE_NATURAL_KEY_SQL = (
+    f"CREATE UNIQUE INDEX IF NOT EXISTS {NATURAL_KEY_INDEX} ON coal_mines ({NATURAL_KEY_POSTGRES});"
+)
+
+# Session-local staging table for upserts: COPY cannot resolve conflicts itself
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS coal_mines_staging (
+        seq BIGSERIAL,
+        mine_name TEXT,
+        location TEXT,
+        annual_production DOUBLE PRECISION,
+        emission_factor DOUBLE PRECISION,
+        date DATE
+    );
+"""
+
+# ON CONFLICT may touch each row once per statement, so only the last staged row of each key is merged
+MERGE_STAGING_SQL = f"""
+    INSERT INTO coal_mines ({', '.join(INGEST_COLUMNS)})
+    SELECT DISTINCT ON ({NATURAL_KEY_POSTGRES}) {', '.join(INGEST_COLUMNS)}
+    FROM coal_mines_staging
+    ORDER BY {NATURAL_KEY_POSTGRES}, seq DESC
+    ON CONFLICT ({NATURAL_KEY_POSTGRES}) DO UPDATE SET
+        annual_production = excluded.annual_production,
+        emission_factor = excluded.emission_factor;
+"""
+
+# Same columns and labels as main.COAL_MINE_SELECT; the date is returned as 'YYYY-MM-DD' text like SQLite
+COAL_MINE_SELECT_POSTGRES = """
+    SELECT mine_name AS "Mine Name", location AS "Location",
+           annual_production AS "Annual Production", emission_factor AS "Emission Factor", date::text AS "Date"
+    FROM coal_mines
+    """
+
+COPY_SQL = "COPY {table} (" + ', '.join(INGEST_COLUMNS) + ") FROM STDIN WITH (FORMAT csv)"
+
+# Server-side cursor names must be unique per connection
+_cursor_names = itertools.count()
+
+def read_sql_chunks(conn, query, params=None, chunk_size=DEFAULT_FETCH_SIZE):
+    # Stream a query through a named (server-side) cursor: only chunk_size rows are held in memory at a time
+    with conn.cursor(name=f"coal_mines_stream_{next(_cursor_names)}") as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(query, params)
+        rows = cursor.fetchmany(chunk_size)
+        # A named cursor only has a description after the first fetch
+        columns = [column[0] for column in cursor.description]
+        if not rows:
+            # An empty result still yields one (empty) frame so callers get the column labels
+            yield pd.DataFrame(columns=columns)
+        while rows:
+            yield pd.DataFrame(rows, columns=columns)
+            rows = cursor.fetchmany(chunk_size)
+
+def read_sql_dataframe(conn, query, params=None, chunk_size=DEFAULT_FETCH_SIZE):
+    return pd.concat(read_sql_chunks(conn, query, params, chunk_size), ignore_index=True)
+
+def write_copy_buffer(records):
+    # CSV for COPY; NULLs travel as empty unquoted fields. pyarrow's writer is an order of magnitude
+    # faster than DataFrame.to_csv on float columns, so it is used whenever it can handle the chunk.
+    if module_available('pyarrow'):
+        try:
+            buffer = io.BytesIO()
+            table = pa.Table.from_pandas(records, preserve_index=False)
+            pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+            buffer.seek(0)
+            return buffer
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass  # e.g. mixed types in one column
+    buffer = io.StringIO()
+    records.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    return buffer
+
+def copy_records(conn, df, table='coal_mines'):
+    # Bulk load through COPY ... FROM STDIN
+    records = select_ingest_columns(df)
+    buffer = write_copy_buffer(records)
+    with conn.cursor() as cursor:
+        cursor.copy_expert(COPY_SQL.format(table=table), buffer)
+    return len(records)
+
+def upsert_records(conn, df):
+    # COPY into the staging table, then merge it into coal_mines on the natural key: rows whose
+    # (mine_name, location, date) exists are updated, so loading the same data twice leaves one copy.
+    # Returns the number of distinct rows merged.
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_STAGING_SQL)
+        cursor.execute("TRUNCATE coal_mines_staging;")
+        copy_records(conn, df, table='coal_mines_staging')
+        cursor.execute(MERGE_STAGING_SQL)
+        return cursor.rowcount
+
+class PostgresBackend:
+    # Connection pool for the PostgreSQL deployment. connection_parameters is a DSN string or a dict of
+    # psycopg2.connect keyword arguments; the pool is opened on first use and shared by every caller.
+    def __init__(self, connection_parameters, min_connections=DEFAULT_POOL_MIN_CONNECTIONS,
+                 max_connections=DEFAULT_POOL_MAX_CONNECTIONS, fetch_size=DEFAULT_FETCH_SIZE):
+        self.connection_parameters = connection_parameters
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.fetch_size = fetch_size
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            if isinstance(self.connection_parameters, str):
+                self.pool = psycopg2_pool.ThreadedConnectionPool(
+                    self.min_connections, self.max_connections, dsn=self.connection_parameters
+                )
+            else:
+                self.pool = psycopg2_pool.ThreadedConnectionPool(
+                    self.min_connections, self.max_connections, **self.connection_parameters
+                )
+        return self.pool
+
+    @contextmanager
+    def connection(self):
+        # Borrow a pooled connection for one transaction: committed on success, rolled back on error
+        pool = self.get_pool()
+        conn = pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+
+    def create_table(self):
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(CREATE_TABLE_SQL)
+                for statement in CREATE_INDEX_SQL:
+                    cursor.execute(statement)
+                cursor.execute("SELECT to_regclass(%s);", (NATURAL_KEY_INDEX,))
+                if cursor.fetchone()[0] is None:
+                    cursor.execute(DEDUPLICATE_SQL)
+                    cursor.execute(CREATE_NATURAL_KEY_SQL)
+
+    def iter_dataframes(self, query=COAL_MINE_SELECT_POSTGRES, params=None, chunk_size=None):
+        with self.connection() as conn:
+            yield from read_sql_chunks(conn, query, params, chunk_size or self.fetch_size)
+
+    def fetch_dataframe(self, query=COAL_MINE_SELECT_POSTGRES, params=None):
+        with self.connection() as conn:
+            return read_sql_dataframe(conn, query, params, self.fetch_size)
+
+    def copy_dataframe(self, df):
+        with self.connection() as conn:
+            return upsert_records(conn, df)
+
+    def copy_csv_files(self, csv_paths, chunk_size):
+        # Every file in one transaction and upserted on the natural key, like ingest.ingest_csv_files for SQLite
+        start = time.perf_counter()
+        rows = 0
+        with self.connection() as conn:
+            for csv_path in csv_paths:
+                for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+                    rows += upsert_records(conn, chunk)
+        seconds = time.perf_counter() - start
+        rate = rows / seconds if seconds > 0 else float('inf')
+        print(f"Copied {rows} rows from {len(csv_paths)} file(s) in {seconds:.2f}s ({rate:,.0f} rows/sec).")
+        return rows, seconds
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
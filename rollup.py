@@ -0,0 +1,83 @@
+from lazy_imports import LazyModule
+
+pd = LazyModule('pandas')
+
+ROLLUP_TABLE = 'coal_mine_daily_rollup'
+
+# Period key for each trend resolution, derived from the daily 'YYYY-MM-DD' key
+TREND_RESOLUTIONS = {
+    'daily': "date",
+    'monthly': "substr(date, 1, 7)",
+    'yearly': "substr(date, 1, 4)"
+}
+
+def create_rollup_table(cursor):
+    # Per-date sums rather than means, so the rollup can be updated incrementally and rolled up further
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            date TEXT PRIMARY KEY,
+            total_production REAL NOT NULL DEFAULT 0,
+            emission_factor_sum REAL NOT NULL DEFAULT 0,
+            emission_factor_count INTEGER NOT NULL DEFAULT 0,
+            row_count INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+
+def rollup_table_exists(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (ROLLUP_TABLE,))
+    return cursor.fetchone() is not None
+
+def rebuild_rollup(cursor):
+    # Full rebuild from coal_mines; used when the rollup table is first created
+    cursor.execute(f"DELETE FROM {ROLLUP_TABLE};")
+    cursor.execute(f"""
+        INSERT INTO {ROLLUP_TABLE} (date, total_production, emission_factor_sum, emission_factor_count, row_count)
+        SELECT date(date), TOTAL(annual_production), TOTAL(emission_factor), COUNT(emission_factor), COUNT(*)
+        FROM coal_mines
+        WHERE date(date) IS NOT NULL
+        GROUP BY date(date);
+    """)
+
+def ensure_rollup(cursor):
+    # Build the rollup the first time it is needed, after that it is only updated incrementally
+    if not rollup_table_exists(cursor):
+        create_rollup_table(cursor)
+        rebuild_rollup(cursor)
+
+def update_rollup(cursor, rows, sign=1):
+    # Fold rows (a table or subquery with coal_mines' date, annual_production and emission_factor columns) into
+    # the rollup in one grouped statement; sign=-1 takes rows that are about to be overwritten back out
+    op = '+' if sign > 0 else '-'
+    cursor.execute(f"""
+        INSERT INTO {ROLLUP_TABLE} (date, total_production, emission_factor_sum, emission_factor_count, row_count)
+        SELECT date(date), {op}TOTAL(annual_production), {op}TOTAL(emission_factor), {op}COUNT(emission_factor),
+               {op}COUNT(*)
+        FROM {rows}
+        WHERE date(date) IS NOT NULL
+        GROUP BY date(date)
+        ON CONFLICT(date) DO UPDATE SET
+            total_production = total_production + excluded.total_production,
+            emission_factor_sum = emission_factor_sum + excluded.emission_factor_sum,
+            emission_factor_count = emission_factor_count + excluded.emission_factor_count,
+            row_count = row_count + excluded.row_count;
+    """)
+
+def fetch_trend(conn, resolution='daily'):
+    # Per-period total production and mean emission factor read from the rollup, not from coal_mines
+    if resolution not in TREND_RESOLUTIONS:
+        raise ValueError(f"Unknown trend resolution '{resolution}'. Choose from: {', '.join(TREND_RESOLUTIONS)}.")
+    period = TREND_RESOLUTIONS[resolution]
+    query = f"""
+        SELECT {period} AS period,
+               SUM(total_production) AS total_production,
+               SUM(emission_factor_sum) / NULLIF(SUM(emission_factor_count), 0) AS mean_emission_factor
+        FROM {ROLLUP_TABLE}
+        GROUP BY period
+        ORDER BY period
+    """
+    trend = pd.read_sql_query(query, conn)
+    return pd.DataFrame({
+        'Date': pd.to_datetime(trend['period']),
+        'Total Production': trend['total_production'],
+        'Mean Emission Factor': trend['mean_emission_factor']
+    })
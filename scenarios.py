@@ -0,0 +1,89 @@
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+
+# Scenarios evaluated per matrix product; bounds the (scenarios x mines) block held in memory
+DEFAULT_SCENARIO_CHUNK_SIZE = 1024
+
+def reduction_grid(steps=101, start=0.0, stop=100.0):
+    # Uniform reductions applied to every mine, e.g. 0%, 1%, ..., 100%; shape (steps, 1)
+    return np.linspace(start, stop, steps)[:, np.newaxis]
+
+def group_footprints(base_footprints, group_codes, group_count):
+    # Collapse per-mine footprints to per-group (e.g. per-state) totals
+    return np.bincount(group_codes, weights=base_footprints, minlength=group_count)
+
+def evaluate_reduction_scenarios(base_footprints, reductions_pct, chunk_size=DEFAULT_SCENARIO_CHUNK_SIZE):
+    # base_footprints: (mines,) footprint per mine. reductions_pct: (scenarios, mines) production cut
+    # per mine in percent, or (scenarios, 1) / (scenarios,) for one cut applied to every mine.
+    # The footprint is linear in production, so a scenario's total is baseline - reductions @ base;
+    # the base data is never copied per scenario.
+    base = np.asarray(base_footprints, dtype=np.float64)
+    reductions = np.asarray(reductions_pct, dtype=np.float64)
+    if reductions.ndim == 1:
+        reductions = reductions[:, np.newaxis]
+    if reductions.ndim != 2 or reductions.shape[1] not in (1, len(base)):
+        raise ValueError(f"Reductions must have shape (scenarios, {len(base)}) or (scenarios, 1), got {reductions.shape}.")
+    if np.any((reductions < 0) | (reductions > 100)):
+        raise ValueError("Reduction percentages must be between 0 and 100.")
+
+    baseline = base.sum()
+    if reductions.shape[1] == 1:
+        return baseline * (1 - reductions[:, 0] / 100)
+
+    reduced = np.empty(len(reductions))
+    for start in range(0, len(reductions), chunk_size):
+        block = reductions[start:start + chunk_size]
+        reduced[start:start + chunk_size] = baseline - block @ base / 100
+    return reduced
+
+def summarize_scenarios(baseline, reduced_totals, index=None):
+    reduced_totals = np.asarray(reduced_totals, dtype=np.float64)
+    saved = baseline - reduced_totals
+    return pd.DataFrame({
+        'Baseline Footprint (tCO2e)': baseline,
+        'Reduced Footprint (tCO2e)': reduced_totals,
+        'Reduction (tCO2e)': saved,
+        'Reduction (%)': saved / baseline * 100 if baseline else np.zeros_like(saved)
+    }, index=index)
+
+def allocate_reductions(production, emission_factor, target_reduction, max_reduction_pct=100.0, cost_per_tonne=None):
+    # Cheapest per-mine production cuts (in percent) that remove target_reduction tCO2e in total.
+    # Cutting one tonne at a mine saves emission_factor tCO2e and costs cost_per_tonne (default: the tonne
+    # itself), and each mine can be cut by at most max_reduction_pct. This is a fractional knapsack, so
+    # the greedy order by saving per unit cost is the exact LP optimum: mines are cut fully in that order
+    # and the last one partially. Runs in O(mines log mines).
+    production = np.asarray(production, dtype=np.float64)
+    emission_factor = np.asarray(emission_factor, dtype=np.float64)
+    cost = np.ones_like(production) if cost_per_tonne is None else np.broadcast_to(
+        np.asarray(cost_per_tonne, dtype=np.float64), production.shape)
+    max_fraction = np.broadcast_to(np.asarray(max_reduction_pct, dtype=np.float64) / 100, production.shape)
+    if np.any((max_fraction < 0) | (max_fraction > 1)):
+        raise ValueError("Maximum reduction percentages must be between 0 and 100.")
+    if np.any(cost <= 0):
+        raise ValueError("Costs per tonne must be positive.")
+
+    if len(production) == 0:
+        if target_reduction > 0:
+            raise ValueError("No mines available to reduce.")
+        return np.zeros(0)
+
+    # Largest footprint each mine can give up, in tCO2e
+    max_saving = production * max_fraction * emission_factor * 1e6
+    if target_reduction > max_saving.sum() * (1 + 1e-12):
+        raise ValueError(
+            f"Target reduction of {target_reduction:,.0f} tCO2e exceeds the {max_saving.sum():,.0f} tCO2e achievable."
+        )
+
+    order = np.argsort(-(emission_factor / cost), kind='stable')
+    cumulative = np.cumsum(max_saving[order])
+    # Mines before `last` are cut to their maximum; `last` covers whatever remains of the target
+    last = min(np.searchsorted(cumulative, target_reduction), len(order) - 1)
+    fraction = np.zeros_like(production)
+    fraction[order[:last]] = max_fraction[order[:last]]
+    remaining = target_reduction - (cumulative[last - 1] if last > 0 else 0.0)
+    saving_at_last = max_saving[order[last]]
+    if saving_at_last > 0:
+        fraction[order[last]] = max_fraction[order[last]] * min(remaining / saving_at_last, 1.0)
+    return fraction * 100
@@ -0,0 +1,73 @@
+import json
+import os
+import sqlite3
+
+from lazy_imports import LazyModule, module_available
+
+# The snapshot cache is optional; without pyarrow every start reads SQLite. pyarrow itself is only
+# imported when a snapshot is read or written.
+pa = LazyModule('pyarrow')
+feather = LazyModule('pyarrow.feather')
+
+# One snapshot per column layout, e.g. coal_mines.compact.feather
+SNAPSHOT_FILE = 'coal_mines.{layout}.feather'
+STAMP_FILE = 'coal_mines.{layout}.stamp.json'
+
+def snapshot_available():
+    return module_available('pyarrow')
+
+def database_stamp(db_path):
+    # Modification stamp plus row count; any write to the database changes at least one of these. Upserts
+    # can rewrite rows without changing the count, and in WAL mode they land in the -wal file until a
+    # checkpoint, so that file's stamp is included too.
+    stat = os.stat(db_path)
+    wal_path = db_path + '-wal'
+    wal_stat = os.stat(wal_path) if os.path.exists(wal_path) else None
+    conn = sqlite3.connect(db_path)
+    try:
+        row_count = conn.execute("SELECT COUNT(*) FROM coal_mines").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        'database': os.path.abspath(db_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'wal_mtime_ns': wal_stat.st_mtime_ns if wal_stat else None,
+        'wal_size': wal_stat.st_size if wal_stat else None,
+        'rows': row_count
+    }
+
+def read_snapshot(db_path, cache_dir, layout='default'):
+    # Returns the cached DataFrame, or None if there is no snapshot or the database has changed
+    if not snapshot_available():
+        return None
+    snapshot_path = os.path.join(cache_dir, SNAPSHOT_FILE.format(layout=layout))
+    stamp_path = os.path.join(cache_dir, STAMP_FILE.format(layout=layout))
+    if not (os.path.exists(snapshot_path) and os.path.exists(stamp_path)):
+        return None
+
+    with open(stamp_path) as f:
+        stored_stamp = json.load(f)
+    if stored_stamp != dict(database_stamp(db_path), layout=layout):
+        return None
+
+    table = feather.read_table(snapshot_path, memory_map=True)
+    return table.to_pandas()
+
+def write_snapshot(df, db_path, cache_dir, layout='default'):
+    if not snapshot_available():
+        return False
+    os.makedirs(cache_dir, exist_ok=True)
+    snapshot_path = os.path.join(cache_dir, SNAPSHOT_FILE.format(layout=layout))
+    stamp_path = os.path.join(cache_dir, STAMP_FILE.format(layout=layout))
+
+    # Write to temporary names first so a crash never leaves a snapshot paired with the wrong stamp.
+    # Uncompressed, so read_snapshot's memory map hands out the columns without decompressing them.
+    feather.write_feather(
+        pa.Table.from_pandas(df, preserve_index=False), snapshot_path + '.tmp', compression='uncompressed'
+    )
+    with open(stamp_path + '.tmp', 'w') as f:
+        json.dump(dict(database_stamp(db_path), layout=layout), f)
+    os.replace(snapshot_path + '.tmp', snapshot_path)
+    os.replace(stamp_path + '.tmp', stamp_path)
+    return True
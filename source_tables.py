@@ -0,0 +1,119 @@
+import re
+
+from lazy_imports import LazyModule
+
+pd = LazyModule('pandas')
+
+# Turns tables scraped from published statistics (PDF reports, HTML directories) into coal_mines records.
+# Extractors hand over a table as a list of rows of cell text plus any surrounding text (caption, page
+# text) that may name the production unit.
+
+RECORD_COLUMNS = ['mine_name', 'location', 'annual_production', 'emission_factor', 'date']
+
+# Header keywords for each coal_mines column, matched case-insensitively; the first matching column wins
+HEADER_ALIASES = {
+    'emission_factor': ('emission factor',),
+    'annual_production': ('production', 'output'),
+    'mine_name': ('mine', 'colliery', 'coalfield', 'coal field', 'project'),
+    'location': ('state',),
+    'date': ('year', 'date', 'period')
+}
+
+# Production unit -> factor to million tonnes; longer phrases are checked first
+PRODUCTION_UNITS = (
+    ('million tonnes', 1.0),
+    ('million tonne', 1.0),
+    ('lakh tonnes', 0.1),
+    ('thousand tonnes', 1e-3),
+    ("'000 tonnes", 1e-3),
+    ('000 tonnes', 1e-3),
+    ('mt', 1.0),
+    ('tonnes', 1e-6)
+)
+
+# Rows such as "Total" or "All India" are aggregates, not mines
+TOTAL_ROW = re.compile(r'^\s*(grand\s+)?total\b|^\s*all\s+india\b', re.IGNORECASE)
+NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+FINANCIAL_YEAR = re.compile(r'^\s*(\d{4})\s*[-/]\s*(\d{2}|\d{4})\s*$')
+CALENDAR_YEAR = re.compile(r'^\s*(\d{4})\s*$')
+ISO_DATE = re.compile(r'^\s*(\d{4}-\d{2}-\d{2})')
+
+def clean_cell(cell):
+    return ' '.join(str(cell).split()) if cell is not None else ''
+
+def parse_number(text):
+    # "4,812.5", "4 812.5*" -> 4812.5; dashes, "NA" and empty cells -> None
+    match = NUMBER.search(clean_cell(text).replace(',', '').replace(' ', ''))
+    return float(match.group()) if match else None
+
+def production_unit_scale(*texts):
+    # Factor converting the stated production unit to million tonnes; None if no unit is mentioned
+    for text in texts:
+        lowered = clean_cell(text).lower()
+        for unit, scale in PRODUCTION_UNITS:
+            if re.search(r'(?<![a-z])' + re.escape(unit) + r'(?![a-z])', lowered):
+                return scale
+    return None
+
+def normalize_period(text):
+    # '2021-22' (Indian financial year) -> '2021-04-01'; '2021' -> '2021-01-01'; ISO dates pass through
+    text = clean_cell(text)
+    match = FINANCIAL_YEAR.match(text)
+    if match:
+        return f"{match.group(1)}-04-01"
+    match = CALENDAR_YEAR.match(text)
+    if match:
+        return f"{match.group(1)}-01-01"
+    match = ISO_DATE.match(text)
+    return match.group(1) if match else None
+
+def match_header(row):
+    # Column index for each coal_mines column found in a header row
+    columns = {}
+    for index, cell in enumerate(row):
+        label = clean_cell(cell).lower()
+        for column, aliases in HEADER_ALIASES.items():
+            if column not in columns and any(alias in label for alias in aliases):
+                columns[column] = index
+                break
+    return columns
+
+def find_header(table, max_header_rows=3):
+    # First of the leading rows that names at least a mine and a production column
+    for position, row in enumerate(table[:max_header_rows]):
+        columns = match_header(row)
+        if 'mine_name' in columns and 'annual_production' in columns:
+            return position, columns
+    return None, None
+
+def table_records(table, context='', default_unit_scale=1.0):
+    # Rows of one table as coal_mines records (tuples in RECORD_COLUMNS order); [] if it is not a mine table
+    position, columns = find_header(table)
+    if position is None:
+        return []
+    header = table[position]
+    production_header = header[columns['annual_production']]
+    scale = production_unit_scale(production_header, context)
+    scale = default_unit_scale if scale is None else scale
+
+    records = []
+    for row in table[position + 1:]:
+        cells = [clean_cell(cell) for cell in row]
+        if len(cells) < len(header):
+            cells += [''] * (len(header) - len(cells))
+        mine = cells[columns['mine_name']]
+        production = parse_number(cells[columns['annual_production']])
+        if not mine or production is None or TOTAL_ROW.search(mine):
+            continue
+        location = cells[columns['location']] if 'location' in columns else ''
+        emission_factor = parse_number(cells[columns['emission_factor']]) if 'emission_factor' in columns else None
+        date = normalize_period(cells[columns['date']]) if 'date' in columns else None
+        records.append((mine, location or None, production * scale, emission_factor, date))
+    return records
+
+def records_frame(records, emission_factor=None):
+    # DataFrame accepted by ingest.upsert_records; emission_factor fills rows whose table had none
+    frame = pd.DataFrame(list(records), columns=RECORD_COLUMNS)
+    if emission_factor is not None:
+        frame['emission_factor'] = frame['emission_factor'].fillna(emission_factor)
+    return frame
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+QUERIES = [
+    ['total'],
+    ['state', 'Jharkhand'],
+    ['mine', 'Jharkhand', 'Jharia'],
+    ['trend', '--resolution', 'monthly'],
+    ['compare', '--mine', 'Jharkhand', 'Jharia', '--mine', 'Odisha', 'Jagannath'],
+    ['compare', '--matrix'],
+    ['simulate', '--reduction', '10'],
+    ['simulate', '--grid', '3'],
+]
+
+def run_cli(tmp_path, *argv, stdin=None, returncode=0):
+    # A fresh process, so the status messages of database creation and loading are part of the run
+    env = dict(os.environ, MPLBACKEND='Agg')
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'cli.py'), '--db', str(tmp_path / 'cli.db'),
+         '--snapshot-dir', str(tmp_path / 'snapshots'), '--output-dir', str(tmp_path), *argv],
+        input=stdin, capture_output=True, text=True, cwd=tmp_path, env=env
+    )
+    assert result.returncode == returncode, result.stderr
+    return result
+
+@pytest.mark.parametrize('argv', QUERIES, ids=' '.join)
+def test_stdout_is_json(tmp_path, argv):
+    result = run_cli(tmp_path, *argv)
+    assert json.loads(result.stdout)
+    # The loader's status messages still reach the user
+    assert 'successfully' in result.stderr
+
+def test_stdout_is_csv(tmp_path):
+    result = run_cli(tmp_path, '--format', 'csv', 'total')
+    rows = list(csv.DictReader(io.StringIO(result.stdout)))
+    assert len(rows) == 20
+    assert 'Mine Name' in rows[0]
+
+def test_ingest_stdout_is_json(tmp_path):
+    csv_path = tmp_path / 'mines.csv'
+    csv_path.write_text("Mine Name,Location,Annual Production,Emission Factor,Date\n"
+                        "Test Mine,Odisha,1.5,0.9,2024-02-01\n")
+    result = run_cli(tmp_path, 'ingest', str(csv_path))
+    assert json.loads(result.stdout)[0]['rows'] == 1
+    assert 'Ingested' in result.stderr
+
+def test_batch_stdout_is_one_json_document_per_query(tmp_path):
+    result = run_cli(tmp_path, 'batch', '-', stdin='\n'.join(' '.join(argv) for argv in QUERIES[:4]) + '\n')
+    lines = result.stdout.splitlines()
+    assert len(lines) == 4
+    for line in lines:
+        json.loads(line)
+
+@pytest.mark.parametrize('argv', [
+    ['compare', '--mine', 'Jharkhand', 'Nope', '--mine', 'Odisha', 'Jagannath'],
+    ['compare', '--mine', 'Jharkhand', 'Jharia'],
+    ['simulate'],
+], ids=' '.join)
+def test_bad_query_is_an_error_message(tmp_path, argv):
+    result = run_cli(tmp_path, *argv, returncode=2)
+    assert not result.stdout
+    assert 'error: ' in result.stderr
+    assert 'Traceback' not in result.stderr
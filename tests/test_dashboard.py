@@ -0,0 +1,157 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import main
+from dashboard import RenderQueue, RenderQueueFull, create_app
+from main import CoalMineFootprintCalculator, create_database_and_table
+
+@pytest.fixture
+def dashboard(tmp_path):
+    db_path = str(tmp_path / 'dashboard.db')
+    create_database_and_table(db_path)
+    app = create_app(db_path, str(tmp_path / 'snapshots'), render_workers=1)
+    yield app, db_path
+    app.config['DASHBOARD_CACHE'].render_queue.shutdown()
+
+def add_mine(db_path, name):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO coal_mines (mine_name, location, annual_production, emission_factor, date) "
+                     "VALUES (?, 'Odisha', 1.0, 0.9, '2024-02-01');", (name,))
+    conn.close()
+
+@pytest.fixture
+def slow_loads(monkeypatch):
+    # Counts database loads and stretches each one, so requests and other reloads overlap it
+    loads = []
+    load = CoalMineFootprintCalculator.load_data_from_db
+
+    def slow_load(self):
+        loads.append(threading.get_ident())
+        time.sleep(0.2)
+        return load(self)
+
+    monkeypatch.setattr(CoalMineFootprintCalculator, 'load_data_from_db', slow_load)
+    return loads
+
+@pytest.fixture
+def slow_load_steps(monkeypatch):
+    # Stretches both the database read and the snapshot write, so one reload can start reading while an
+    # earlier one is still between reading its rows and publishing the new data version
+    fetch = main.fetch_coal_mine_data_sqlite
+    save_snapshot = CoalMineFootprintCalculator.save_snapshot
+
+    def slow_fetch(conn, *args, **kwargs):
+        time.sleep(0.2)
+        return fetch(conn, *args, **kwargs)
+
+    def slow_save_snapshot(self):
+        time.sleep(0.1)
+        return save_snapshot(self)
+
+    monkeypatch.setattr(main, 'fetch_coal_mine_data_sqlite', slow_fetch)
+    monkeypatch.setattr(CoalMineFootprintCalculator, 'save_snapshot', slow_save_snapshot)
+
+def test_reload_while_summaries_are_served(dashboard, slow_load_steps):
+    app, db_path = dashboard
+    rows_before = app.test_client().get('/api/totals').get_json()['rows']
+    add_mine(db_path, 'Reloaded Mine')
+
+    stop = threading.Event()
+    failures = []
+
+    def poll(path):
+        client = app.test_client()
+        while not stop.is_set():
+            try:
+                status = client.get(path).status_code
+            except Exception as e:
+                status = repr(e)
+            if status != 200:
+                failures.append((path, status))
+
+    responses = []
+
+    def reload():
+        responses.append(app.test_client().post('/api/reload'))
+
+    pollers = [threading.Thread(target=poll, args=(path,)) for path in ('/api/totals', '/api/states', '/')]
+    for thread in pollers:
+        thread.start()
+    try:
+        # Overlapping reloads: each new one starts while the previous one is still loading
+        reloads = [threading.Thread(target=reload) for _ in range(6)]
+        for thread in reloads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in reloads:
+            thread.join()
+    finally:
+        stop.set()
+        for thread in pollers:
+            thread.join()
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert not failures
+    totals = app.test_client().get('/api/totals').get_json()
+    assert totals['rows'] == rows_before + 1
+    assert totals['data_version'] == max(response.get_json()['data_version'] for response in responses)
+
+def test_concurrent_reloads_are_coalesced(dashboard, slow_loads):
+    app, db_path = dashboard
+    versions = []
+    add_mine(db_path, 'Coalesced Mine')
+
+    def reload():
+        versions.append(app.test_client().post('/api/reload').get_json()['data_version'])
+
+    threads = [threading.Thread(target=reload) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The first reload runs; the others arrive while it runs and share a single follow-up reload
+    assert len(slow_loads) <= 2
+    assert len(versions) == 4
+    assert app.test_client().get('/api/totals').get_json()['rows'] == 21
+
+def test_full_render_queue_answers_busy(dashboard):
+    app, _ = dashboard
+    app.config['DASHBOARD_CACHE'].render_queue.max_pending = 1
+    client = app.test_client()
+
+    # The first render is still starting its worker process when the second chart is asked for
+    assert client.get('/charts/total.png?wait=0').status_code == 202
+    response = client.get('/charts/states/Odisha.png?wait=0')
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+    # Joining the job already in flight needs no room in the queue
+    assert client.get('/charts/total.png?wait=0').status_code == 202
+
+def test_render_jobs_are_built_outside_the_queue_lock():
+    queue = RenderQueue(workers=1, max_pending=1)
+    builds = []
+
+    def build(title):
+        def prepare():
+            builds.append(queue.lock.locked())
+            return 'footprint_bars', (['Jharia'], [3.15], title), 'png'
+        return prepare
+
+    try:
+        _, future = queue.submit('first', build('First'))
+        with pytest.raises(RenderQueueFull):
+            queue.submit('second', build('Second'))
+        assert builds == [False, False]
+        assert future.result(timeout=60)[:8] == b'\x89PNG\r\n\x1a\n'
+        # Finished jobs free their slot
+        deadline = time.monotonic() + 5
+        while queue.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        queue.submit('second', build('Second'))[1].result(timeout=60)
+    finally:
+        queue.shutdown()
@@ -0,0 +1,98 @@
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip('requests')
+
+from benchmark import start_directory_server
+from fetcher import CachedFetcher
+
+@pytest.fixture
+def directory():
+    server, counts = start_directory_server(pages=3, page_bytes=100, latency=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}/coal-directory", counts
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'http_cache')
+
+def age_entry(fetcher, url, seconds):
+    # Pretend the entry was downloaded or revalidated `seconds` ago
+    meta_path, _ = fetcher.cache_paths(url)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['fetched_at'] -= seconds
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+def test_entry_within_ttl_is_served_without_a_request(directory, cache_dir):
+    url, counts = directory
+    fetcher = CachedFetcher(cache_dir, ttl=60)
+    try:
+        first = fetcher.fetch(url, {'page': 0})
+        second = fetcher.fetch(url, {'page': 0})
+    finally:
+        fetcher.close()
+    assert (first['source'], second['source']) == ('downloaded', 'cached')
+    assert second['content'] == first['content']
+    assert counts == {200: 1, 304: 0, 404: 0}
+
+def test_expired_entry_is_revalidated_with_its_etag(directory, cache_dir):
+    url, counts = directory
+    fetcher = CachedFetcher(cache_dir, ttl=60)
+    try:
+        first = fetcher.fetch(url, {'page': 1})
+        age_entry(fetcher, first['url'], 120)
+        revalidated = fetcher.fetch(url, {'page': 1})
+        # Revalidation restarts the TTL
+        cached = fetcher.fetch(url, {'page': 1})
+    finally:
+        fetcher.close()
+    assert (revalidated['source'], cached['source']) == ('revalidated', 'cached')
+    assert revalidated['content'] == cached['content'] == first['content']
+    assert counts == {200: 1, 304: 1, 404: 0}
+
+def test_changed_resource_is_downloaded_again(directory, cache_dir):
+    url, counts = directory
+    fetcher = CachedFetcher(cache_dir, ttl=0)
+    try:
+        first = fetcher.fetch(url, {'page': 2})
+        meta_path, _ = fetcher.cache_paths(first['url'])
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(meta_path, 'w') as f:
+            json.dump(dict(meta, etag='"stale"'), f)
+        assert fetcher.fetch(url, {'page': 2})['source'] == 'downloaded'
+    finally:
+        fetcher.close()
+    assert counts[200] == 2
+
+def test_storing_a_new_entry_evicts_expired_ones(directory, cache_dir):
+    url, _ = directory
+    fetcher = CachedFetcher(cache_dir, ttl=60, max_cache_age=3600)
+    try:
+        old = fetcher.fetch(url, {'page': 0})['url']
+        kept = fetcher.fetch(url, {'page': 1})['url']
+        age_entry(fetcher, old, 7200)
+        # Eviction ran when the first entry was stored; the next scan is due only after the interval
+        fetcher.last_eviction = time.time() - fetcher.eviction_interval
+        fetcher.fetch(url, {'page': 2})
+    finally:
+        fetcher.close()
+    assert not any(os.path.exists(path) for path in fetcher.cache_paths(old))
+    assert all(os.path.exists(path) for path in fetcher.cache_paths(kept))
+
+def test_eviction_scans_at_most_once_per_interval(directory, cache_dir):
+    url, _ = directory
+    fetcher = CachedFetcher(cache_dir, ttl=60, max_cache_age=3600)
+    try:
+        old = fetcher.fetch(url, {'page': 0})['url']
+        age_entry(fetcher, old, 7200)
+        fetcher.fetch(url, {'page': 1})
+        assert os.path.exists(fetcher.cache_paths(old)[0])
+    finally:
+        fetcher.close()
@@ -0,0 +1,16 @@
+import pytest
+
+from benchmark import HEAVY_MODULES, IMPORT_BUDGET_MS, IMPORT_MODULES, measure_import
+
+# Best of a few runs, as benchmark.py imports does: the first run may also compile bytecode
+REPEATS = 3
+
+@pytest.mark.parametrize('module', IMPORT_MODULES)
+def test_import_within_budget(module):
+    runs = [measure_import(module) for _ in range(REPEATS)]
+    assert min(ms for ms, _ in runs) <= IMPORT_BUDGET_MS
+
+@pytest.mark.parametrize('module', IMPORT_MODULES)
+def test_no_heavy_library_imported_at_startup(module):
+    _, eager = measure_import(module)
+    assert not eager, f"importing {module} loads {', '.join(eager)}; use LazyModule for {HEAVY_MODULES}"
@@ -0,0 +1,102 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import FOOTPRINT_COLUMN, CoalMineFootprintCalculator, compute_footprint, create_database_and_table
+
+@pytest.fixture(params=[False, True], ids=['default', 'compact'])
+def calculator(request, tmp_path):
+    db_path = str(tmp_path / 'memo.db')
+    create_database_and_table(db_path)
+    calculator = CoalMineFootprintCalculator(
+        sqlite_database_path=db_path, snapshot_dir=str(tmp_path / 'snapshots'), compact=request.param, headless=True
+    )
+    calculator.load_data_from_db()
+    return calculator
+
+def new_rows():
+    # One more row for a known mine, and a mine not seen before; the stale footprint must not survive
+    return pd.DataFrame({
+        'Mine Name': ['Jharia', 'New Mine'],
+        'Location': ['Jharkhand', 'Odisha'],
+        'Annual Production': [1.5, 2.0],
+        'Emission Factor': [0.8, 0.9],
+        'Date': ['2024-02-01', '2024-02-01'],
+        FOOTPRINT_COLUMN: [-1.0, -1.0]
+    })
+
+def expected_mine_summary(data):
+    # Built from scratch, without any memoized column or table
+    footprint = compute_footprint(data['Annual Production'], data['Emission Factor'])
+    frame = pd.DataFrame({
+        'Location': data['Location'].astype(str), 'Mine Name': data['Mine Name'].astype(str),
+        'Annual Production': data['Annual Production'].astype(np.float64), FOOTPRINT_COLUMN: footprint
+    })
+    return frame.groupby(['Location', 'Mine Name'], sort=True).agg(
+        production=('Annual Production', 'sum'), footprint=(FOOTPRINT_COLUMN, 'sum'), rows=(FOOTPRINT_COLUMN, 'size')
+    )
+
+def assert_summary_current(calculator):
+    footprint = calculator.ensure_footprint()
+    data = calculator.coal_mine_data
+    np.testing.assert_allclose(footprint, compute_footprint(data['Annual Production'], data['Emission Factor']),
+                               rtol=1e-6)
+    summary = calculator.get_mine_summary()
+    expected = expected_mine_summary(data)
+    assert [tuple(map(str, key)) for key in summary.index] == list(expected.index)
+    np.testing.assert_allclose(summary['Annual Production'], expected['production'], rtol=1e-6)
+    np.testing.assert_allclose(summary[FOOTPRINT_COLUMN], expected['footprint'], rtol=1e-6)
+    assert summary['Rows'].tolist() == expected['rows'].tolist()
+
+def test_unchanged_data_reuses_memoized_results(calculator):
+    computed = []
+
+    def compute(df):
+        computed.append(calculator.data_version)
+        return df['Annual Production'] * 2
+
+    summary = calculator.get_mine_summary()
+    for _ in range(2):
+        calculator.get_derived_column('Doubled', compute)
+    assert calculator.get_mine_summary() is summary
+    assert len(computed) == 1
+    calculator.append_data(new_rows())
+    calculator.get_derived_column('Doubled', compute)
+    assert len(computed) == 2
+
+def test_append_data_invalidates(calculator):
+    version, summary = calculator.data_version, calculator.get_mine_summary()
+    rows = len(calculator.coal_mine_data)
+    calculator.append_data(new_rows())
+
+    assert calculator.data_version > version
+    assert calculator.get_mine_summary() is not summary
+    assert len(calculator.coal_mine_data) == rows + 2
+    assert (calculator.ensure_footprint() > 0).all()
+    assert_summary_current(calculator)
+    assert calculator.get_mine_summary().loc[('Jharkhand', 'Jharia'), 'Rows'] == 2
+
+def test_reload_data_from_db_invalidates(calculator):
+    summary = calculator.get_mine_summary()
+    conn = sqlite3.connect(calculator.sqlite_database_path)
+    with conn:
+        conn.execute("INSERT INTO coal_mines (mine_name, location, annual_production, emission_factor, date) "
+                     "VALUES ('New Mine', 'Odisha', 2.0, 0.9, '2024-02-01');")
+    conn.close()
+    calculator.reload_data_from_db()
+
+    assert calculator.get_mine_summary() is not summary
+    assert ('Odisha', 'New Mine') in calculator.get_mine_summary().index
+    assert_summary_current(calculator)
+
+def test_reload_from_snapshot_invalidates(calculator):
+    # The second load of an unchanged database comes from the snapshot; it is new data all the same
+    calculator.append_data(new_rows())
+    summary = calculator.get_mine_summary()
+    calculator.reload_data_from_db()
+
+    assert calculator.get_mine_summary() is not summary
+    assert ('Odisha', 'New Mine') not in calculator.get_mine_summary().index
+    assert_summary_current(calculator)
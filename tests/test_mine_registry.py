@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from main import CoalMineFootprintCalculator, create_database_and_table
+
+@pytest.fixture(params=[False, True], ids=['default', 'compact'])
+def calculator(request, tmp_path):
+    db_path = str(tmp_path / 'registry.db')
+    create_database_and_table(db_path)
+    calculator = CoalMineFootprintCalculator(sqlite_database_path=db_path, compact=request.param, headless=True)
+    calculator.load_data_from_db()
+    return calculator
+
+def new_rows():
+    # Out of mine order: a second row for a known mine, a new mine in a known state, a new state, and a
+    # row without a state that no lookup can reach
+    return pd.DataFrame({
+        'Mine Name': ['Zeta Mine', 'Jharia', 'Aa Mine', 'Jharia', 'Orphan'],
+        'Location': ['Jharkhand', 'Jharkhand', 'Assam', 'Jharkhand', None],
+        'Annual Production': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'Emission Factor': [0.8, 0.9, 0.7, 0.9, 0.8],
+        'Date': ['2024-02-01', '2024-02-01', '2024-02-01', '2024-03-01', '2024-02-01']
+    })
+
+def mask_rows(calculator, state, mine=None):
+    calculator.ensure_footprint()
+    data = calculator.coal_mine_data
+    mask = data['Location'] == state
+    if mine is not None:
+        mask &= data['Mine Name'] == mine
+    return data[mask]
+
+def assert_lookups_match_masks(calculator):
+    data = calculator.coal_mine_data
+    keys = data[['Location', 'Mine Name']].dropna().drop_duplicates().itertuples(index=False)
+    lookups = [(state, mine) for state, mine in keys]
+    lookups += [(state, None) for state in data['Location'].dropna().unique()]
+    lookups += [('Jharkhand', 'No Such Mine'), ('No Such State', None)]
+    for state, mine in lookups:
+        expected = mask_rows(calculator, state, mine)
+        selected = calculator.select_mine_rows(state, mine)
+        pd.testing.assert_frame_equal(selected, expected)
+        registry = calculator.get_mine_registry()
+        assert ((state, mine) in registry if mine is not None else state in registry) == (not expected.empty)
+
+def test_lookups_match_masks_after_load(calculator):
+    assert_lookups_match_masks(calculator)
+
+def test_lookups_match_masks_after_append(calculator):
+    registry = calculator.get_mine_registry()
+    calculator.append_data(new_rows())
+    assert calculator.get_mine_registry() is not registry
+    assert_lookups_match_masks(calculator)
+    # A mine's rows keep their original order
+    assert calculator.select_mine_rows('Jharkhand', 'Jharia')['Annual Production'].tolist() == [3.5, 2.0, 4.0]
+    assert calculator.get_mine_registry().mines('Assam') == ['Aa Mine']
+
+def test_filtered_fetch_matches_masks_after_append(calculator):
+    calculator.append_data(new_rows())
+    calculator.sqlite_database_path = None  # filter the loaded rows instead of querying SQLite
+    for state, mine in [('Jharkhand', 'Jharia'), ('Jharkhand', None), ('Assam', 'Aa Mine')]:
+        expected = mask_rows(calculator, state, mine)
+        pd.testing.assert_frame_equal(calculator.fetch_filtered_data(state, mine), expected)
@@ -0,0 +1,129 @@
+import sqlite3
+
+import pytest
+
+from main import create_database_and_table
+from mospi_pdf import ingest_pdf, page_fingerprints
+
+HEADER = ['Name of Mine', 'State', 'Year', 'Production']
+COLUMN_X = [50, 200, 320, 420, 540]
+TOP, ROW_HEIGHT = 700, 20
+
+PAGES = [
+    [['Alpha Mine', 'Odisha', '2021-22', '1,250.0'], ['Beta Mine', 'Odisha', '2021-22', '980.5']],
+    [['Gamma Mine', 'Jharkhand', '2021-22', '2,100.0'], ['Delta Mine', 'Jharkhand', '2021-22', '640.0'],
+     ['Total', '', '', '2,740.0']],
+]
+
+def grid_stream(rows):
+    # Ruling lines of a table with a header and len(rows) body rows
+    bottom = TOP - ROW_HEIGHT * (len(rows) + 1)
+    lines = [f"{x} {TOP} m {x} {bottom} l S" for x in COLUMN_X]
+    lines += [f"{COLUMN_X[0]} {y} m {COLUMN_X[-1]} {y} l S" for y in range(TOP, bottom - 1, -ROW_HEIGHT)]
+    return '\n'.join(['0.5 w'] + lines)
+
+def text_stream(rows):
+    commands = ["BT /F1 12 Tf 50 740 Td (Mine-wise production of coal \\(Thousand Tonnes\\)) Tj ET"]
+    for row_index, row in enumerate([HEADER] + rows):
+        y = TOP - ROW_HEIGHT * (row_index + 1) + 6
+        for x, cell in zip(COLUMN_X, row):
+            if cell:
+                commands.append(f"BT /F1 9 Tf {x + 4} {y} Td ({cell}) Tj ET")
+    return '\n'.join(commands)
+
+def write_pdf(path):
+    # Minimal report: the first page draws its table from one content stream, the second from a
+    # /Contents array of two streams (ruling lines, then text), as many PDF writers produce
+    objects = {1: "<< /Type /Catalog /Pages 2 0 R >>",
+               3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    streams = {}
+    page_ids = []
+    next_id = 4
+    for page_index, rows in enumerate(PAGES):
+        page_id, next_id = next_id, next_id + 1
+        page_ids.append(page_id)
+        parts = ([grid_stream(rows) + '\n' + text_stream(rows)] if page_index == 0
+                 else [grid_stream(rows), text_stream(rows)])
+        stream_ids = []
+        for part in parts:
+            streams[next_id] = part
+            stream_ids.append(next_id)
+            next_id += 1
+        contents = (f"{stream_ids[0]} 0 R" if len(stream_ids) == 1
+                    else '[' + ' '.join(f"{stream_id} 0 R" for stream_id in stream_ids) + ']')
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {contents} >>")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(page_ids)} >>"
+    for stream_id, data in streams.items():
+        objects[stream_id] = f"<< /Length {len(data.encode())} >>\nstream\n{data}\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += f"{object_id} 0 obj\n{objects[object_id]}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for object_id in sorted(objects):
+        out += f"{offsets[object_id]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+@pytest.fixture
+def report(tmp_path):
+    path = tmp_path / 'energy_statistics.pdf'
+    write_pdf(path)
+    return path
+
+def new_database(path):
+    create_database_and_table(str(path))
+    return str(path)
+
+def fixture_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT mine_name, location, annual_production, date FROM coal_mines "
+                            "WHERE mine_name LIKE '% Mine' ORDER BY mine_name;").fetchall()
+    finally:
+        conn.close()
+
+def row_count(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM coal_mines;").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_fingerprints_cover_multi_stream_pages(report):
+    fingerprints = page_fingerprints(str(report))
+    assert len(fingerprints) == 2
+    assert len(set(fingerprints)) == 2
+
+def test_ingest_twice_skips_pages(report, tmp_path):
+    db_path = new_database(tmp_path / 'report.db')
+    cache_dir = str(tmp_path / 'page_cache')
+    before = row_count(db_path)
+
+    stats = ingest_pdf(str(report), db_path, cache_dir)
+    assert (stats['pages'], stats['extracted'], stats['cached'], stats['skipped']) == (2, 2, 0, 0)
+    assert stats['rows'] == 4
+    assert fixture_rows(db_path) == [
+        ('Alpha Mine', 'Odisha', 1.25, '2021-04-01'),
+        ('Beta Mine', 'Odisha', 0.9805, '2021-04-01'),
+        ('Delta Mine', 'Jharkhand', 0.64, '2021-04-01'),
+        ('Gamma Mine', 'Jharkhand', 2.1, '2021-04-01'),
+    ]
+    assert row_count(db_path) == before + 4
+
+    stats = ingest_pdf(str(report), db_path, cache_dir)
+    assert (stats['extracted'], stats['cached'], stats['skipped'], stats['rows']) == (0, 0, 2, 0)
+    assert row_count(db_path) == before + 4
+
+def test_page_cache_serves_a_new_database(report, tmp_path):
+    cache_dir = str(tmp_path / 'page_cache')
+    ingest_pdf(str(report), new_database(tmp_path / 'first.db'), cache_dir)
+
+    db_path = new_database(tmp_path / 'second.db')
+    stats = ingest_pdf(str(report), db_path, cache_dir)
+    assert (stats['extracted'], stats['cached'], stats['skipped'], stats['rows']) == (0, 2, 0, 4)
+    assert len(fixture_rows(db_path)) == 4
@@ -0,0 +1,131 @@
+import csv
+import io
+import re
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from ingest import INGEST_COLUMNS
+from postgres_backend import (
+    CREATE_NATURAL_KEY_SQL, CREATE_STAGING_SQL, DEDUPLICATE_SQL, MERGE_STAGING_SQL, NATURAL_KEY_POSTGRES,
+    PostgresBackend, upsert_records
+)
+
+def squash(sql):
+    return ' '.join(sql.split())
+
+class FakeCursor:
+    # Records what would be sent to the server; the COPY payload is parsed back into rows
+    def __init__(self, rowcount=0, fetchone=None, fail_on=None):
+        self.statements = []
+        self.copied = []
+        self.rowcount = rowcount
+        self.fetchone_result = fetchone
+        self.fail_on = fail_on
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append(squash(sql))
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError('server error')
+
+    def copy_expert(self, sql, buffer):
+        self.statements.append(squash(sql))
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError('server error')
+        payload = buffer.read()
+        if isinstance(payload, bytes):
+            payload = payload.decode()
+        self.copied.extend(csv.reader(io.StringIO(payload)))
+
+    def fetchone(self):
+        return self.fetchone_result
+
+def fake_connection(cursor):
+    conn = mock.Mock()
+    conn.cursor.return_value = cursor
+    return conn
+
+def fake_backend(conn):
+    backend = PostgresBackend('postgresql://unused')
+    backend.pool = mock.Mock()
+    backend.pool.getconn.return_value = conn
+    return backend
+
+def frame():
+    return pd.DataFrame({
+        'Mine Name': ['Jharia', 'Jharia', 'Gevra'],
+        'Location': ['Jharkhand', 'Jharkhand', None],
+        'Annual Production': [3.5, 3.6, 5.5],
+        'Emission Factor': [0.9, 0.9, 0.88],
+        'Date': ['2024-01-01', '2024-01-01', '2024-01-01']
+    })
+
+def test_upsert_copies_into_staging_then_merges():
+    cursor = FakeCursor(rowcount=2)
+    assert upsert_records(fake_connection(cursor), frame()) == 2
+
+    assert cursor.statements == [
+        squash(CREATE_STAGING_SQL),
+        'TRUNCATE coal_mines_staging;',
+        f"COPY coal_mines_staging ({', '.join(INGEST_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        squash(MERGE_STAGING_SQL)
+    ]
+    # Every row is staged in input order; NULLs travel as empty fields
+    assert [row[:3] for row in cursor.copied] == [
+        ['Jharia', 'Jharkhand', '3.5'], ['Jharia', 'Jharkhand', '3.6'], ['Gevra', '', '5.5']
+    ]
+
+def test_merge_keeps_the_last_staged_row_per_natural_key():
+    merge = squash(MERGE_STAGING_SQL)
+    assert f'SELECT DISTINCT ON ({NATURAL_KEY_POSTGRES})' in merge
+    assert f'ORDER BY {NATURAL_KEY_POSTGRES}, seq DESC' in merge
+    # The conflict target must spell out the unique index's expressions for Postgres to infer it
+    assert f'ON CONFLICT ({NATURAL_KEY_POSTGRES}) DO UPDATE' in merge
+    index_expressions = re.search(r'ON coal_mines \((.*)\);', CREATE_NATURAL_KEY_SQL).group(1)
+    assert index_expressions == NATURAL_KEY_POSTGRES
+
+def test_connection_is_committed_and_released():
+    cursor = FakeCursor(rowcount=3)
+    conn = fake_connection(cursor)
+    backend = fake_backend(conn)
+    assert backend.copy_dataframe(frame()) == 3
+    conn.commit.assert_called_once_with()
+    conn.rollback.assert_not_called()
+    backend.pool.putconn.assert_called_once_with(conn)
+
+@pytest.mark.parametrize('failing_statement', ['TRUNCATE', 'COPY', 'INSERT INTO coal_mines'])
+def test_connection_is_rolled_back_and_released_on_error(failing_statement):
+    conn = fake_connection(FakeCursor(fail_on=failing_statement))
+    backend = fake_backend(conn)
+    with pytest.raises(RuntimeError):
+        backend.copy_dataframe(frame())
+    conn.rollback.assert_called_once_with()
+    conn.commit.assert_not_called()
+    backend.pool.putconn.assert_called_once_with(conn)
+
+def test_csv_error_releases_connection(tmp_path):
+    csv_path = tmp_path / 'mines.csv'
+    csv_path.write_text("Mine Name,Location,Annual Production,Emission Factor,Date\n"
+                        "Jharia,Jharkhand,3.5,0.9,2024-01-01\n")
+    conn = fake_connection(FakeCursor(rowcount=1))
+    backend = fake_backend(conn)
+    with pytest.raises(FileNotFoundError):
+        backend.copy_csv_files([str(csv_path), str(tmp_path / 'missing.csv')], chunk_size=10)
+    # The first file's rows are not committed without the second
+    conn.rollback.assert_called_once_with()
+    conn.commit.assert_not_called()
+    backend.pool.putconn.assert_called_once_with(conn)
+
+@pytest.mark.parametrize('existing_index, deduplicated', [(None, True), ('idx_coal_mines_natural_key', False)])
+def test_create_table_deduplicates_only_before_the_natural_key_exists(existing_index, deduplicated):
+    cursor = FakeCursor(fetchone=(existing_index,))
+    fake_backend(fake_connection(cursor)).create_table()
+    assert (squash(DEDUPLICATE_SQL) in cursor.statements) is deduplicated
+    assert (squash(CREATE_NATURAL_KEY_SQL) in cursor.statements) is deduplicated
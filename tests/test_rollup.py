@@ -0,0 +1,80 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from ingest import ensure_natural_key, upsert_records
+from main import create_database_and_table
+from rollup import ROLLUP_TABLE, ensure_rollup, rebuild_rollup
+
+def rollup_rows(conn):
+    return conn.execute(f"SELECT * FROM {ROLLUP_TABLE} ORDER BY date;").fetchall()
+
+def rebuilt_rollup_rows(conn):
+    # What a full rebuild from coal_mines gives, without touching the stored rollup
+    conn.execute("SAVEPOINT rebuild;")
+    rebuild_rollup(conn.cursor())
+    rows = rollup_rows(conn)
+    conn.execute("ROLLBACK TO rebuild;")
+    conn.execute("RELEASE rebuild;")
+    return rows
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / 'rollup.db')
+    create_database_and_table(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    yield conn
+    conn.close()
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['Mine Name', 'Location', 'Annual Production', 'Emission Factor', 'Date'])
+
+def assert_rollup_current(conn):
+    # Sums are compared approximately: incremental updates add and subtract in a different order
+    stored, rebuilt = rollup_rows(conn), rebuilt_rollup_rows(conn)
+    assert [(day, counts) for day, *_, counts in stored] == [(day, counts) for day, *_, counts in rebuilt]
+    for stored_row, rebuilt_row in zip(stored, rebuilt):
+        assert stored_row[1:4] == pytest.approx(rebuilt_row[1:4])
+
+def test_upserts_keep_rollup_current(conn):
+    upsert_records(conn, frame([
+        ('New Mine', 'Odisha', 2.0, 0.9, '2024-02-01'),
+        ('New Mine', 'Odisha', 2.5, None, '2024-02-02'),
+        ('Undated Mine', 'Odisha', 1.0, 0.8, None),
+    ]))
+    assert_rollup_current(conn)
+
+    # Overwrite existing keys, including a duplicate within the batch, of which the last row wins
+    upsert_records(conn, frame([
+        ('Jharia', 'Jharkhand', 4.0, None, '2024-01-01'),
+        ('New Mine', 'Odisha', 3.0, 0.7, '2024-02-01'),
+        ('New Mine', 'Odisha', 3.5, 0.75, '2024-02-01'),
+    ]))
+    assert conn.execute("SELECT annual_production FROM coal_mines WHERE mine_name = 'New Mine' "
+                        "AND date = '2024-02-01';").fetchall() == [(3.5,)]
+    assert_rollup_current(conn)
+
+def test_upsert_of_stored_rows_keeps_rollup_current(conn):
+    stored = pd.read_sql_query("SELECT mine_name AS 'Mine Name', location AS 'Location', "
+                               "annual_production * 2 AS 'Annual Production', NULL AS 'Emission Factor', "
+                               "date AS 'Date' FROM coal_mines;", conn)
+    rows_before = conn.execute("SELECT COUNT(*) FROM coal_mines;").fetchone()[0]
+    upsert_records(conn, stored)
+    assert conn.execute("SELECT COUNT(*) FROM coal_mines;").fetchone()[0] == rows_before
+    assert conn.execute(f"SELECT emission_factor_count FROM {ROLLUP_TABLE};").fetchall() == [(0,)]
+    assert_rollup_current(conn)
+
+def test_natural_key_deduplication_updates_rollup(tmp_path):
+    db_path = str(tmp_path / 'duplicates.db')
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("CREATE TABLE coal_mines (mine_name TEXT, location TEXT, annual_production REAL, "
+                     "emission_factor REAL, date DATE);")
+        ensure_rollup(conn.cursor())
+        conn.executemany("INSERT INTO coal_mines VALUES (?, ?, ?, ?, ?);",
+                         [('Jharia', 'Jharkhand', 3.5, 0.9, '2024-01-01')] * 3)
+        assert ensure_natural_key(conn.cursor()) == 2
+        assert rollup_rows(conn) == [('2024-01-01', 3.5, pytest.approx(0.9), 1, 1)]
+    finally:
+        conn.close()
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from scenarios import allocate_reductions, evaluate_reduction_scenarios, reduction_grid
+
+# Three mines; saving per tonne cut is 0.9, 0.8 and 0.7 tCO2e, so they are cut in that order
+PRODUCTION = np.array([2.0, 1.0, 4.0])
+EMISSION_FACTOR = np.array([0.9, 0.8, 0.7])
+MAX_SAVING = PRODUCTION * EMISSION_FACTOR * 1e6
+
+def saving(production, emission_factor, reductions_pct):
+    return float(np.sum(production * reductions_pct / 100 * emission_factor * 1e6))
+
+def test_target_reached_exactly_by_whole_mines():
+    target = MAX_SAVING[0] + MAX_SAVING[1]
+    reductions = allocate_reductions(PRODUCTION, EMISSION_FACTOR, target)
+    np.testing.assert_allclose(reductions, [100.0, 100.0, 0.0])
+    assert saving(PRODUCTION, EMISSION_FACTOR, reductions) == pytest.approx(target)
+
+def test_target_needing_every_mine_at_its_cap():
+    target = MAX_SAVING.sum() / 2
+    reductions = allocate_reductions(PRODUCTION, EMISSION_FACTOR, target, max_reduction_pct=50.0)
+    np.testing.assert_allclose(reductions, [50.0, 50.0, 50.0])
+    assert saving(PRODUCTION, EMISSION_FACTOR, reductions) == pytest.approx(target)
+
+def test_target_between_mines_cuts_the_last_one_partially():
+    target = MAX_SAVING[0] + MAX_SAVING[1] / 4
+    reductions = allocate_reductions(PRODUCTION, EMISSION_FACTOR, target)
+    np.testing.assert_allclose(reductions, [100.0, 25.0, 0.0])
+
+def test_target_beyond_the_cap_is_rejected():
+    with pytest.raises(ValueError, match='exceeds'):
+        allocate_reductions(PRODUCTION, EMISSION_FACTOR, MAX_SAVING.sum() * 0.6, max_reduction_pct=50.0)
+
+def test_zero_target_cuts_nothing():
+    np.testing.assert_array_equal(allocate_reductions(PRODUCTION, EMISSION_FACTOR, 0.0), [0.0, 0.0, 0.0])
+
+def test_ties_in_marginal_cost_are_cut_in_input_order():
+    # Same saving per unit cost everywhere: the earlier mine is cut first, every time
+    production = np.array([1.0, 1.0, 1.0])
+    emission_factor = np.array([0.5, 1.0, 0.5])
+    cost = np.array([1.0, 2.0, 1.0])
+    target = 1.5 * 0.5e6
+    for _ in range(3):
+        reductions = allocate_reductions(production, emission_factor, target, cost_per_tonne=cost)
+        np.testing.assert_allclose(reductions, [100.0, 25.0, 0.0])
+    assert saving(production, emission_factor, reductions) == pytest.approx(target)
+
+def test_invalid_caps_and_costs_are_rejected():
+    with pytest.raises(ValueError):
+        allocate_reductions(PRODUCTION, EMISSION_FACTOR, 1.0, max_reduction_pct=120.0)
+    with pytest.raises(ValueError):
+        allocate_reductions(PRODUCTION, EMISSION_FACTOR, 1.0, cost_per_tonne=0.0)
+
+def test_reduction_grid_is_one_uniform_cut_per_row():
+    grid = reduction_grid(5)
+    assert grid.shape == (5, 1)
+    np.testing.assert_allclose(grid[:, 0], [0.0, 25.0, 50.0, 75.0, 100.0])
+    assert reduction_grid(3, start=10.0, stop=30.0).shape == (3, 1)
+
+def test_grid_scenarios_match_per_mine_matrix():
+    base = PRODUCTION * EMISSION_FACTOR * 1e6
+    grid = reduction_grid(11)
+    uniform = evaluate_reduction_scenarios(base, grid)
+    assert uniform.shape == (11,)
+    np.testing.assert_allclose(uniform, base.sum() * (1 - grid[:, 0] / 100))
+    # The same cuts spelled out per mine, evaluated in chunks smaller than the scenario count
+    per_mine = np.repeat(grid, len(base), axis=1)
+    np.testing.assert_allclose(evaluate_reduction_scenarios(base, per_mine, chunk_size=4), uniform)
+
+def test_scenarios_of_the_wrong_shape_are_rejected():
+    base = PRODUCTION * EMISSION_FACTOR * 1e6
+    with pytest.raises(ValueError, match='shape'):
+        evaluate_reduction_scenarios(base, np.zeros((4, 2)))
+    with pytest.raises(ValueError):
+        evaluate_reduction_scenarios(base, reduction_grid(3, stop=150.0))
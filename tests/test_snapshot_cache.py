@@ -0,0 +1,74 @@
+import os
+import sqlite3
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from main import create_database_and_table, fetch_coal_mine_data_sqlite
+from snapshot_cache import SNAPSHOT_FILE, read_snapshot, write_snapshot
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / 'snapshot.db')
+    create_database_and_table(db_path)
+    return db_path
+
+def load_frame(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return fetch_coal_mine_data_sqlite(conn)
+    finally:
+        conn.close()
+
+def test_fresh_snapshot_is_reused(db_path, tmp_path):
+    df = load_frame(db_path)
+    assert write_snapshot(df, db_path, str(tmp_path / 'cache'))
+    snapshot = read_snapshot(db_path, str(tmp_path / 'cache'))
+    assert snapshot.equals(df)
+
+def test_snapshot_is_written_uncompressed(db_path, tmp_path):
+    write_snapshot(load_frame(db_path), db_path, str(tmp_path / 'cache'))
+    path = os.path.join(str(tmp_path / 'cache'), SNAPSHOT_FILE.format(layout='default'))
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+        # Zero-copy: the column buffers point into the mapped file rather than into decompressed copies
+        source.seek(0)
+        mapped = source.read_buffer()
+        start, end = mapped.address, mapped.address + mapped.size
+        for column in table.columns:
+            for buffer in column.chunk(0).buffers():
+                if buffer is not None and buffer.size:
+                    assert start <= buffer.address < end
+
+def test_changed_mtime_forces_reload(db_path, tmp_path):
+    write_snapshot(load_frame(db_path), db_path, str(tmp_path / 'cache'))
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert read_snapshot(db_path, str(tmp_path / 'cache')) is None
+
+def test_changed_size_forces_reload(db_path, tmp_path):
+    write_snapshot(load_frame(db_path), db_path, str(tmp_path / 'cache'))
+    stat = os.stat(db_path)
+    # Same row count and modification time, but a rewritten row that needs more pages
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE coal_mines SET location = ? WHERE mine_name = 'Jharia';", ('J' * 20000,))
+    conn.close()
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(db_path).st_size != stat.st_size
+    assert read_snapshot(db_path, str(tmp_path / 'cache')) is None
+
+def test_write_ahead_log_change_forces_reload(db_path, tmp_path):
+    # Writes in WAL mode stay in the -wal file until a checkpoint; the database file itself is untouched
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA wal_autocheckpoint=0;")
+        write_snapshot(load_frame(db_path), db_path, str(tmp_path / 'cache'))
+        stat = os.stat(db_path)
+        conn.execute("UPDATE coal_mines SET annual_production = 9.9 WHERE mine_name = 'Jharia';")
+        assert os.stat(db_path).st_mtime_ns == stat.st_mtime_ns and os.stat(db_path).st_size == stat.st_size
+        assert read_snapshot(db_path, str(tmp_path / 'cache')) is None
+    finally:
+        conn.close()
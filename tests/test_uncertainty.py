@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from uncertainty import SEED_BLOCK_SAMPLES, batch_size_for, propagate_footprint_uncertainty
+
+PRODUCTION = np.array([3.5, 2.8, 5.5, 4.0, 2.5])
+EMISSION_FACTOR = np.array([0.9, 0.85, 0.9, 0.88, 0.83])
+# Not a multiple of the seed block, so the last block and the last batch are partial
+SAMPLES = 3 * SEED_BLOCK_SAMPLES + 17
+
+def propagate(**kwargs):
+    return propagate_footprint_uncertainty(PRODUCTION, EMISSION_FACTOR, samples=SAMPLES, seed=42, **kwargs)
+
+@pytest.mark.parametrize('batch_size', [1, SEED_BLOCK_SAMPLES, 2 * SEED_BLOCK_SAMPLES + 5, None])
+def test_fixed_seed_gives_same_samples_for_any_batch_size(batch_size):
+    reference = propagate(batch_size=SAMPLES)
+    result = propagate(batch_size=batch_size)
+    assert result['batch_size'] % SEED_BLOCK_SAMPLES == 0
+    np.testing.assert_array_equal(result['totals'], reference['totals'])
+    assert (result['lower'], result['upper']) == (reference['lower'], reference['upper'])
+    # Per-mine sums add the batches up in a different grouping
+    np.testing.assert_allclose(result['mine_mean'], reference['mine_mean'], rtol=1e-12)
+    np.testing.assert_allclose(result['mine_std'], reference['mine_std'], rtol=1e-9)
+
+def test_fixed_seed_gives_same_samples_for_any_worker_count():
+    np.testing.assert_array_equal(propagate(batch_size=1, workers=2)['totals'], propagate(batch_size=1)['totals'])
+
+def test_different_seeds_give_different_samples():
+    other = propagate_footprint_uncertainty(PRODUCTION, EMISSION_FACTOR, samples=SAMPLES, seed=43)
+    assert not np.array_equal(other['totals'], propagate()['totals'])
+
+def test_samples_center_on_the_point_estimate():
+    result = propagate_footprint_uncertainty(PRODUCTION, EMISSION_FACTOR, samples=20_000, seed=0)
+    expected = PRODUCTION * EMISSION_FACTOR * 1e6
+    np.testing.assert_allclose(result['mine_mean'], expected, rtol=0.01)
+    assert result['lower'] < expected.sum() < result['upper']
+
+def test_batch_size_is_whole_seed_blocks():
+    assert batch_size_for(5) % SEED_BLOCK_SAMPLES == 0
+    assert batch_size_for(10 ** 9) == SEED_BLOCK_SAMPLES
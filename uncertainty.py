@@ -0,0 +1,113 @@
+import time
+
+from lazy_imports import LazyModule
+
+np = LazyModule('numpy')
+
+# Relative standard deviations used when no per-mine spread is given
+DEFAULT_PRODUCTION_RSD = 0.05
+DEFAULT_EMISSION_FACTOR_RSD = 0.10
+DEFAULT_SAMPLES = 100_000
+# Memory budget of one (samples x mines) batch; the batch size is derived from it
+DEFAULT_BATCH_BYTES = 64 * 1024 * 1024
+# float64 matrices alive at once per batch: sampled production (reused for the footprint) and emission factor
+BATCH_MATRICES = 2
+# Samples drawn from one child seed. Batches are whole numbers of these blocks, so every sample is drawn
+# from the same stream whatever the batch size; changing it changes the results of a given seed.
+SEED_BLOCK_SAMPLES = 256
+
+def batch_size_for(mines, batch_bytes=DEFAULT_BATCH_BYTES):
+    # Whole seed blocks only; a single block may exceed batch_bytes when there are very many mines
+    samples = batch_bytes // (max(mines, 1) * 8 * BATCH_MATRICES)
+    return max(1, samples // SEED_BLOCK_SAMPLES) * SEED_BLOCK_SAMPLES
+
+def sample_batch(seeds, block_sizes, production, emission_factor, production_sd, emission_factor_sd):
+    # One vectorized batch of consecutive seed blocks: every sample draws production and emission factor
+    # for every mine from a normal distribution truncated at zero. Returns the national total per sample,
+    # the per-mine sum and sum of squares (for per-mine mean and spread), and the bytes held by the batch
+    # matrices.
+    shape = (sum(block_sizes), len(production))
+    sampled_production = np.empty(shape)
+    sampled_factor = np.empty(shape)
+    start = 0
+    for seed, size in zip(seeds, block_sizes):
+        rng = np.random.default_rng(seed)
+        rng.standard_normal(out=sampled_production[start:start + size])
+        rng.standard_normal(out=sampled_factor[start:start + size])
+        start += size
+    sampled_production *= production_sd
+    sampled_production += production
+    np.maximum(sampled_production, 0, out=sampled_production)
+    sampled_factor *= emission_factor_sd
+    sampled_factor += emission_factor
+    np.maximum(sampled_factor, 0, out=sampled_factor)
+
+    footprint = np.multiply(sampled_production, sampled_factor, out=sampled_production)
+    footprint *= 1e6
+    batch_bytes = sampled_production.nbytes + sampled_factor.nbytes
+    totals = footprint.sum(axis=1)
+    mine_sum = footprint.sum(axis=0)
+    np.square(footprint, out=sampled_factor)
+    mine_sum_squares = sampled_factor.sum(axis=0)
+    return totals, mine_sum, mine_sum_squares, batch_bytes
+
+def _sample_batch_args(args):
+    return sample_batch(*args)
+
+def propagate_footprint_uncertainty(production, emission_factor, samples=DEFAULT_SAMPLES,
+                                    production_rsd=DEFAULT_PRODUCTION_RSD,
+                                    emission_factor_rsd=DEFAULT_EMISSION_FACTOR_RSD,
+                                    seed=0, batch_size=None, workers=1, confidence=0.95):
+    # Monte Carlo propagation of per-mine production and emission factor uncertainty to the footprint.
+    # production / emission_factor are per-mine means; the *_rsd arguments are scalars or per-mine arrays.
+    # Each block of SEED_BLOCK_SAMPLES samples gets its own child seed of `seed`, so results are the same
+    # for any worker count and batch size; batch_size is rounded up to whole blocks.
+    production = np.asarray(production, dtype=np.float64)
+    emission_factor = np.asarray(emission_factor, dtype=np.float64)
+    production_sd = production * np.asarray(production_rsd, dtype=np.float64)
+    emission_factor_sd = emission_factor * np.asarray(emission_factor_rsd, dtype=np.float64)
+    if batch_size is None:
+        batch_size = batch_size_for(len(production))
+    batch_size = -(-batch_size // SEED_BLOCK_SAMPLES) * SEED_BLOCK_SAMPLES
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence must be between 0 and 1.")
+
+    block_sizes = [min(SEED_BLOCK_SAMPLES, samples - start) for start in range(0, samples, SEED_BLOCK_SAMPLES)]
+    seeds = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    blocks_per_batch = batch_size // SEED_BLOCK_SAMPLES
+    jobs = [(seeds[first:first + blocks_per_batch], block_sizes[first:first + blocks_per_batch],
+             production, emission_factor, production_sd, emission_factor_sd)
+            for first in range(0, len(block_sizes), blocks_per_batch)]
+
+    start = time.perf_counter()
+    if workers > 1:
+        # Imported here: the process pool machinery is only needed for parallel runs
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_sample_batch_args, jobs))
+    else:
+        results = [sample_batch(*job) for job in jobs]
+    seconds = time.perf_counter() - start
+
+    totals = np.concatenate([result[0] for result in results])
+    mine_sum = np.sum([result[1] for result in results], axis=0)
+    mine_sum_squares = np.sum([result[2] for result in results], axis=0)
+    mine_mean = mine_sum / samples
+    mine_std = np.sqrt(np.maximum(mine_sum_squares / samples - mine_mean ** 2, 0))
+
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(totals, [tail, 100 - tail])
+    return {
+        'samples': samples,
+        'confidence': confidence,
+        'mean': totals.mean(),
+        'std': totals.std(),
+        'lower': lower,
+        'upper': upper,
+        'totals': totals,
+        'mine_mean': mine_mean,
+        'mine_std': mine_std,
+        'batch_size': batch_size,
+        'batch_bytes': max(result[3] for result in results),
+        'seconds': seconds
+    }